@@ -4,6 +4,9 @@ from app.components.sidebar import sidebar
 from app.components.chat import chat_interface
 from app.state import AppState
 from app.states.auth_state import AuthState
+from app import lifespan
+from app.services import hf_spaces
+from app.prompts import registry as prompt_registry
 
 
 def protected_page() -> rx.Component:
@@ -100,5 +103,16 @@ app = rx.App(
     ],
 )
 
+# Load and validate the mode prompts once at startup
+prompt_registry.load_prompts()
+
 # Add main page
-app.add_page(index, route="/", on_load=AuthState.check_auth)
\ No newline at end of file
+app.add_page(
+    index, route="/", on_load=[AuthState.check_auth, AppState.refresh_space_health]
+)
+
+# Warm up the shared Supabase clients and the services using them, and tear
+# them down in reverse order
+app.register_lifespan_task(lifespan.lifespan)
+# Connect to the Hugging Face Spaces in the background at app start
+app.register_lifespan_task(hf_spaces.warm_up)
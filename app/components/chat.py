@@ -6,11 +6,18 @@ from app.components.modal import about_modal
 def mode_button(mode: str) -> rx.Component:
     return rx.el.button(
         mode,
+        rx.cond(
+            AppState.degraded_modes.contains(mode),
+            rx.el.span(
+                class_name="absolute -top-1 -right-1 w-2.5 h-2.5 bg-amber-500 rounded-full",
+                title="This mode's service is having problems",
+            ),
+        ),
         on_click=lambda: AppState.set_active_mode(mode),
         class_name=rx.cond(
             AppState.active_mode == mode,
-            "px-4 py-2 text-sm font-semibold text-white bg-indigo-600 rounded-md shadow-md",
-            "px-4 py-2 text-sm font-semibold text-gray-700 bg-white border border-gray-300 rounded-md hover:bg-gray-50",
+            "relative px-4 py-2 text-sm font-semibold text-white bg-indigo-600 rounded-md shadow-md",
+            "relative px-4 py-2 text-sm font-semibold text-gray-700 bg-white border border-gray-300 rounded-md hover:bg-gray-50",
         ),
     )
 
@@ -64,6 +71,14 @@ def chat_interface() -> rx.Component:
             class_name="relative flex flex-col items-center justify-center text-center gap-8 py-12",
         ),
         rx.el.div(
+            rx.cond(
+                AppState.chat_history_has_older,
+                rx.el.button(
+                    "Load earlier messages",
+                    on_click=AppState.load_older_messages,
+                    class_name="self-center px-3 py-1 text-xs text-gray-500 hover:underline",
+                ),
+            ),
             rx.foreach(AppState.chat_history, chat_message),
             class_name="flex-grow p-4 space-y-4 overflow-y-auto",
         ),
@@ -41,6 +41,13 @@ def _notifications_tab() -> rx.Component:
     is_active = AppState.active_scrape_sidebar_tab == "Notifications"
     return rx.el.button(
         "Notifications",
+        rx.cond(
+            AppState.unread_notifications > 0,
+            rx.el.span(
+                AppState.unread_notifications,
+                class_name="ml-1.5 px-1.5 py-0.5 text-xs font-semibold text-white bg-indigo-600 rounded-full",
+            ),
+        ),
         on_click=AppState.switch_to_notifications,
         type="button",
         class_name=rx.cond(
@@ -164,41 +171,130 @@ def _scraper_setup() -> rx.Component:
     )
 
 
+def _scraper_stats(scraper) -> rx.Component:
+    """Last run status, success rate and average run time of a scraper"""
+    return rx.cond(
+        scraper["runs"] > 0,
+        rx.el.p(
+            rx.el.span(
+                class_name=rx.cond(
+                    scraper["last_run_status"] == "success",
+                    "inline-block h-2 w-2 rounded-full bg-green-500",
+                    "inline-block h-2 w-2 rounded-full bg-red-500",
+                ),
+            ),
+            f"Last run {scraper['last_run_status']} · {scraper['success_rate']}% success"
+            f" · avg {scraper['avg_execution_time_ms']} ms",
+            class_name="flex items-center gap-1.5 text-xs text-gray-500 mt-1",
+        ),
+        rx.el.p("Not run yet", class_name="text-xs text-gray-400 italic mt-1"),
+    )
+
+
+def _execution_row(execution) -> rx.Component:
+    """One run in a scraper's execution history"""
+    return rx.el.div(
+        rx.cond(
+            execution["success"],
+            rx.icon("circle-check", class_name="h-3.5 w-3.5 text-green-500 shrink-0"),
+            rx.icon("circle-x", class_name="h-3.5 w-3.5 text-red-500 shrink-0"),
+        ),
+        rx.el.span(execution["executed_at"], class_name="flex-1 truncate"),
+        rx.cond(
+            execution["success"],
+            rx.el.span(f"{execution['items_found']} found"),
+            rx.el.span(
+                execution["error_message"],
+                class_name="max-w-[8rem] truncate text-red-500",
+            ),
+        ),
+        rx.el.span(f"{execution['execution_time_ms']} ms", class_name="text-gray-400"),
+        class_name="flex items-center gap-2 text-xs text-gray-600",
+    )
+
+
+def _scraper_executions() -> rx.Component:
+    """Execution history of the open Active Jobs row, paged newest first"""
+    from app.states.supabase_state import SupabaseState
+
+    return rx.el.div(
+        rx.foreach(AppState.scraper_executions, _execution_row),
+        rx.cond(
+            AppState.executions_loading,
+            rx.el.p("Loading...", class_name="text-xs text-gray-400"),
+            rx.cond(
+                AppState.scraper_executions.length() == 0,
+                rx.el.p("No runs yet.", class_name="text-xs text-gray-400"),
+            ),
+        ),
+        rx.cond(
+            AppState.executions_has_more & ~AppState.executions_loading,
+            rx.el.button(
+                "Older runs",
+                on_click=SupabaseState.load_more_executions,
+                class_name="text-xs font-semibold text-indigo-600 hover:underline cursor-pointer",
+            ),
+        ),
+        class_name="space-y-2 pt-3 mt-3 border-t border-gray-100",
+    )
+
+
 def _scraper_card(scraper) -> rx.Component:
-    """Individual scraper card component with delete functionality"""
+    """Individual scraper card component with run stats, history and delete"""
     from app.states.supabase_state import SupabaseState
 
     return rx.el.div(
-        # Scraper info
         rx.el.div(
-            rx.el.p(
-                scraper["name"],
-                class_name="font-semibold text-gray-800 truncate",
+            # Bulk selection
+            rx.el.input(
+                type="checkbox",
+                checked=AppState.selected_scraper_ids.contains(scraper["id"]),
+                on_change=lambda _: AppState.toggle_scraper_selected(scraper["id"]),
+                class_name="h-4 w-4 accent-indigo-600 cursor-pointer",
             ),
-            rx.cond(
-                scraper["criteria"],
+            # Scraper info
+            rx.el.div(
                 rx.el.p(
-                    f"Criteria: {scraper['criteria']}",
-                    class_name="text-sm text-gray-500 truncate",
+                    scraper["name"],
+                    class_name="font-semibold text-gray-800 truncate",
+                ),
+                rx.cond(
+                    scraper["criteria_preview"],
+                    rx.el.p(
+                        f"Criteria: {scraper['criteria_preview']}",
+                        class_name="text-sm text-gray-500 truncate",
+                    ),
+                    rx.el.p(
+                        "No criteria specified",
+                        class_name="text-sm text-gray-400 italic truncate",
+                    ),
                 ),
                 rx.el.p(
-                    "No criteria specified",
-                    class_name="text-sm text-gray-400 italic truncate",
+                    f"{scraper['regularity']} at {scraper['time_utc']}",
+                    class_name="text-xs text-gray-400 mt-1",
                 ),
+                _scraper_stats(scraper),
+                class_name="flex-1 overflow-hidden",
             ),
-            rx.el.p(
-                f"{scraper['regularity']} at {scraper['time_utc']}",
-                class_name="text-xs text-gray-400 mt-1",
+            # Execution history toggle
+            rx.el.button(
+                rx.icon("history", class_name="h-4 w-4 text-gray-500"),
+                on_click=lambda: SupabaseState.toggle_scraper_executions(scraper["id"]),
+                class_name="p-2 hover:bg-gray-100 rounded-md cursor-pointer transition-colors",
             ),
-            class_name="flex-1 overflow-hidden",
+            # Delete button
+            rx.el.button(
+                rx.icon("trash-2", class_name="h-4 w-4 text-red-500"),
+                on_click=lambda: SupabaseState.delete_scraper(scraper["id"]),
+                class_name="p-2 hover:bg-red-50 rounded-md cursor-pointer transition-colors",
+            ),
+            class_name="flex items-center gap-4",
         ),
-        # Delete button
-        rx.el.button(
-            rx.icon("trash-2", class_name="h-4 w-4 text-red-500"),
-            on_click=lambda: SupabaseState.delete_scraper(scraper["id"]),
-            class_name="p-2 hover:bg-red-50 rounded-md cursor-pointer transition-colors",
+        rx.cond(
+            AppState.expanded_scraper_id == scraper["id"],
+            _scraper_executions(),
         ),
-        class_name="flex items-center gap-4 p-4 border border-gray-200 rounded-lg bg-white hover:shadow-sm transition-shadow",
+        class_name="p-4 border border-gray-200 rounded-lg bg-white hover:shadow-sm transition-shadow",
     )
 
 
@@ -207,13 +303,25 @@ def _active_jobs() -> rx.Component:
     from app.states.supabase_state import SupabaseState
 
     return rx.el.div(
-        # Header with refresh button
+        # Header with bulk delete and refresh buttons
         rx.el.div(
             rx.el.h2("Active Jobs", class_name="text-2xl font-bold text-gray-800"),
-            rx.el.button(
-                rx.icon("refresh-cw", class_name="h-4 w-4"),
-                on_click=SupabaseState.fetch_scrapers,
-                class_name="p-2 text-gray-500 hover:text-gray-700 hover:bg-gray-100 rounded-md cursor-pointer transition-colors",
+            rx.el.div(
+                rx.cond(
+                    AppState.selected_scraper_ids.length() > 0,
+                    rx.el.button(
+                        rx.icon("trash-2", class_name="h-4 w-4"),
+                        f"Delete ({AppState.selected_scraper_ids.length()})",
+                        on_click=SupabaseState.delete_selected_scrapers,
+                        class_name="flex items-center gap-1 px-2 py-1 text-sm text-red-600 hover:bg-red-50 rounded-md cursor-pointer transition-colors",
+                    ),
+                ),
+                rx.el.button(
+                    rx.icon("refresh-cw", class_name="h-4 w-4"),
+                    on_click=SupabaseState.fetch_scrapers,
+                    class_name="p-2 text-gray-500 hover:text-gray-700 hover:bg-gray-100 rounded-md cursor-pointer transition-colors",
+                ),
+                class_name="flex items-center gap-2",
             ),
             class_name="flex items-center justify-between mb-8",
         ),
@@ -235,6 +343,19 @@ def _active_jobs() -> rx.Component:
                         AppState.scheduled_scrapers,
                         _scraper_card,
                     ),
+                    rx.cond(
+                        AppState.scrapers_has_more,
+                        rx.el.button(
+                            rx.cond(
+                                AppState.scrapers_loading_more,
+                                "Loading...",
+                                "Load more",
+                            ),
+                            on_click=SupabaseState.load_more_scrapers,
+                            disabled=AppState.scrapers_loading_more,
+                            class_name="w-full py-2 text-sm font-semibold text-indigo-600 hover:bg-indigo-50 rounded-md cursor-pointer disabled:opacity-50 transition-colors",
+                        ),
+                    ),
                     class_name="space-y-4",
                 ),
                 # Empty state
@@ -249,10 +370,39 @@ def _active_jobs() -> rx.Component:
     )
 
 
+def _notification_card(notification) -> rx.Component:
+    """A scraper match or failure pushed from the scheduler"""
+    return rx.el.div(
+        rx.cond(
+            notification["success"],
+            rx.icon("bell", class_name="h-4 w-4 text-indigo-500 shrink-0 mt-0.5"),
+            rx.icon("circle-x", class_name="h-4 w-4 text-red-500 shrink-0 mt-0.5"),
+        ),
+        rx.el.div(
+            rx.el.p(
+                notification["scraper_name"],
+                class_name="font-semibold text-gray-800 truncate",
+            ),
+            rx.el.p(notification["message"], class_name="text-sm text-gray-600"),
+            rx.el.p(notification["executed_at"], class_name="text-xs text-gray-400 mt-1"),
+            class_name="flex-1 overflow-hidden",
+        ),
+        class_name="flex items-start gap-3 p-4 border border-gray-200 rounded-lg bg-white",
+    )
+
+
 def _notifications() -> rx.Component:
+    """Feed of scraper matches and failures, newest first"""
     return rx.el.div(
         rx.el.h2("Notifications", class_name="text-2xl font-bold text-gray-800 mb-8"),
-        rx.el.p("No new notifications.", class_name="text-gray-500"),
+        rx.cond(
+            AppState.notifications,
+            rx.el.div(
+                rx.foreach(AppState.notifications, _notification_card),
+                class_name="space-y-4",
+            ),
+            rx.el.p("No new notifications.", class_name="text-gray-500"),
+        ),
         class_name="p-8",
     )
 
@@ -0,0 +1,27 @@
+"""Startup and shutdown of the app's background services.
+
+Reflex keeps registered lifespan tasks in a set, so their order isn't
+guaranteed. The services that depend on each other are therefore entered
+from one lifespan, in order, and torn down in reverse: nothing flushes or
+writes back through Supabase clients that have already been closed.
+"""
+import contextlib
+from app.scraping import fetcher, scheduler
+from app.services import chat_persistence, realtime_hub, supabase_clients
+
+
+@contextlib.asynccontextmanager
+async def lifespan():
+    """Run the Supabase clients and the services built on them"""
+    async with contextlib.AsyncExitStack() as stack:
+        await stack.enter_async_context(supabase_clients.lifespan())
+        # Its final flush runs before the clients close
+        await stack.enter_async_context(chat_persistence.lifespan())
+        # One Realtime channel per worker pushing scraper changes to sessions
+        await stack.enter_async_context(realtime_hub.lifespan())
+        await stack.enter_async_context(fetcher.lifespan())
+        # In-process scheduler worker (SCHEDULER_ENABLED=1). It stops, writing
+        # back its last runs and releasing its leases, while the fetcher and
+        # the Supabase clients are still open
+        await stack.enter_async_context(scheduler.lifespan())
+        yield
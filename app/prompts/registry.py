@@ -0,0 +1,129 @@
+"""In-memory registry of the per-mode system prompts.
+
+Prompts are read from the ``*_prompt.json`` files next to this module once at
+startup and validated, then served from memory. In dev mode a changed file is
+picked up on the next request. Each prompt carries a version (the file's
+``"version"`` field, or a hash of the text) so responses can be attributed to
+the prompt that produced them.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+PROMPTS_DIR = Path(__file__).parent
+DEFAULT_PROMPT = "You are a helpful assistant."
+
+PROMPT_FILES = {
+    "SCRAPE": "scrape_prompt.json",
+    "DATA": "data_prompt.json",
+    "INVESTIGATE": "investigate_prompt.json",
+    "FACT-CHECK": "fact_check_prompt.json",
+    "GRAPHICS": "graphics_prompt.json",
+}
+
+
+class PromptValidationError(ValueError):
+    """A prompt file exists but does not match {"prompt": str, "version"?: str}"""
+
+
+@dataclass(frozen=True)
+class Prompt:
+    mode: str
+    text: str
+    version: str
+    mtime: float | None = None
+
+    @property
+    def id(self) -> str:
+        """Versioned prompt id, e.g. ``DATA@3f2a9c1e``"""
+        return f"{self.mode}@{self.version}"
+
+
+_prompts: dict[str, Prompt] = {}
+_lock = threading.Lock()
+
+
+def _hot_reload_enabled() -> bool:
+    if "PROMPTS_HOT_RELOAD" in os.environ:
+        return os.environ["PROMPTS_HOT_RELOAD"] == "1"
+    from reflex.utils.exec import is_prod_mode
+
+    return not is_prod_mode()
+
+
+def _default_prompt(mode: str) -> Prompt:
+    return Prompt(mode=mode, text=DEFAULT_PROMPT, version="default")
+
+
+def _load_prompt(mode: str) -> Prompt:
+    """Read and validate one prompt file"""
+    path = PROMPTS_DIR / PROMPT_FILES[mode]
+    if not path.exists():
+        logging.warning(f"No prompt file for {mode} at {path}, using the default prompt")
+        return _default_prompt(mode)
+
+    mtime = path.stat().st_mtime
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except json.JSONDecodeError as e:
+        raise PromptValidationError(f"{path}: invalid JSON: {e}") from e
+    if not isinstance(data, dict):
+        raise PromptValidationError(f"{path}: expected a JSON object")
+    text = data.get("prompt")
+    if not isinstance(text, str) or not text.strip():
+        raise PromptValidationError(f"{path}: 'prompt' must be a non-empty string")
+    version = data.get("version")
+    if version is not None and not isinstance(version, str):
+        raise PromptValidationError(f"{path}: 'version' must be a string")
+    if not version:
+        version = hashlib.sha256(text.encode("utf-8")).hexdigest()[:8]
+    return Prompt(mode=mode, text=text, version=version, mtime=mtime)
+
+
+def load_prompts() -> dict[str, Prompt]:
+    """Load and validate every mode prompt, raising on invalid files"""
+    prompts = {mode: _load_prompt(mode) for mode in PROMPT_FILES}
+    with _lock:
+        _prompts.clear()
+        _prompts.update(prompts)
+    logging.info(
+        "Loaded prompts: " + ", ".join(prompt.id for prompt in prompts.values())
+    )
+    return prompts
+
+
+def _reload_if_changed(mode: str, prompt: Prompt) -> Prompt:
+    path = PROMPTS_DIR / PROMPT_FILES[mode]
+    try:
+        mtime = path.stat().st_mtime if path.exists() else None
+    except OSError:
+        return prompt
+    if mtime == prompt.mtime:
+        return prompt
+    try:
+        reloaded = _load_prompt(mode)
+    except PromptValidationError as e:
+        # Keep serving the last good prompt while the file is being edited
+        logging.error(f"Not reloading prompt for {mode}: {e}")
+        return prompt
+    with _lock:
+        _prompts[mode] = reloaded
+    logging.info(f"Reloaded prompt {reloaded.id}")
+    return reloaded
+
+
+def get_prompt(mode: str) -> Prompt:
+    """Get the current system prompt of a mode"""
+    if mode not in PROMPT_FILES:
+        return _default_prompt(mode)
+    prompt = _prompts.get(mode)
+    if prompt is None:
+        load_prompts()
+        prompt = _prompts[mode]
+    elif _hot_reload_enabled():
+        prompt = _reload_if_changed(mode, prompt)
+    return prompt
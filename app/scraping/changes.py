@@ -0,0 +1,135 @@
+"""Change detection for monitored pages.
+
+A page's main text is split into blocks (paragraphs, headings, list items,
+table cells, ...) and each normalized block is hashed. Comparing the hashes
+with those stored for the previous run gives the blocks that are new, so
+criteria matching and summarization only ever see the delta. A simhash over
+word shingles measures how far the page moved as a whole, which tells
+cosmetic churn apart from a rewrite.
+"""
+import hashlib
+import re
+from dataclasses import dataclass, field
+from bs4 import BeautifulSoup, Tag
+from app.scraping import extract
+
+# Elements whose text is one block, unless they contain other blocks
+BLOCK_TAGS = [
+    "p", "h1", "h2", "h3", "h4", "h5", "h6", "li", "dt", "dd", "td", "th",
+    "blockquote", "pre", "figcaption", "caption", "summary",
+]
+# Page chrome left out of the main text when no <main>/<article> is marked up
+BOILERPLATE_TAGS = ["nav", "header", "footer", "aside", "form"]
+MIN_BLOCK_LENGTH = 3
+SHINGLE_SIZE = 3
+SIMHASH_BITS = 64
+
+_digits = re.compile(r"\d+")
+
+
+@dataclass
+class Fingerprint:
+    blocks: list[str]
+    block_hashes: list[str]
+    simhash: int
+
+
+@dataclass
+class Delta:
+    # Text of blocks that weren't on the page at the previous run, in page order
+    added: list[str] = field(default_factory=list)
+    removed_count: int = 0
+    # Hamming distance between the two simhashes (0-64)
+    distance: int = 0
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.added) or self.removed_count > 0
+
+
+def _main_content(soup: BeautifulSoup) -> Tag | BeautifulSoup:
+    main = soup.find("main") or soup.find("article") or soup.find(attrs={"role": "main"})
+    if main:
+        return main
+    for tag in soup(BOILERPLATE_TAGS):
+        tag.decompose()
+    return soup.body or soup
+
+
+def _blocks(root: Tag | BeautifulSoup) -> list[str]:
+    blocks = []
+    for element in root.find_all(BLOCK_TAGS):
+        if element.find(BLOCK_TAGS):
+            continue
+        text = " ".join(element.get_text(" ").split())
+        if len(text) >= MIN_BLOCK_LENGTH:
+            blocks.append(text)
+    if not blocks:
+        # Pages laid out with bare <div>s: fall back to their text lines
+        text = root.get_text("\n")
+        blocks = [" ".join(line.split()) for line in text.splitlines()]
+        blocks = [block for block in blocks if len(block) >= MIN_BLOCK_LENGTH]
+    return blocks
+
+
+def normalize(block: str) -> str:
+    """Canonical form of a block for hashing; case and digit runs (dates,
+    counters, timestamps) don't count as changes"""
+    return _digits.sub("0", " ".join(block.casefold().split()))
+
+
+def _hash64(text: str) -> int:
+    return int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "big")
+
+
+def block_hash(block: str) -> str:
+    return hashlib.blake2b(normalize(block).encode(), digest_size=8).hexdigest()
+
+
+def simhash(blocks: list[str]) -> int:
+    """64-bit simhash of word shingles, as a signed integer (Postgres BIGINT)"""
+    weights = [0] * SIMHASH_BITS
+    for block in blocks:
+        words = normalize(block).split()
+        for i in range(max(1, len(words) - SHINGLE_SIZE + 1)):
+            value = _hash64(" ".join(words[i : i + SHINGLE_SIZE]))
+            for bit in range(SIMHASH_BITS):
+                weights[bit] += 1 if value >> bit & 1 else -1
+    result = sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+    return result - (1 << SIMHASH_BITS) if result >= 1 << (SIMHASH_BITS - 1) else result
+
+
+def distance(a: int, b: int) -> int:
+    return bin((a ^ b) & ((1 << SIMHASH_BITS) - 1)).count("1")
+
+
+def fingerprint(html: str) -> Fingerprint:
+    """Extract a page's main text blocks and their hashes"""
+    blocks = _blocks(_main_content(extract.parse(html)))
+    return Fingerprint(
+        blocks=blocks,
+        block_hashes=[block_hash(block) for block in blocks],
+        simhash=simhash(blocks),
+    )
+
+
+def diff(previous_hashes: list[str], previous_simhash: int, current: Fingerprint) -> Delta:
+    """Compare a page with its fingerprint from the previous run
+
+    Blocks are compared as multisets, so reordering blocks doesn't count as
+    new content.
+    """
+    remaining: dict[str, int] = {}
+    for digest in previous_hashes:
+        remaining[digest] = remaining.get(digest, 0) + 1
+    added = []
+    for block, digest in zip(current.blocks, current.block_hashes):
+        if remaining.get(digest):
+            remaining[digest] -= 1
+        else:
+            added.append(block)
+    return Delta(
+        added=added,
+        removed_count=sum(remaining.values()),
+        distance=distance(previous_simhash, current.simhash),
+    )
@@ -0,0 +1,259 @@
+"""Batched evaluation of scraper criteria against page changes.
+
+Scheduled runs ask whether the blocks that changed on a page match the
+scraper's free-text criteria. Rather than one model call per run, requests
+arriving within a short window are packed into one numbered prompt up to a
+token budget and the per-item verdicts are parsed back out of the answer.
+Verdicts are cached by (criteria, content) hash, so the same change seen by
+several scrapers with the same criteria, or seen again, costs nothing.
+"""
+import asyncio
+import hashlib
+import logging
+import os
+import re
+from dataclasses import dataclass, field, replace
+from app.services import llm_chains
+from app.services.cache import TTLCache
+from app.services.tokens import CHARS_PER_TOKEN, estimate_tokens
+
+CRITERIA_MODEL = os.environ.get("CRITERIA_MODEL", llm_chains.DEFAULT_REPO_ID)
+# Prompt tokens per batched call, instructions included
+BATCH_TOKEN_BUDGET = int(os.environ.get("CRITERIA_BATCH_TOKEN_BUDGET", "3000"))
+MAX_BATCH_ITEMS = int(os.environ.get("CRITERIA_MAX_BATCH_ITEMS", "16"))
+# Changed content beyond this is cut before evaluation
+ITEM_MAX_TOKENS = int(os.environ.get("CRITERIA_ITEM_MAX_TOKENS", "600"))
+# How long requests are collected before a batch is sent
+BATCH_WINDOW = float(os.environ.get("CRITERIA_BATCH_WINDOW_SECONDS", "2"))
+CONCURRENCY = int(os.environ.get("CRITERIA_CONCURRENCY", "2"))
+CALL_TIMEOUT = float(os.environ.get("CRITERIA_CALL_TIMEOUT_SECONDS", "120"))
+VERDICT_TTL = float(os.environ.get("CRITERIA_VERDICT_TTL_SECONDS", str(7 * 86400)))
+ANSWER_TOKENS_PER_ITEM = 48
+# Attempts at an item before a missing verdict counts as no match
+MAX_ATTEMPTS = 2
+# Criteria that any change satisfies, answered without a model call
+CHANGE_ONLY_CRITERIA = {"", "monitor for changes"}
+
+INSTRUCTIONS = (
+    "You check changes on monitored web pages against monitoring criteria. "
+    "For each numbered item, decide whether its new content matches its criteria. "
+    "Answer with exactly one line per item and nothing else, in the form:\n"
+    "<item number>: YES <number of matching entries> - <one sentence on what matched>\n"
+    "<item number>: NO 0 -\n"
+)
+_verdict_line = re.compile(
+    r"^\W*(?:item\s*)?(\d+)\s*[:.)\]-][\s*_]*(yes|no)\b\W*(\d+)?\s*[-–:]?\s*(.*)$",
+    re.IGNORECASE,
+)
+
+verdict_cache = TTLCache(ttl=VERDICT_TTL, maxsize=50_000)
+
+
+class CriteriaEvaluationError(Exception):
+    """The model call that was to answer a request failed"""
+
+
+@dataclass
+class Verdict:
+    matched: bool
+    items_found: int = 0
+    summary: str = ""
+    # True only for the call whose batch the model actually answered
+    evaluated: bool = False
+
+
+@dataclass
+class _Request:
+    key: tuple[str, str]
+    criteria: str
+    content: str
+    tokens: int
+    futures: list[asyncio.Future] = field(default_factory=list)
+    attempts: int = 0
+
+
+def _digest(text: str) -> str:
+    return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+
+def _normalize_criteria(criteria: str) -> str:
+    return " ".join(criteria.casefold().split())
+
+
+def _content(blocks: list[str]) -> str:
+    limit = int(ITEM_MAX_TOKENS * CHARS_PER_TOKEN)
+    content = "\n".join(blocks)
+    return content if len(content) <= limit else content[: limit - 1].rstrip() + "…"
+
+
+def _render_item(number: int, criteria: str, content: str) -> str:
+    return f"Item {number}\nCriteria: {criteria}\nNew content:\n{content}\n"
+
+
+def parse_verdicts(answer: str, count: int) -> dict[int, Verdict]:
+    """Get the verdicts of items 1..count from a model answer, skipping
+    lines that don't parse"""
+    verdicts: dict[int, Verdict] = {}
+    for line in answer.splitlines():
+        match = _verdict_line.match(line.strip())
+        if not match:
+            continue
+        number = int(match.group(1))
+        if not 1 <= number <= count or number in verdicts:
+            continue
+        matched = match.group(2).lower() == "yes"
+        found = int(match.group(3)) if match.group(3) else int(matched)
+        verdicts[number] = Verdict(
+            matched=matched,
+            items_found=max(found, 1) if matched else 0,
+            summary=match.group(4).strip() if matched else "",
+        )
+    return verdicts
+
+
+class CriteriaEvaluator:
+    """Collects evaluation requests and answers them in batched model calls"""
+
+    def __init__(
+        self,
+        model: str = CRITERIA_MODEL,
+        token_budget: int = BATCH_TOKEN_BUDGET,
+        max_items: int = MAX_BATCH_ITEMS,
+        window: float = BATCH_WINDOW,
+        concurrency: int = CONCURRENCY,
+    ):
+        self.model = model
+        self.token_budget = token_budget
+        self.max_items = max_items
+        self.window = window
+        self._semaphore = asyncio.Semaphore(concurrency)
+        # Requests by key, so identical requests share one item
+        self._pending: dict[tuple[str, str], _Request] = {}
+        self._in_flight: dict[tuple[str, str], _Request] = {}
+        self._full = asyncio.Event()
+        self._batcher: asyncio.Task | None = None
+        self._calls: set[asyncio.Task] = set()
+        self.metrics = {"requests": 0, "cache_hits": 0, "batches": 0, "items": 0, "unparsed": 0, "failed": 0}
+
+    async def evaluate(self, criteria: str, blocks: list[str]) -> Verdict:
+        """Decide whether changed blocks of a page match a scraper's criteria
+
+        Raises CriteriaEvaluationError if the model call fails.
+        """
+        self.metrics["requests"] += 1
+        if not blocks:
+            return Verdict(matched=False)
+        normalized = _normalize_criteria(criteria)
+        if normalized in CHANGE_ONLY_CRITERIA:
+            return Verdict(matched=True, items_found=len(blocks), summary=blocks[0][:200])
+
+        content = _content(blocks)
+        # Digits are kept here: they can decide a match ("more than 100 ...")
+        key = (_digest(normalized), _digest(" ".join(content.casefold().split())))
+        cached = verdict_cache.get(key)
+        if cached is not None:
+            self.metrics["cache_hits"] += 1
+            return cached
+
+        future = asyncio.get_running_loop().create_future()
+        request = self._pending.get(key) or self._in_flight.get(key)
+        if request is None:
+            request = self._pending[key] = _Request(
+                key=key,
+                criteria=criteria.strip(),
+                content=content,
+                tokens=estimate_tokens(_render_item(self.max_items, criteria.strip(), content)),
+            )
+            self._schedule()
+        request.futures.append(future)
+        return await future
+
+    def _schedule(self) -> None:
+        pending_tokens = sum(request.tokens for request in self._pending.values())
+        if (
+            len(self._pending) >= self.max_items
+            or pending_tokens + estimate_tokens(INSTRUCTIONS) >= self.token_budget
+        ):
+            self._full.set()
+        if self._batcher is None or self._batcher.done():
+            self._batcher = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while self._pending:
+            # Wait for the window to collect more requests, unless a batch is full
+            with_full = asyncio.create_task(self._full.wait())
+            await asyncio.wait({with_full}, timeout=self.window)
+            with_full.cancel()
+            self._full.clear()
+            while self._pending:
+                batch = self._take_batch()
+                task = asyncio.create_task(self._evaluate_batch(batch))
+                self._calls.add(task)
+                task.add_done_callback(self._calls.discard)
+
+    def _take_batch(self) -> list[_Request]:
+        batch: list[_Request] = []
+        tokens = estimate_tokens(INSTRUCTIONS)
+        for key, request in list(self._pending.items()):
+            # An oversized item still goes out, alone
+            if batch and (len(batch) >= self.max_items or tokens + request.tokens > self.token_budget):
+                break
+            batch.append(request)
+            tokens += request.tokens
+            del self._pending[key]
+            self._in_flight[key] = request
+        return batch
+
+    async def _evaluate_batch(self, batch: list[_Request]) -> None:
+        prompt = INSTRUCTIONS + "\n" + "\n".join(
+            _render_item(number, request.criteria, request.content)
+            for number, request in enumerate(batch, start=1)
+        )
+        llm = llm_chains.get_llm(
+            self.model,
+            max_new_tokens=ANSWER_TOKENS_PER_ITEM * self.max_items,
+            temperature=0.01,
+        )
+        try:
+            async with self._semaphore:
+                answer = await asyncio.wait_for(llm.ainvoke(prompt), CALL_TIMEOUT)
+        except Exception as e:
+            logging.warning(f"Criteria evaluation of {len(batch)} items failed: {e!r}")
+            self.metrics["failed"] += len(batch)
+            for request in batch:
+                self._in_flight.pop(request.key, None)
+                for future in request.futures:
+                    if not future.done():
+                        # One exception per waiter, as each raises it on its own
+                        error = CriteriaEvaluationError(f"{type(e).__name__}: {e}")
+                        error.__cause__ = e
+                        future.set_exception(error)
+            return
+
+        self.metrics["batches"] += 1
+        self.metrics["items"] += len(batch)
+        verdicts = parse_verdicts(answer if isinstance(answer, str) else str(answer), len(batch))
+        retry = False
+        for number, request in enumerate(batch, start=1):
+            self._in_flight.pop(request.key, None)
+            verdict = verdicts.get(number)
+            if verdict is None:
+                request.attempts += 1
+                if request.attempts < MAX_ATTEMPTS:
+                    self._pending.setdefault(request.key, request)
+                    retry = True
+                    continue
+                self.metrics["unparsed"] += 1
+                logging.warning("Criteria evaluation gave no verdict, treating it as no match")
+                verdict = Verdict(matched=False)
+            else:
+                verdict_cache.set(request.key, verdict)
+            evaluated = replace(verdict, evaluated=True)
+            for future in request.futures:
+                if not future.done():
+                    future.set_result(evaluated)
+        if retry:
+            self._schedule()
+
+
+criteria_evaluator = CriteriaEvaluator()
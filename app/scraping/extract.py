@@ -0,0 +1,30 @@
+"""Text extraction from fetched HTML pages."""
+from bs4 import BeautifulSoup
+
+PREVIEW_LENGTH = 400
+# Elements whose text is never page content
+NON_CONTENT_TAGS = ["script", "style", "noscript", "template", "svg", "iframe"]
+
+
+def parse(html: str) -> BeautifulSoup:
+    soup = BeautifulSoup(html, "html.parser")
+    for tag in soup(NON_CONTENT_TAGS):
+        tag.decompose()
+    return soup
+
+
+def page_title(soup: BeautifulSoup) -> str:
+    if soup.title and soup.title.string:
+        return " ".join(soup.title.string.split())
+    heading = soup.find("h1")
+    return " ".join(heading.get_text(" ").split()) if heading else ""
+
+
+def preview(html: str, length: int = PREVIEW_LENGTH) -> tuple[str, str]:
+    """Get the title and the first length characters of a page's text"""
+    soup = parse(html)
+    body = soup.body or soup
+    text = " ".join(body.get_text(" ").split())
+    if len(text) > length:
+        text = text[: length - 1].rstrip() + "…"
+    return page_title(soup), text
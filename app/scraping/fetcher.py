@@ -0,0 +1,251 @@
+"""Async page fetcher shared by scrape previews and scheduled runs.
+
+One pooled ``httpx.AsyncClient`` per worker keeps connections to scraped hosts
+alive across requests and negotiates compressed transfer (gzip/deflate, plus
+brotli/zstd when their decoders are installed). Requests to the same host are
+capped in concurrency and spaced out by a minimum delay so scheduled runs
+stay polite. Responses carry their ETag/Last-Modified validators; passing
+them back turns the next fetch into a conditional GET that costs a 304 when
+the page hasn't changed (callers keep the validators with the content they
+already have).
+
+URLs come from users, so every hop (the URL and each redirect target) is
+resolved first and refused unless all its addresses are public. Plain HTTP
+requests are then sent to the checked address, so a second DNS answer can't
+point them elsewhere; HTTPS ones can't be rebound to an internal host either,
+as it would fail certificate verification for the requested name.
+SCRAPER_ALLOW_PRIVATE_NETWORKS=1 lifts the check for local development.
+"""
+import asyncio
+import contextlib
+import ipaddress
+import logging
+import os
+import socket
+import time
+from dataclasses import dataclass
+from urllib.parse import urlsplit
+import httpx
+
+USER_AGENT = os.environ.get(
+    "SCRAPER_USER_AGENT", "coJournalist/1.0 (+https://cojournalist.ai)"
+)
+POOL_SIZE = int(os.environ.get("SCRAPER_POOL_SIZE", "50"))
+CONNECT_TIMEOUT = float(os.environ.get("SCRAPER_CONNECT_TIMEOUT_SECONDS", "10"))
+READ_TIMEOUT = float(os.environ.get("SCRAPER_READ_TIMEOUT_SECONDS", "20"))
+PER_HOST_CONCURRENCY = int(os.environ.get("SCRAPER_PER_HOST_CONCURRENCY", "2"))
+# Minimum time between the starts of two requests to the same host
+PER_HOST_DELAY = float(os.environ.get("SCRAPER_PER_HOST_DELAY_SECONDS", "1"))
+MAX_BODY_BYTES = int(os.environ.get("SCRAPER_MAX_BODY_BYTES", str(5 * 1024 * 1024)))
+MAX_REDIRECTS = 5
+ALLOW_PRIVATE_NETWORKS = os.environ.get("SCRAPER_ALLOW_PRIVATE_NETWORKS", "0") == "1"
+
+
+class BlockedURLError(ValueError):
+    """A URL whose host is not a public internet address, or not http(s)"""
+
+
+@dataclass
+class FetchResult:
+    url: str
+    status_code: int | None
+    # True when a conditional GET was answered with 304 Not Modified
+    not_modified: bool = False
+    text: str = ""
+    content_type: str = ""
+    etag: str | None = None
+    last_modified: str | None = None
+    elapsed_ms: int = 0
+    error: str | None = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and (self.not_modified or 200 <= (self.status_code or 0) < 300)
+
+
+class _HostLimiter:
+    """Concurrency cap and request spacing for one host"""
+
+    def __init__(self, concurrency: int, delay: float):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.delay = delay
+        self._next_start = 0.0
+        self._lock = asyncio.Lock()
+
+    @contextlib.asynccontextmanager
+    async def slot(self):
+        async with self.semaphore:
+            async with self._lock:
+                wait = self._next_start - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                self._next_start = time.monotonic() + self.delay
+            yield
+
+
+class Fetcher:
+    """Pooled, per-host limited HTTP fetcher with conditional GETs"""
+
+    def __init__(
+        self,
+        per_host_concurrency: int = PER_HOST_CONCURRENCY,
+        per_host_delay: float = PER_HOST_DELAY,
+        max_body_bytes: int = MAX_BODY_BYTES,
+        transport: httpx.AsyncBaseTransport | None = None,
+        allow_private_networks: bool = ALLOW_PRIVATE_NETWORKS,
+    ):
+        self.per_host_concurrency = per_host_concurrency
+        self.per_host_delay = per_host_delay
+        self.max_body_bytes = max_body_bytes
+        self.allow_private_networks = allow_private_networks
+        self._transport = transport
+        self._client: httpx.AsyncClient | None = None
+        self._hosts: dict[str, _HostLimiter] = {}
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                http2=self._transport is None,
+                transport=self._transport,
+                # Followed by fetch(), which checks every target
+                follow_redirects=False,
+                headers={"User-Agent": USER_AGENT},
+                timeout=httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=POOL_SIZE,
+                    max_keepalive_connections=POOL_SIZE,
+                    keepalive_expiry=30,
+                ),
+            )
+        return self._client
+
+    async def _resolve(self, url: httpx.URL) -> str:
+        """Get the address to connect to for a URL, refusing non-public ones"""
+        if url.scheme not in ("http", "https"):
+            raise BlockedURLError(f"Unsupported URL scheme: {url.scheme or 'none'}")
+        if not url.host:
+            raise BlockedURLError("URL has no host")
+        try:
+            addresses = [ipaddress.ip_address(url.host)]
+        except ValueError:
+            infos = await asyncio.get_running_loop().getaddrinfo(
+                url.host, url.port or (443 if url.scheme == "https" else 80),
+                type=socket.SOCK_STREAM,
+            )
+            # Link-local IPv6 answers carry a %scope suffix
+            addresses = [ipaddress.ip_address(info[4][0].split("%")[0]) for info in infos]
+        if not addresses:
+            raise BlockedURLError(f"{url.host} does not resolve")
+        if not self.allow_private_networks and any(
+            not address.is_global or address.is_multicast for address in addresses
+        ):
+            raise BlockedURLError(f"{url.host} is not a public address")
+        return str(addresses[0])
+
+    async def _send(
+        self, client: httpx.AsyncClient, url: httpx.URL, headers: dict[str, str]
+    ) -> httpx.Response:
+        """Start a GET of url once its host is checked"""
+        address = await self._resolve(url)
+        if url.scheme == "http":
+            request = client.build_request(
+                "GET",
+                url.copy_with(host=address),
+                headers={**headers, "Host": url.netloc.decode("ascii")},
+            )
+        else:
+            request = client.build_request("GET", url, headers=headers)
+        return await client.send(request, stream=True)
+
+    def _host(self, url: str) -> _HostLimiter:
+        host = urlsplit(url).netloc.lower()
+        limiter = self._hosts.get(host)
+        if limiter is None:
+            limiter = self._hosts[host] = _HostLimiter(
+                self.per_host_concurrency, self.per_host_delay
+            )
+        return limiter
+
+    async def fetch(
+        self,
+        url: str,
+        etag: str | None = None,
+        last_modified: str | None = None,
+    ) -> FetchResult:
+        """GET a page, conditionally if validators of a previous fetch are given
+
+        Never raises for network or HTTP errors, or for URLs that are refused
+        (see BlockedURLError); they are reported in FetchResult.error.
+        """
+        if "://" not in url:
+            url = f"https://{url}"
+        headers = {"Accept": "text/html,application/xhtml+xml;q=0.9,*/*;q=0.5"}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+
+        started = time.monotonic()
+        try:
+            async with self._host(url).slot():
+                client = self._get_client()
+                target = httpx.URL(url)
+                response = await self._send(client, target, headers)
+                redirects = 0
+                while response.has_redirect_location:
+                    await response.aclose()
+                    if redirects == MAX_REDIRECTS:
+                        raise httpx.TooManyRedirects(
+                            f"More than {MAX_REDIRECTS} redirects", request=response.request
+                        )
+                    redirects += 1
+                    # Each target is checked again before it is requested
+                    target = target.join(response.headers["location"])
+                    response = await self._send(client, target, headers)
+                try:
+                    result = FetchResult(
+                        url=str(target),
+                        status_code=response.status_code,
+                        content_type=response.headers.get("content-type", ""),
+                        etag=response.headers.get("etag"),
+                        last_modified=response.headers.get("last-modified"),
+                    )
+                    if response.status_code == 304:
+                        result.not_modified = True
+                        result.etag = result.etag or etag
+                        result.last_modified = result.last_modified or last_modified
+                    else:
+                        body = bytearray()
+                        async for chunk in response.aiter_bytes():
+                            body.extend(chunk)
+                            if len(body) > self.max_body_bytes:
+                                raise ValueError(
+                                    f"Page is larger than {self.max_body_bytes} bytes"
+                                )
+                        result.text = bytes(body).decode(response.encoding or "utf-8", errors="replace")
+                        if response.status_code >= 400:
+                            result.error = f"HTTP {response.status_code}"
+                finally:
+                    await response.aclose()
+        except (httpx.HTTPError, httpx.InvalidURL, ValueError, OSError) as e:
+            logging.warning(f"Fetching {url} failed: {e!r}")
+            result = FetchResult(url=url, status_code=None, error=str(e) or type(e).__name__)
+        result.elapsed_ms = int((time.monotonic() - started) * 1000)
+        return result
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+fetcher = Fetcher()
+
+
+@contextlib.asynccontextmanager
+async def lifespan():
+    """Close the fetcher's pooled connections at shutdown"""
+    try:
+        yield
+    finally:
+        await fetcher.close()
@@ -0,0 +1,64 @@
+"""Next run times of scheduled scrapers.
+
+A scraper runs weekly on an ISO weekday (1 = Monday) or monthly on a day of
+the month, at its ``time_utc`` wall-clock time in its ``timezone`` (UTC
+unless set, which is what the column name describes). Monthly days past the
+end of a month run on its last day, and DST gaps and overlaps resolve the
+way ``zoneinfo`` does.
+"""
+import calendar
+from datetime import datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+
+def _zone(name: str | None) -> ZoneInfo | timezone:
+    try:
+        return ZoneInfo(name) if name else timezone.utc
+    except (ZoneInfoNotFoundError, ValueError):
+        return timezone.utc
+
+
+def _parse_time(value: str | time) -> time:
+    if isinstance(value, time):
+        return value
+    return time.fromisoformat(value)
+
+
+def _at(day: datetime, at: time, zone) -> datetime:
+    local = datetime.combine(day.date(), at.replace(tzinfo=None), tzinfo=zone)
+    # Round-trip through UTC to move times inside a DST gap forward
+    return local.astimezone(timezone.utc)
+
+
+def next_execution(
+    regularity: str,
+    day_number: int,
+    time_utc: str | time,
+    tz: str | None = None,
+    after: datetime | None = None,
+) -> datetime:
+    """Get the first run time strictly after a moment (default now), in UTC"""
+    zone = _zone(tz)
+    at = _parse_time(time_utc)
+    after = after or datetime.now(timezone.utc)
+    local_now = after.astimezone(zone)
+
+    if regularity == "weekly":
+        days_ahead = (day_number - local_now.isoweekday()) % 7
+        candidate = _at(local_now + timedelta(days=days_ahead), at, zone)
+        if candidate <= after:
+            candidate = _at(local_now + timedelta(days=days_ahead + 7), at, zone)
+        return candidate
+
+    if regularity == "monthly":
+        year, month = local_now.year, local_now.month
+        for _ in range(2):
+            last_day = calendar.monthrange(year, month)[1]
+            day = datetime(year, month, min(day_number, last_day))
+            candidate = _at(day, at, zone)
+            if candidate > after:
+                return candidate
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return candidate
+
+    raise ValueError(f"Unknown regularity: {regularity!r}")
@@ -0,0 +1,357 @@
+"""Scheduler worker executing due scrapers.
+
+Workers lease batches of due scrapers through ``claim_due_scrapers`` (which
+skips rows other workers are claiming and takes over expired leases), run
+them on a bounded pool, and hand the next run times back in bulk through
+``complete_scraper_runs``. Any number of workers can run side by side, so a
+slot where thousands of weekly jobs fall due is spread across them instead
+of overwhelming one process. Each run fetches conditionally against the
+page's stored snapshot, and only the blocks that changed since are checked
+against the scraper's criteria, in batches shared with other runs. The new
+snapshot is only stored at write-back, once the run's log is safe, so a run
+repeated after a crash still sees the changes the lost one found.
+
+Every run is logged, failed ones included. A failed run is retried after
+SCHEDULER_RETRY_SECONDS, doubling per consecutive failure on this worker up
+to SCHEDULER_MAX_RETRIES, rather than waiting for the next regular slot.
+Scrapers whose schedule can't be computed are logged as failed and parked
+(released with no next_execution) instead of being claimed again and again.
+
+Run standalone with ``python -m app.scraping.scheduler``, or inside the app
+process with SCHEDULER_ENABLED=1.
+"""
+import asyncio
+import contextlib
+import logging
+import os
+import random
+import signal
+import socket
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, TypeAlias
+from app.scraping import changes, schedule
+from app.scraping.criteria import CriteriaEvaluationError, Verdict, criteria_evaluator
+from app.scraping.fetcher import FetchResult, fetcher
+from app.services import repository
+from app.services.execution_recorder import execution_recorder
+from app.services.execution_recorder import lifespan as recorder_lifespan
+from app.services.repository import ClaimedScraper, ScraperSnapshot
+
+WORKER_ID = os.environ.get("SCHEDULER_WORKER_ID") or f"{socket.gethostname()}:{os.getpid()}"
+BATCH_SIZE = int(os.environ.get("SCHEDULER_BATCH_SIZE", "50"))
+CONCURRENCY = int(os.environ.get("SCHEDULER_CONCURRENCY", "20"))
+# Must comfortably exceed the longest run; expired leases are re-claimed
+LEASE_SECONDS = int(os.environ.get("SCHEDULER_LEASE_SECONDS", "600"))
+POLL_INTERVAL = float(os.environ.get("SCHEDULER_POLL_SECONDS", "15"))
+WRITE_BACK_INTERVAL = float(os.environ.get("SCHEDULER_WRITE_BACK_SECONDS", "5"))
+SHUTDOWN_GRACE = float(os.environ.get("SCHEDULER_SHUTDOWN_GRACE_SECONDS", "30"))
+# Changed blocks kept in scraper_executions.result_summary
+DELTA_MAX_BLOCKS = int(os.environ.get("SCHEDULER_DELTA_MAX_BLOCKS", "50"))
+# Credits charged for a run whose changes went to the model
+CREDITS_PER_EVALUATION = int(os.environ.get("SCHEDULER_CREDITS_PER_EVALUATION", "1"))
+# Delay before retrying a failed run, doubled per consecutive failure
+RETRY_DELAY = float(os.environ.get("SCHEDULER_RETRY_SECONDS", "300"))
+MAX_RETRIES = int(os.environ.get("SCHEDULER_MAX_RETRIES", "3"))
+
+# Whether a run succeeded, and the page snapshot to store once it is logged
+RunOutcome: TypeAlias = tuple[bool, ScraperSnapshot | None]
+
+
+async def _evaluate_page(
+    scraper: ClaimedScraper, result: FetchResult, snapshot: ScraperSnapshot | None
+) -> tuple[dict, Verdict | None, ScraperSnapshot]:
+    """Diff a fetched page against the scraper's snapshot and check the
+    changed blocks against its criteria
+
+    Returns the run summary, the verdict and the page's new snapshot, which
+    the caller stores only once the run is logged.
+    """
+    current = await asyncio.to_thread(changes.fingerprint, result.text)
+    verdict = None
+    if snapshot is None:
+        # First run: the page as it is now is the baseline
+        summary = {"changed": False, "baseline": True, "blocks": len(current.blocks)}
+    else:
+        delta = changes.diff(snapshot["block_hashes"], snapshot["simhash"], current)
+        # Raises CriteriaEvaluationError if the model call fails, so no new
+        # snapshot is stored and the retry sees the same changes again
+        verdict = await criteria_evaluator.evaluate(scraper["criteria"], delta.added)
+        summary = {
+            "changed": delta.changed,
+            "added_blocks": len(delta.added),
+            "removed_blocks": delta.removed_count,
+            "simhash_distance": delta.distance,
+            "delta": delta.added[:DELTA_MAX_BLOCKS],
+            "matched": verdict.matched,
+            "match_summary": verdict.summary,
+        }
+    new_snapshot: ScraperSnapshot = {
+        "scraper_id": scraper["id"],
+        "url": result.url,
+        "etag": result.etag,
+        "last_modified": result.last_modified,
+        "simhash": current.simhash,
+        "block_hashes": current.block_hashes,
+    }
+    return summary, verdict, new_snapshot
+
+
+async def run_scraper(scraper: ClaimedScraper) -> RunOutcome:
+    """Fetch a scraper's page, check what changed and log the execution
+
+    Returns whether the run succeeded and the snapshot to store for it.
+    """
+    snapshot = await repository.get_scraper_snapshot(scraper["id"])
+    # handle_scrape stores the scraped URL as the scraper's name
+    result = await fetcher.fetch(
+        scraper["name"],
+        etag=snapshot["etag"] if snapshot else None,
+        last_modified=snapshot["last_modified"] if snapshot else None,
+    )
+    summary = new_snapshot = None
+    success, error = result.ok, result.error
+    items_found = credits_used = 0
+    if result.not_modified:
+        summary = {"changed": False, "not_modified": True}
+    elif result.ok:
+        try:
+            summary, verdict, new_snapshot = await _evaluate_page(scraper, result, snapshot)
+        except CriteriaEvaluationError as e:
+            logging.warning(f"Criteria evaluation for scraper {scraper['id']} failed: {e}")
+            success, error, verdict = False, f"Criteria evaluation failed: {e}"[:1000], None
+        if verdict is not None:
+            items_found = verdict.items_found
+            # Unchanged pages and cached verdicts cost nothing
+            credits_used = CREDITS_PER_EVALUATION if verdict.evaluated else 0
+    execution_recorder.record(
+        scraper["id"],
+        success=success,
+        status_code=result.status_code,
+        error_message=error,
+        items_found=items_found,
+        credits_used=credits_used,
+        execution_time_ms=result.elapsed_ms,
+        result_summary=summary,
+    )
+    return success, new_snapshot
+
+
+class Scheduler:
+    """Claim, run and complete due scrapers until stopped"""
+
+    def __init__(
+        self,
+        worker_id: str = WORKER_ID,
+        batch_size: int = BATCH_SIZE,
+        concurrency: int = CONCURRENCY,
+        lease_seconds: int = LEASE_SECONDS,
+        poll_interval: float = POLL_INTERVAL,
+        run: Callable[[ClaimedScraper], Awaitable[RunOutcome]] = run_scraper,
+        retry_delay: float = RETRY_DELAY,
+        max_retries: int = MAX_RETRIES,
+    ):
+        self.worker_id = worker_id
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.run = run
+        self.retry_delay = retry_delay
+        self.max_retries = max_retries
+        # Consecutive failed runs per scraper on this worker
+        self._failures: dict[str, int] = {}
+        self._running: set[asyncio.Task] = set()
+        # {"scraper_id", "next_execution"} of finished runs awaiting write-back;
+        # next_execution is None for parked scrapers
+        self._completed: list[dict[str, str | None]] = []
+        # Snapshots of finished runs, stored at write-back once their logs are safe
+        self._snapshots: list[ScraperSnapshot] = []
+        self._last_write_back = time.monotonic()
+        self._stopping = asyncio.Event()
+        self.metrics = {
+            "claimed": 0, "succeeded": 0, "failed": 0, "retried": 0, "parked": 0, "written_back": 0
+        }
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+    def _retry_at(self, scraper_id: str, now: datetime) -> datetime | None:
+        """When to retry a scraper whose run just failed, or None once it has
+        failed too often in a row"""
+        failures = self._failures[scraper_id] = self._failures.get(scraper_id, 0) + 1
+        if failures > self.max_retries:
+            del self._failures[scraper_id]
+            return None
+        self.metrics["retried"] += 1
+        return now + timedelta(seconds=self.retry_delay * 2 ** (failures - 1))
+
+    async def _run_one(self, scraper: ClaimedScraper) -> None:
+        started = time.monotonic()
+        try:
+            succeeded, snapshot = await self.run(scraper)
+            if snapshot is not None:
+                self._snapshots.append(snapshot)
+        except Exception as e:
+            logging.exception(f"Scraper {scraper['id']} failed: {e}")
+            execution_recorder.record(
+                scraper["id"],
+                success=False,
+                error_message=f"{type(e).__name__}: {e}"[:1000],
+                credits_used=0,
+                execution_time_ms=int((time.monotonic() - started) * 1000),
+            )
+            succeeded = False
+        if succeeded:
+            self.metrics["succeeded"] += 1
+            self._failures.pop(scraper["id"], None)
+        else:
+            self.metrics["failed"] += 1
+
+        now = datetime.now(timezone.utc)
+        try:
+            # Missed slots (e.g. while no worker was up) are not caught up on
+            next_run = schedule.next_execution(
+                scraper["regularity"],
+                scraper["day_number"],
+                scraper["time_utc"],
+                scraper.get("timezone"),
+                after=now,
+            )
+        except ValueError as e:
+            # Released without a next run, so it is not claimed again until
+            # its schedule is fixed
+            logging.error(f"Cannot schedule scraper {scraper['id']}, parking it: {e}")
+            execution_recorder.record(
+                scraper["id"], success=False, error_message=f"Invalid schedule: {e}", credits_used=0
+            )
+            self.metrics["parked"] += 1
+            self._completed.append({"scraper_id": scraper["id"], "next_execution": None})
+            return
+        if not succeeded:
+            retry_at = self._retry_at(scraper["id"], now)
+            if retry_at is not None:
+                next_run = min(next_run, retry_at)
+        self._completed.append(
+            {"scraper_id": scraper["id"], "next_execution": next_run.isoformat()}
+        )
+
+    async def _write_back(self) -> None:
+        self._last_write_back = time.monotonic()
+        if not self._completed:
+            return
+        runs = self._completed[:]
+        snapshots = self._snapshots[:]
+        # Snapshots are only stored and leases only released once the runs'
+        # logs are safe; otherwise the leases expire and the runs are repeated
+        # against the old snapshots (at least once)
+        if not await execution_recorder.flush():
+            return
+        del self._completed[: len(runs)]
+        del self._snapshots[: len(snapshots)]
+        await self._save_snapshots(snapshots)
+        try:
+            released = await repository.complete_scraper_runs(self.worker_id, runs)
+            self.metrics["written_back"] += len(runs)
+            if released < len(runs):
+                logging.warning(
+                    f"{len(runs) - released} scraper leases had expired before write-back"
+                )
+        except Exception as e:
+            logging.warning(f"Scheduler write-back failed, will retry: {e}")
+            self._completed[:0] = runs
+
+    async def _save_snapshots(self, snapshots: list[ScraperSnapshot]) -> None:
+        # One at a time, so a scraper deleted meanwhile only fails its own
+        results = await asyncio.gather(
+            *(repository.save_scraper_snapshot(snapshot) for snapshot in snapshots),
+            return_exceptions=True,
+        )
+        for snapshot, result in zip(snapshots, results):
+            if isinstance(result, Exception):
+                # The next run diffs against the old snapshot and reports
+                # the same changes again
+                logging.warning(
+                    f"Saving snapshot of scraper {snapshot['scraper_id']} failed: {result}"
+                )
+
+    async def _claim(self) -> int:
+        free = self.concurrency - len(self._running)
+        if free <= 0:
+            return 0
+        limit = min(free, self.batch_size)
+        try:
+            scrapers = await repository.claim_due_scrapers(
+                self.worker_id, limit, self.lease_seconds
+            )
+        except Exception as e:
+            logging.warning(f"Claiming due scrapers failed: {e}")
+            return 0
+        for scraper in scrapers:
+            task = asyncio.create_task(self._run_one(scraper))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+        self.metrics["claimed"] += len(scrapers)
+        # A full batch means more scrapers are probably due right away
+        return len(scrapers) if len(scrapers) == limit else 0
+
+    async def run_forever(self) -> None:
+        logging.info(f"Scheduler {self.worker_id} started")
+        while not self._stopping.is_set():
+            more_due = await self._claim()
+            if (
+                len(self._completed) >= self.batch_size
+                or time.monotonic() - self._last_write_back >= WRITE_BACK_INTERVAL
+            ):
+                await self._write_back()
+            if more_due and len(self._running) < self.concurrency:
+                continue
+            # Wait for a free slot, the next poll (jittered so workers spread
+            # out) or shutdown, whichever comes first
+            waiters = {asyncio.create_task(self._stopping.wait())}
+            timeout = self.poll_interval * random.uniform(0.8, 1.2)
+            if self._running:
+                timeout = min(timeout, WRITE_BACK_INTERVAL)
+            await asyncio.wait(
+                waiters | self._running, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+            for waiter in waiters:
+                waiter.cancel()
+
+        if self._running:
+            await asyncio.wait(self._running, timeout=SHUTDOWN_GRACE)
+        await self._write_back()
+        logging.info(f"Scheduler {self.worker_id} stopped: {self.metrics}")
+
+
+@contextlib.asynccontextmanager
+async def lifespan():
+    """Run a scheduler inside the app process when SCHEDULER_ENABLED=1"""
+    if os.environ.get("SCHEDULER_ENABLED") != "1":
+        yield
+        return
+    scheduler = Scheduler()
+    async with recorder_lifespan():
+        task = asyncio.create_task(scheduler.run_forever())
+        try:
+            yield
+        finally:
+            scheduler.stop()
+            await task
+
+
+async def main() -> None:
+    scheduler = Scheduler()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, scheduler.stop)
+    try:
+        async with recorder_lifespan():
+            await scheduler.run_forever()
+    finally:
+        await fetcher.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -0,0 +1,240 @@
+"""Write-behind persistence of chat transcripts.
+
+Appending a message only puts a row in an in-process buffer, so chatting
+never waits on the database. A background task flushes the buffer as one
+batched upsert when it holds CHAT_PERSIST_BATCH_SIZE rows or every
+CHAT_PERSIST_FLUSH_SECONDS, and once more at shutdown. Rows of a failed flush
+go back to the front of the buffer and are retried with the next flush; rows
+carry app-generated ids, so a retried batch never duplicates messages.
+
+The backend is Supabase by default. CHAT_PERSISTENCE_BACKEND=memory selects
+an in-process stand-in for tests and local development, and =off disables
+persistence.
+"""
+import asyncio
+import contextlib
+import logging
+import os
+import uuid
+from datetime import datetime, timezone
+from typing import Protocol
+from app.services import repository
+from app.services.cache import TTLCache
+from app.services.repository import ChatMessageRow
+
+BATCH_SIZE = int(os.environ.get("CHAT_PERSIST_BATCH_SIZE", "50"))
+FLUSH_INTERVAL = float(os.environ.get("CHAT_PERSIST_FLUSH_SECONDS", "2"))
+# Rows kept while the database is unreachable; the oldest are dropped beyond it
+MAX_BUFFERED = int(os.environ.get("CHAT_PERSIST_MAX_BUFFERED", "10000"))
+# How long a clear keeps dropping messages started before it; comfortably
+# longer than any streamed answer
+CLEAR_CUTOFF_TTL = 3600
+
+
+class ChatBackend(Protocol):
+    async def ensure_conversation(self, user_id: str, mode: str) -> str: ...
+
+    async def insert_messages(self, rows: list[ChatMessageRow]) -> None: ...
+
+    async def delete_messages(self, conversation_id: str, before: str) -> None: ...
+
+    async def recent_messages(self, user_id: str, limit: int) -> dict[str, list[dict]]: ...
+
+
+class SupabaseChatBackend:
+    """chat_conversations and chat_messages tables"""
+
+    async def ensure_conversation(self, user_id: str, mode: str) -> str:
+        return await repository.ensure_conversation(user_id, mode)
+
+    async def insert_messages(self, rows: list[ChatMessageRow]) -> None:
+        await repository.insert_chat_messages(rows)
+
+    async def delete_messages(self, conversation_id: str, before: str) -> None:
+        await repository.delete_chat_messages(conversation_id, before)
+
+    async def recent_messages(self, user_id: str, limit: int) -> dict[str, list[dict]]:
+        return await repository.list_recent_chat_messages(user_id, limit)
+
+
+class MemoryChatBackend:
+    """In-process stand-in with the same behaviour as the Supabase tables"""
+
+    def __init__(self):
+        self.conversations: dict[tuple[str, str], str] = {}
+        self.messages: dict[str, ChatMessageRow] = {}
+
+    async def ensure_conversation(self, user_id: str, mode: str) -> str:
+        return self.conversations.setdefault((user_id, mode), str(uuid.uuid4()))
+
+    async def insert_messages(self, rows: list[ChatMessageRow]) -> None:
+        for row in rows:
+            self.messages.setdefault(row["id"], row)
+
+    async def delete_messages(self, conversation_id: str, before: str) -> None:
+        self.messages = {
+            message_id: row
+            for message_id, row in self.messages.items()
+            if row["conversation_id"] != conversation_id or row["created_at"] > before
+        }
+
+    async def recent_messages(self, user_id: str, limit: int) -> dict[str, list[dict]]:
+        history = {}
+        for (owner, mode), conversation_id in self.conversations.items():
+            if owner != user_id:
+                continue
+            rows = sorted(
+                (row for row in self.messages.values() if row["conversation_id"] == conversation_id),
+                key=lambda row: row["created_at"],
+            )
+            history[mode] = rows[-limit:]
+        return history
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class ChatPersistence:
+    """Buffer of messages waiting to be written, and its flusher"""
+
+    def __init__(
+        self,
+        backend: ChatBackend,
+        batch_size: int = BATCH_SIZE,
+        flush_interval: float = FLUSH_INTERVAL,
+        max_buffered: int = MAX_BUFFERED,
+    ):
+        self.backend = backend
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffered = max_buffered
+        # (user_id, mode, row without conversation_id)
+        self._pending: list[tuple[str, str, dict]] = []
+        # (user_id, mode, cutoff) of conversations cleared since the last flush
+        self._pending_clears: list[tuple[str, str, str]] = []
+        # (user_id, mode) -> cutoff of the conversation's last clear
+        self._cleared_at = TTLCache(ttl=CLEAR_CUTOFF_TTL, maxsize=100_000)
+        self._conversation_ids: dict[tuple[str, str], str] = {}
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+
+    def enqueue(self, user_id: str, mode: str, message: dict, created_at: str | None = None) -> None:
+        """Buffer a message of a user's conversation in a mode
+
+        A message created before the conversation was last cleared, such as
+        an answer that was still streaming, is dropped.
+        """
+        created_at = created_at or _now()
+        cleared_at = self._cleared_at.get((user_id, mode))
+        if cleared_at is not None and created_at <= cleared_at:
+            return
+        self._pending.append(
+            (
+                user_id,
+                mode,
+                {
+                    "id": str(uuid.uuid4()),
+                    "role": message["role"],
+                    "content": message.get("content") or "",
+                    "image": message.get("image"),
+                    "source": message.get("source"),
+                    "prompt_id": message.get("prompt_id"),
+                    "created_at": created_at,
+                },
+            )
+        )
+        if len(self._pending) > self.max_buffered:
+            dropped = len(self._pending) - self.max_buffered
+            del self._pending[:dropped]
+            logging.warning(f"Chat persistence buffer full, dropped {dropped} messages")
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    def clear(self, user_id: str, mode: str) -> None:
+        """Forget a user's conversation in a mode up to now"""
+        self._pending = [
+            entry for entry in self._pending if (entry[0], entry[1]) != (user_id, mode)
+        ]
+        cutoff = _now()
+        self._cleared_at.set((user_id, mode), cutoff)
+        self._pending_clears.append((user_id, mode, cutoff))
+        self._wakeup.set()
+
+    async def _conversation_id(self, user_id: str, mode: str) -> str:
+        key = (user_id, mode)
+        conversation_id = self._conversation_ids.get(key)
+        if conversation_id is None:
+            conversation_id = await self.backend.ensure_conversation(user_id, mode)
+            self._conversation_ids[key] = conversation_id
+        return conversation_id
+
+    async def flush(self) -> None:
+        """Write everything buffered so far, re-buffering it on failure"""
+        async with self._flush_lock:
+            clears, self._pending_clears = self._pending_clears, []
+            batch, self._pending = self._pending, []
+            if not (clears or batch):
+                return
+            try:
+                for user_id, mode, cutoff in clears:
+                    conversation_id = await self._conversation_id(user_id, mode)
+                    await self.backend.delete_messages(conversation_id, cutoff)
+                    clears = clears[1:]
+                rows = [
+                    {**row, "conversation_id": await self._conversation_id(user_id, mode)}
+                    for user_id, mode, row in batch
+                ]
+                for start in range(0, len(rows), self.batch_size):
+                    await self.backend.insert_messages(rows[start : start + self.batch_size])
+                    batch = batch[self.batch_size :]
+            except BaseException as e:
+                # Whatever wasn't written goes back to the front of the buffer
+                self._pending_clears[:0] = clears
+                self._pending[:0] = batch
+                del self._pending[: max(0, len(self._pending) - self.max_buffered)]
+                if not isinstance(e, Exception):
+                    raise
+                logging.warning(f"Chat persistence flush failed, will retry: {e}")
+
+    async def run(self) -> None:
+        """Flush on size or time thresholds until cancelled"""
+        while True:
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            self._wakeup.clear()
+            await self.flush()
+
+    async def restore(self, user_id: str, limit: int) -> dict[str, list[dict]]:
+        """Get the last messages of each of a user's conversations, after
+        writing out any still buffered"""
+        await self.flush()
+        return await self.backend.recent_messages(user_id, limit)
+
+
+def _create() -> ChatPersistence | None:
+    backend = os.environ.get("CHAT_PERSISTENCE_BACKEND", "supabase")
+    if backend == "off":
+        return None
+    if backend == "memory":
+        return ChatPersistence(MemoryChatBackend())
+    return ChatPersistence(SupabaseChatBackend())
+
+
+chat_persistence = _create()
+
+
+@contextlib.asynccontextmanager
+async def lifespan():
+    """Run the flusher while the app is up and flush once more at shutdown"""
+    if chat_persistence is None:
+        yield
+        return
+    task = asyncio.create_task(chat_persistence.run())
+    try:
+        yield
+    finally:
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+        await chat_persistence.flush()
@@ -0,0 +1,242 @@
+"""Server-side store of full chat histories.
+
+Reflex state only keeps a bounded window of the most recent messages per mode
+(see AppState._append_message), so the state synced on every event stays the
+same size however long a conversation gets. Every message is also written
+here, numbered by a per-conversation, per-mode sequence starting at 0, and
+older messages are paged back in from here on request.
+
+The in-memory backend is per worker process; set CHAT_STORE_SQLITE_PATH (one
+host) or CHAT_STORE_REDIS_URL (several hosts) when workers share sessions.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Protocol
+
+# Messages kept in Reflex state per mode, and how many older ones to page in
+CHAT_WINDOW_SIZE = int(os.environ.get("CHAT_WINDOW_SIZE", "40"))
+CHAT_PAGE_SIZE = int(os.environ.get("CHAT_PAGE_SIZE", "20"))
+# Most messages a window may hold after paging older ones in; the next new
+# message trims it back to CHAT_WINDOW_SIZE
+CHAT_MAX_LOADED = int(os.environ.get("CHAT_MAX_LOADED_MESSAGES", "200"))
+MAX_CONVERSATIONS = int(os.environ.get("CHAT_STORE_MAX_CONVERSATIONS", "5000"))
+CONVERSATION_TTL = int(os.environ.get("CHAT_STORE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+
+class ChatStore(Protocol):
+    def append(self, conversation_id: str, mode: str, message: dict[str, Any]) -> int:
+        """Store a message and return its sequence number"""
+        ...
+
+    def update(self, conversation_id: str, mode: str, seq: int, fields: dict[str, Any]) -> None:
+        ...
+
+    def before(self, conversation_id: str, mode: str, seq: int, limit: int) -> list[dict]:
+        """Get up to limit messages preceding seq, oldest first"""
+        ...
+
+    def clear(self, conversation_id: str, mode: str) -> None:
+        ...
+
+
+class MemoryChatStore:
+    """Per-process store, evicting the least recently used conversations
+
+    The sequence numbers an evicted conversation reached are remembered, so a
+    session that keeps chatting carries on numbering where it left off; the
+    evicted messages themselves can't be paged back in.
+    """
+
+    def __init__(self, max_conversations: int = MAX_CONVERSATIONS):
+        self.max_conversations = max_conversations
+        # conversation id -> mode -> (seq of the first message kept, messages)
+        self._conversations: OrderedDict[str, dict[str, tuple[int, list[dict]]]] = OrderedDict()
+        # (conversation id, mode) -> next seq, of evicted conversations
+        self._evicted: OrderedDict[tuple[str, str], int] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _evict(self) -> None:
+        while len(self._conversations) > self.max_conversations:
+            conversation_id, conversation = self._conversations.popitem(last=False)
+            for mode, (start, messages) in conversation.items():
+                self._evicted[(conversation_id, mode)] = start + len(messages)
+        # Only a few ints per conversation, but bounded all the same
+        while len(self._evicted) > self.max_conversations * 10:
+            self._evicted.popitem(last=False)
+
+    def _messages(self, conversation_id: str, mode: str) -> tuple[int, list[dict]]:
+        conversation = self._conversations.get(conversation_id)
+        if conversation is None:
+            conversation = self._conversations[conversation_id] = {}
+            self._evict()
+        else:
+            self._conversations.move_to_end(conversation_id)
+        if mode not in conversation:
+            conversation[mode] = (self._evicted.pop((conversation_id, mode), 0), [])
+        return conversation[mode]
+
+    def append(self, conversation_id: str, mode: str, message: dict[str, Any]) -> int:
+        with self._lock:
+            start, messages = self._messages(conversation_id, mode)
+            messages.append(dict(message))
+            return start + len(messages) - 1
+
+    def update(self, conversation_id: str, mode: str, seq: int, fields: dict[str, Any]) -> None:
+        with self._lock:
+            start, messages = self._messages(conversation_id, mode)
+            if 0 <= seq - start < len(messages):
+                messages[seq - start].update(fields)
+
+    def before(self, conversation_id: str, mode: str, seq: int, limit: int) -> list[dict]:
+        with self._lock:
+            start, messages = self._messages(conversation_id, mode)
+            first = max(start, seq - limit)
+            return [
+                {**message, "seq": i}
+                for i, message in enumerate(messages[first - start : max(0, seq - start)], first)
+            ]
+
+    def clear(self, conversation_id: str, mode: str) -> None:
+        with self._lock:
+            self._messages(conversation_id, mode)
+            self._conversations[conversation_id][mode] = (0, [])
+
+
+class SQLiteChatStore:
+    """Store shared by the workers of one host"""
+
+    def __init__(self, path: str, ttl: int = CONVERSATION_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS chat_messages (
+                conversation_id TEXT NOT NULL,
+                mode TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                message TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (conversation_id, mode, seq)
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_chat_messages_created_at"
+            " ON chat_messages (created_at)"
+        )
+        self._conn.execute(
+            "DELETE FROM chat_messages WHERE created_at < ?", (time.time() - ttl,)
+        )
+        self._conn.commit()
+
+    def append(self, conversation_id: str, mode: str, message: dict[str, Any]) -> int:
+        with self._lock:
+            (seq,) = self._conn.execute(
+                "SELECT COALESCE(MAX(seq) + 1, 0) FROM chat_messages"
+                " WHERE conversation_id = ? AND mode = ?",
+                (conversation_id, mode),
+            ).fetchone()
+            self._conn.execute(
+                "INSERT INTO chat_messages (conversation_id, mode, seq, message, created_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (conversation_id, mode, seq, json.dumps(message), time.time()),
+            )
+            self._conn.commit()
+            return seq
+
+    def update(self, conversation_id: str, mode: str, seq: int, fields: dict[str, Any]) -> None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT message FROM chat_messages"
+                " WHERE conversation_id = ? AND mode = ? AND seq = ?",
+                (conversation_id, mode, seq),
+            ).fetchone()
+            if row is None:
+                return
+            self._conn.execute(
+                "UPDATE chat_messages SET message = ?"
+                " WHERE conversation_id = ? AND mode = ? AND seq = ?",
+                (json.dumps({**json.loads(row[0]), **fields}), conversation_id, mode, seq),
+            )
+            self._conn.commit()
+
+    def before(self, conversation_id: str, mode: str, seq: int, limit: int) -> list[dict]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, message FROM chat_messages"
+                " WHERE conversation_id = ? AND mode = ? AND seq < ?"
+                " ORDER BY seq DESC LIMIT ?",
+                (conversation_id, mode, seq, limit),
+            ).fetchall()
+        return [{**json.loads(message), "seq": seq} for seq, message in reversed(rows)]
+
+    def clear(self, conversation_id: str, mode: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM chat_messages WHERE conversation_id = ? AND mode = ?",
+                (conversation_id, mode),
+            )
+            self._conn.commit()
+
+
+class RedisChatStore:
+    """Store shared by every host, one Redis list per conversation and mode"""
+
+    def __init__(self, url: str, ttl: int = CONVERSATION_TTL):
+        import redis
+
+        self.ttl = ttl
+        self._redis = redis.Redis.from_url(url)
+
+    @staticmethod
+    def _key(conversation_id: str, mode: str) -> str:
+        return f"cojournalist:chat:{conversation_id}:{mode}"
+
+    def append(self, conversation_id: str, mode: str, message: dict[str, Any]) -> int:
+        key = self._key(conversation_id, mode)
+        with self._redis.pipeline() as pipe:
+            pipe.rpush(key, json.dumps(message))
+            pipe.expire(key, self.ttl)
+            length, _ = pipe.execute()
+        return length - 1
+
+    def update(self, conversation_id: str, mode: str, seq: int, fields: dict[str, Any]) -> None:
+        key = self._key(conversation_id, mode)
+        raw = self._redis.lindex(key, seq)
+        if raw is not None:
+            self._redis.lset(key, seq, json.dumps({**json.loads(raw), **fields}))
+
+    def before(self, conversation_id: str, mode: str, seq: int, limit: int) -> list[dict]:
+        if seq <= 0:
+            return []
+        start = max(0, seq - limit)
+        raws = self._redis.lrange(self._key(conversation_id, mode), start, seq - 1)
+        return [{**json.loads(raw), "seq": i} for i, raw in enumerate(raws, start)]
+
+    def clear(self, conversation_id: str, mode: str) -> None:
+        self._redis.delete(self._key(conversation_id, mode))
+
+
+_store: ChatStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> ChatStore:
+    """Get the configured chat store, creating it on first use"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                if os.environ.get("CHAT_STORE_REDIS_URL"):
+                    _store = RedisChatStore(os.environ["CHAT_STORE_REDIS_URL"])
+                elif os.environ.get("CHAT_STORE_SQLITE_PATH"):
+                    _store = SQLiteChatStore(os.environ["CHAT_STORE_SQLITE_PATH"])
+                else:
+                    _store = MemoryChatStore()
+    return _store
@@ -0,0 +1,151 @@
+"""Multi-turn context for upstream prompts, bounded by a token budget.
+
+Recent turns are included newest first until the model's budget is spent.
+Turns that no longer fit are folded into a rolling summary kept per
+conversation and mode. The summary is only ever extended with the turns that
+dropped out since it was last updated, and that update runs in the background,
+so building a prompt costs the same however long the conversation gets.
+"""
+import asyncio
+import logging
+import os
+import re
+from dataclasses import dataclass
+from app.services import chat_store
+from app.services.cache import TTLCache
+from app.services.tokens import estimate_tokens
+
+DEFAULT_TOKEN_BUDGET = int(os.environ.get("CONTEXT_TOKEN_BUDGET", "1500"))
+# Context budget per model or Space id (the prompt, question and answer need
+# room too, so these are well below the models' context windows)
+TOKEN_BUDGETS = {
+    "mistralai/Mistral-7B-Instruct-v0.2": 4000,
+}
+SUMMARY_TOKEN_BUDGET = int(os.environ.get("CONTEXT_SUMMARY_TOKEN_BUDGET", "300"))
+SUMMARY_TTL = float(os.environ.get("CONTEXT_SUMMARY_TTL_SECONDS", "86400"))
+SUMMARY_LINE_LENGTH = 160
+
+# Status messages the app shows in the chat, which aren't conversation turns
+_STATUS_SOURCES = {"System", "System Error", "Error", "API Error", "Busy", "Degraded", "Timeout"}
+
+_summaries = TTLCache(ttl=SUMMARY_TTL, maxsize=10_000)
+_updating: set[tuple[str, str]] = set()
+_tasks: set[asyncio.Task] = set()
+
+
+@dataclass
+class Summary:
+    text: str
+    # Turns with seq below this are covered by the summary
+    upto: int
+
+
+def token_budget(model: str) -> int:
+    return TOKEN_BUDGETS.get(model, DEFAULT_TOKEN_BUDGET)
+
+
+def _is_turn(message: dict) -> bool:
+    return (
+        message.get("role") in ("user", "assistant")
+        and bool(message.get("content"))
+        and message.get("source") not in _STATUS_SOURCES
+    )
+
+
+def _format_turn(message: dict) -> str:
+    speaker = "User" if message["role"] == "user" else "Assistant"
+    return f"{speaker}: {message['content'].strip()}"
+
+
+def _summary_line(message: dict) -> str:
+    text = " ".join(message["content"].split())
+    first_sentence = re.split(r"(?<=[.!?])\s", text, maxsplit=1)[0]
+    if len(first_sentence) > SUMMARY_LINE_LENGTH:
+        first_sentence = first_sentence[: SUMMARY_LINE_LENGTH - 1].rstrip() + "…"
+    speaker = "User" if message["role"] == "user" else "Assistant"
+    return f"- {speaker}: {first_sentence}"
+
+
+def extend_summary(summary: str, messages: list[dict]) -> str:
+    """Append one line per turn to a summary, dropping its oldest lines to
+    stay within SUMMARY_TOKEN_BUDGET"""
+    lines = summary.splitlines() if summary else []
+    lines.extend(_summary_line(message) for message in messages if _is_turn(message))
+    while lines and estimate_tokens("\n".join(lines)) > SUMMARY_TOKEN_BUDGET:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+async def _update_summary(conversation_id: str, mode: str, upto: int) -> None:
+    key = (conversation_id, mode)
+    try:
+        current = _summaries.get(key) or Summary(text="", upto=0)
+        if upto <= current.upto:
+            return
+        messages = await asyncio.to_thread(
+            chat_store.get_store().before, conversation_id, mode, upto, upto - current.upto
+        )
+        _summaries.set(key, Summary(text=extend_summary(current.text, messages), upto=upto))
+    except Exception as e:
+        logging.warning(f"Could not update conversation summary: {e}")
+    finally:
+        _updating.discard(key)
+
+
+def build_context(conversation_id: str, mode: str, history: list[dict], model: str) -> str:
+    """Render the earlier turns of a conversation for the next prompt
+
+    history is the mode's message window (with seq numbers), oldest first and
+    without the question being asked. Returns "" for a new conversation.
+    """
+    budget = token_budget(model)
+    summary: Summary | None = _summaries.get((conversation_id, mode))
+    summary_text = ""
+    if summary and summary.text:
+        # The summary never takes more than half of the budget
+        lines = summary.text.splitlines()
+        while lines and estimate_tokens("\n".join(lines)) > budget // 2:
+            lines.pop(0)
+        summary_text = "\n".join(lines)
+        budget -= estimate_tokens(summary_text)
+
+    turns: list[str] = []
+    first_included = history[-1]["seq"] + 1 if history else 0
+    for message in reversed(history):
+        if summary and message["seq"] < summary.upto:
+            break
+        if not _is_turn(message):
+            first_included = message["seq"]
+            continue
+        turn = _format_turn(message)
+        cost = estimate_tokens(turn)
+        if cost > budget:
+            break
+        budget -= cost
+        turns.append(turn)
+        first_included = message["seq"]
+    else:
+        # The whole window fit; anything before it is left to the summary
+        first_included = history[0]["seq"] if history else 0
+
+    # Fold turns that fell out of the budget into the summary for next time
+    key = (conversation_id, mode)
+    if first_included > (summary.upto if summary else 0) and key not in _updating:
+        _updating.add(key)
+        task = asyncio.get_running_loop().create_task(
+            _update_summary(conversation_id, mode, first_included)
+        )
+        _tasks.add(task)
+        task.add_done_callback(_tasks.discard)
+
+    sections = []
+    if summary_text:
+        sections.append(f"Summary of the earlier conversation:\n{summary_text}")
+    if turns:
+        sections.append("Recent conversation:\n" + "\n".join(reversed(turns)))
+    return "\n\n".join(sections)
+
+
+def forget(conversation_id: str, mode: str) -> None:
+    """Drop the summary of a conversation that was cleared"""
+    _summaries.delete((conversation_id, mode))
@@ -0,0 +1,154 @@
+"""Per-mode admission control for upstream model calls.
+
+Each mode gets a bounded number of concurrent upstream calls (Space jobs or
+Inference API streams). Requests beyond that wait in a queue that is served
+round-robin across users, so one busy session can't starve the others, and
+waiting requests are told their position. When a mode's queue is already
+full, new requests are rejected straight away rather than left to time out.
+"""
+import asyncio
+import logging
+import os
+from collections import OrderedDict, deque
+from typing import AsyncIterator
+
+DEFAULT_MAX_CONCURRENCY = {
+    "SCRAPE": 8,
+    "DATA": 4,
+    "INVESTIGATE": 4,
+    "FACT-CHECK": 4,
+    "GRAPHICS": 2,
+}
+DEFAULT_MAX_QUEUE = int(os.environ.get("DISPATCH_MAX_QUEUE", "32"))
+
+
+class QueueFullError(RuntimeError):
+    """A mode has no free slot and its queue is too deep to wait in"""
+
+
+def _mode_setting(name: str, mode: str, default: int) -> int:
+    env_name = f"DISPATCH_{name}_{mode.replace('-', '_')}"
+    return int(os.environ.get(env_name, default))
+
+
+class ModeDispatcher:
+    """Concurrency limit and fair queue of one mode"""
+
+    def __init__(self, mode: str, max_concurrency: int, max_queue: int):
+        self.mode = mode
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.active = 0
+        # Waiting requests per user, users served in rotation
+        self._queues: OrderedDict[str, deque[asyncio.Future]] = OrderedDict()
+        self._changed = asyncio.Event()
+        self.metrics = {"admitted": 0, "queued": 0, "shed": 0}
+
+    def queue_depth(self) -> int:
+        return sum(len(queue) for queue in self._queues.values())
+
+    def position(self, waiter: asyncio.Future) -> int | None:
+        """How many queued requests will be admitted before this one"""
+        queues = list(self._queues.values())
+        position = 0
+        for turn in range(max(map(len, queues), default=0)):
+            for queue in queues:
+                if turn < len(queue):
+                    if queue[turn] is waiter:
+                        return position
+                    position += 1
+        return None
+
+    def _notify(self) -> None:
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def _admit_waiting(self) -> None:
+        while self.active < self.max_concurrency and self._queues:
+            user_key, queue = next(iter(self._queues.items()))
+            waiter = queue.popleft()
+            if queue:
+                self._queues.move_to_end(user_key)
+            else:
+                del self._queues[user_key]
+            if waiter.done():
+                continue
+            self.active += 1
+            waiter.set_result(None)
+        self._notify()
+
+    def _release(self) -> None:
+        self.active -= 1
+        self._admit_waiting()
+
+    def _dequeue(self, user_key: str, waiter: asyncio.Future) -> None:
+        queue = self._queues.get(user_key)
+        if queue is None or waiter not in queue:
+            return
+        queue.remove(waiter)
+        if not queue:
+            del self._queues[user_key]
+        self._notify()
+
+    async def run(self, user_key: str, updates: AsyncIterator[dict]) -> AsyncIterator[dict]:
+        """Iterate updates once a slot is free
+
+        While waiting, yields {"queue_position": n} updates. Raises
+        QueueFullError without waiting if the queue is full.
+        """
+        if self.active < self.max_concurrency and not self._queues:
+            self.active += 1
+        else:
+            if self.queue_depth() >= self.max_queue:
+                self.metrics["shed"] += 1
+                logging.warning(f"Shedding {self.mode} request, {self.queue_depth()} already queued")
+                raise QueueFullError(f"{self.mode} is at capacity")
+            waiter = asyncio.get_running_loop().create_future()
+            self._queues.setdefault(user_key, deque()).append(waiter)
+            self.metrics["queued"] += 1
+            try:
+                last_position = None
+                while not waiter.done():
+                    changed = self._changed
+                    position = self.position(waiter)
+                    if position is not None and position != last_position:
+                        last_position = position
+                        yield {"queue_position": position + 1}
+                    await changed.wait()
+            except BaseException:
+                if waiter.done():
+                    self._release()
+                else:
+                    waiter.cancel()
+                    self._dequeue(user_key, waiter)
+                raise
+        self.metrics["admitted"] += 1
+        try:
+            async for update in updates:
+                yield update
+        finally:
+            self._release()
+
+
+_dispatchers: dict[str, ModeDispatcher] = {}
+
+
+def get_dispatcher(mode: str) -> ModeDispatcher:
+    """Get the dispatcher of a mode (DISPATCH_MAX_CONCURRENCY_<MODE> and
+    DISPATCH_MAX_QUEUE_<MODE> override the defaults)"""
+    dispatcher = _dispatchers.get(mode)
+    if dispatcher is None:
+        dispatcher = ModeDispatcher(
+            mode,
+            max_concurrency=_mode_setting(
+                "MAX_CONCURRENCY", mode, DEFAULT_MAX_CONCURRENCY.get(mode, 4)
+            ),
+            max_queue=_mode_setting("MAX_QUEUE", mode, DEFAULT_MAX_QUEUE),
+        )
+        _dispatchers[mode] = dispatcher
+    return dispatcher
+
+
+def run(mode: str, user_key: str, updates: AsyncIterator[dict]) -> AsyncIterator[dict]:
+    """Iterate a mode's upstream updates within its concurrency limit"""
+    return get_dispatcher(mode).run(user_key, updates)
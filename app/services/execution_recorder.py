@@ -0,0 +1,206 @@
+"""Buffered logging of scraper runs to scraper_executions.
+
+Runs are collected in memory and written in batches through the set-based
+record_scraper_executions function, when EXECUTION_LOG_BATCH_SIZE rows are
+waiting or every EXECUTION_LOG_FLUSH_SECONDS. Delivery is at least once:
+every row carries an app-generated id the database deduplicates on, so a
+batch is simply sent again when its outcome is unknown.
+
+Batches that can't be written (Supabase unreachable) are spilled to a SQLite
+file at EXECUTION_LOG_SPILL_PATH and replayed by later flushes, including
+those of other processes on the host after a restart. A flush reports
+whether its rows reached the database or disk, so callers only acknowledge
+runs whose logs are safe.
+"""
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import uuid
+from datetime import datetime, timezone
+from app.services import repository
+from app.services.repository import ExecutionRow
+
+BATCH_SIZE = int(os.environ.get("EXECUTION_LOG_BATCH_SIZE", "200"))
+FLUSH_INTERVAL = float(os.environ.get("EXECUTION_LOG_FLUSH_SECONDS", "5"))
+SPILL_PATH = os.environ.get(
+    "EXECUTION_LOG_SPILL_PATH",
+    os.path.join(tempfile.gettempdir(), "cojournalist-executions-spill.sqlite3"),
+)
+
+
+class SpillFile:
+    """Rows waiting on disk for the database to come back"""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS executions (id TEXT PRIMARY KEY, row TEXT NOT NULL)"
+        )
+        self._conn.commit()
+
+    def add(self, rows: list[ExecutionRow]) -> None:
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO executions (id, row) VALUES (?, ?)",
+                [(row["id"], json.dumps(row)) for row in rows],
+            )
+            self._conn.commit()
+
+    def peek(self, limit: int) -> list[ExecutionRow]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT row FROM executions ORDER BY rowid LIMIT ?", (limit,)
+            ).fetchall()
+        return [json.loads(row) for (row,) in rows]
+
+    def remove(self, ids: list[str]) -> None:
+        with self._lock:
+            self._conn.executemany("DELETE FROM executions WHERE id = ?", [(i,) for i in ids])
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM executions").fetchone()[0]
+
+
+class ExecutionRecorder:
+    """Buffer of scraper runs waiting to be logged, and its flusher"""
+
+    def __init__(
+        self,
+        spill_path: str | None = SPILL_PATH,
+        batch_size: int = BATCH_SIZE,
+        flush_interval: float = FLUSH_INTERVAL,
+    ):
+        self.spill_path = spill_path
+        self._spill: SpillFile | None = None
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._pending: list[ExecutionRow] = []
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self.metrics = {"recorded": 0, "written": 0, "duplicates": 0, "spilled": 0}
+
+    def record(
+        self,
+        scraper_id: str,
+        success: bool,
+        status_code: int | None = None,
+        error_message: str | None = None,
+        items_found: int = 0,
+        credits_used: int = 1,
+        execution_time_ms: int | None = None,
+        result_summary: dict | None = None,
+    ) -> None:
+        """Buffer the outcome of a scraper run"""
+        self._pending.append(
+            {
+                "id": str(uuid.uuid4()),
+                "scraper_id": scraper_id,
+                "executed_at": datetime.now(timezone.utc).isoformat(),
+                "success": success,
+                "status_code": status_code,
+                "error_message": error_message,
+                "items_found": items_found,
+                "credits_used": credits_used,
+                "execution_time_ms": execution_time_ms,
+                "result_summary": result_summary,
+            }
+        )
+        self.metrics["recorded"] += 1
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    def _get_spill(self) -> SpillFile | None:
+        if self._spill is None and self.spill_path:
+            try:
+                self._spill = SpillFile(self.spill_path)
+            except sqlite3.Error as e:
+                logging.warning(f"Cannot open execution spill file {self.spill_path}: {e}")
+        return self._spill
+
+    async def _write(self, rows: list[ExecutionRow]) -> None:
+        written = await repository.record_executions(rows)
+        self.metrics["written"] += written
+        self.metrics["duplicates"] += len(rows) - written
+
+    async def _replay_spill(self, spill: SpillFile) -> None:
+        while True:
+            rows = await asyncio.to_thread(spill.peek, self.batch_size)
+            if not rows:
+                return
+            await self._write(rows)
+            await asyncio.to_thread(spill.remove, [row["id"] for row in rows])
+            logging.info(f"Replayed {len(rows)} spilled scraper executions")
+
+    async def _spill_rows(self, spill: SpillFile | None, rows: list[ExecutionRow]) -> bool:
+        if spill is not None:
+            try:
+                await asyncio.to_thread(spill.add, rows)
+                self.metrics["spilled"] += len(rows)
+                return True
+            except sqlite3.Error as e:
+                logging.warning(f"Spilling scraper executions failed: {e}")
+            except BaseException:
+                # The rows may be on disk already; duplicates are dropped by id
+                self._pending[:0] = rows
+                raise
+        self._pending[:0] = rows
+        return False
+
+    async def flush(self) -> bool:
+        """Write everything buffered so far
+
+        If the database is unreachable the rows are spilled to disk, or kept
+        in memory without a usable spill file. Returns whether every row
+        recorded before the call is now in the database or on disk.
+        """
+        async with self._flush_lock:
+            # Opened off the event loop, before any rows leave the buffer
+            spill = await asyncio.to_thread(self._get_spill)
+            batch, self._pending = self._pending, []
+            try:
+                while batch:
+                    await self._write(batch[: self.batch_size])
+                    batch = batch[self.batch_size :]
+                if spill is not None:
+                    await self._replay_spill(spill)
+                return True
+            except Exception as e:
+                logging.warning(f"Logging scraper executions failed, will retry: {e}")
+                return not batch or await self._spill_rows(spill, batch)
+            except BaseException:
+                # A cancelled flush puts its rows back for the next one
+                self._pending[:0] = batch
+                raise
+
+    async def run(self) -> None:
+        """Flush on size or time thresholds until cancelled"""
+        while True:
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            self._wakeup.clear()
+            await self.flush()
+
+
+execution_recorder = ExecutionRecorder()
+
+
+@contextlib.asynccontextmanager
+async def lifespan():
+    """Run the flusher while the process is up and flush once more at exit"""
+    task = asyncio.create_task(execution_recorder.run())
+    try:
+        yield
+    finally:
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+        await execution_recorder.flush()
@@ -0,0 +1,292 @@
+"""Process-wide pool of gradio_client connections to the Hugging Face Spaces.
+
+Constructing a ``gradio_client.Client`` fetches the Space config and API info
+over HTTP, so each Space gets one lazily created client per worker that is
+reused by every session. Predictions are submitted as gradio jobs whose
+outputs are streamed without blocking the event loop.
+
+Every call is bounded by connect, read (time between outputs, once a first
+one arrived) and total timeouts, and outages (transport errors, timeouts, 5xx responses) are retried
+with jittered exponential backoff. Each Space also has a circuit breaker:
+after repeated outages calls fail fast for a while, then a single probe is let
+through to test recovery. Errors raised by a Space's app don't count.
+"""
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from typing import Any, AsyncIterator, Literal
+import httpx
+from gradio_client import Client
+
+SPACE_URL_PREFIX = "https://huggingface.co/spaces/"
+
+HF_SPACE_URLS = {
+    "GRAPHICS": "https://huggingface.co/spaces/coJournalist/cojournalist-graphics",
+    "INVESTIGATE": "https://huggingface.co/spaces/coJournalist/cojournalist-investigate",
+    "FACT-CHECK": "https://huggingface.co/spaces/coJournalist/coJournalist-Fact-Check",
+    "DATA": "https://huggingface.co/spaces/coJournalist/cojournalist-data",
+    "SCRAPE": "",
+}
+
+# How often a running job is checked for new outputs while streaming
+STREAM_POLL_INTERVAL = float(os.environ.get("HF_SPACE_STREAM_POLL_SECONDS", "0.1"))
+
+CONNECT_TIMEOUT = float(os.environ.get("HF_SPACE_CONNECT_TIMEOUT_SECONDS", "10"))
+# Longest wait for the next output of a job that has produced one. Endpoints
+# that aren't generators only produce their result, so until then only
+# TOTAL_TIMEOUT applies
+READ_TIMEOUT = float(os.environ.get("HF_SPACE_READ_TIMEOUT_SECONDS", "60"))
+TOTAL_TIMEOUT = float(os.environ.get("HF_SPACE_TOTAL_TIMEOUT_SECONDS", "180"))
+MAX_RETRIES = int(os.environ.get("HF_SPACE_MAX_RETRIES", "2"))
+BACKOFF_BASE = float(os.environ.get("HF_SPACE_BACKOFF_BASE_SECONDS", "0.5"))
+BACKOFF_MAX = float(os.environ.get("HF_SPACE_BACKOFF_MAX_SECONDS", "8"))
+BREAKER_FAILURE_THRESHOLD = int(os.environ.get("HF_SPACE_BREAKER_FAILURES", "5"))
+BREAKER_RECOVERY_SECONDS = float(os.environ.get("HF_SPACE_BREAKER_RECOVERY_SECONDS", "30"))
+
+# Errors worth retrying on a fresh connection
+TRANSIENT_ERRORS = (httpx.TransportError, ConnectionError, TimeoutError, asyncio.TimeoutError)
+
+BreakerState = Literal["closed", "open", "half_open"]
+
+
+class CircuitOpenError(RuntimeError):
+    """A Space's circuit breaker is open, so the call was not attempted"""
+
+    def __init__(self, space_id: str, retry_in: float):
+        super().__init__(f"Space {space_id} is unavailable, retrying in {retry_in:.0f}s")
+        self.space_id = space_id
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """Closed, open or half-open (letting a single probe call through)"""
+
+    def __init__(
+        self,
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        recovery_seconds: float = BREAKER_RECOVERY_SECONDS,
+    ):
+        self.failure_threshold = failure_threshold
+        self.recovery_seconds = recovery_seconds
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.probing = False
+
+    @property
+    def state(self) -> BreakerState:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.recovery_seconds:
+            return "half_open"
+        return "open"
+
+    def retry_in(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.opened_at + self.recovery_seconds - time.monotonic())
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == "closed":
+            return True
+        if state == "half_open" and not self.probing:
+            self.probing = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.probing or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+        self.probing = False
+
+
+_clients: dict[str, Client] = {}
+_locks: dict[str, threading.Lock] = {}
+_locks_lock = threading.Lock()
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+def space_id_from_url(space_url: str | None) -> str | None:
+    """Turn a huggingface.co/spaces URL into a Space id, or None if it isn't one"""
+    if not space_url or not space_url.startswith(SPACE_URL_PREFIX):
+        return None
+    return space_url.replace(SPACE_URL_PREFIX, "")
+
+
+def _space_lock(space_id: str) -> threading.Lock:
+    with _locks_lock:
+        return _locks.setdefault(space_id, threading.Lock())
+
+
+def get_space_client(space_id: str) -> Client:
+    """Get the shared client of a Space, connecting on first use (blocking)"""
+    client = _clients.get(space_id)
+    if client is not None:
+        return client
+    with _space_lock(space_id):
+        client = _clients.get(space_id)
+        if client is None:
+            client = Client(
+                space_id,
+                token=os.environ.get("HUGGINGFACE_API_KEY"),
+                verbose=False,
+                httpx_kwargs={"timeout": httpx.Timeout(READ_TIMEOUT, connect=CONNECT_TIMEOUT)},
+            )
+            _clients[space_id] = client
+            logging.info(f"Connected to Hugging Face Space {space_id}")
+        return client
+
+
+def reset_space_client(space_id: str) -> None:
+    """Forget a Space's client so the next call reconnects"""
+    with _space_lock(space_id):
+        _clients.pop(space_id, None)
+
+
+def get_breaker(space_id: str) -> CircuitBreaker:
+    breaker = _breakers.get(space_id)
+    if breaker is None:
+        breaker = _breakers[space_id] = CircuitBreaker()
+    return breaker
+
+
+def breaker_state(space_id: str) -> BreakerState:
+    """Circuit breaker state of a Space ("closed" when it was never called)"""
+    breaker = _breakers.get(space_id)
+    return breaker.state if breaker else "closed"
+
+
+def degraded_modes(space_urls: dict[str, str]) -> list[str]:
+    """Modes whose Space is failing fast or being probed for recovery"""
+    return [
+        mode
+        for mode, space_url in space_urls.items()
+        if (space_id := space_id_from_url(space_url))
+        and breaker_state(space_id) != "closed"
+    ]
+
+
+def _is_outage(error: Exception) -> bool:
+    """Whether an error means the Space is unreachable or broken (transport
+    errors, timeouts, 5xx) rather than that it rejected the request"""
+    if isinstance(error, TRANSIENT_ERRORS):
+        return True
+    return isinstance(error, httpx.HTTPStatusError) and error.response.status_code >= 500
+
+
+def _backoff(attempt: int) -> float:
+    """Full-jitter exponential backoff before retry number attempt + 1"""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2**attempt))
+
+
+def _admit(space_id: str) -> CircuitBreaker:
+    breaker = get_breaker(space_id)
+    if not breaker.allow():
+        raise CircuitOpenError(space_id, breaker.retry_in())
+    return breaker
+
+
+def _fail(space_id: str, breaker: CircuitBreaker, job=None) -> None:
+    if job is not None:
+        job.cancel()
+    reset_space_client(space_id)
+    breaker.record_failure()
+
+
+def _abandon(breaker: CircuitBreaker, job=None) -> None:
+    """Give up on a call that was cancelled rather than failed"""
+    if job is not None:
+        job.cancel()
+    breaker.probing = False
+
+
+async def _connect(space_id: str) -> Client:
+    return await asyncio.wait_for(
+        asyncio.to_thread(get_space_client, space_id), timeout=CONNECT_TIMEOUT * 3
+    )
+
+
+async def stream(space_id: str, **kwargs: Any) -> AsyncIterator[Any]:
+    """Run a prediction on a Space, yielding outputs as the job produces them
+
+    Generator endpoints yield every intermediate output; other endpoints yield
+    their final result once. Outages (dropped connections, timeouts, 5xx)
+    reset the Space's client, count towards its circuit breaker and, before
+    the first output, are retried up to MAX_RETRIES times. Errors raised by
+    the Space's app are raised as is. Raises CircuitOpenError while the Space
+    is failing fast.
+    """
+    for attempt in range(MAX_RETRIES + 1):
+        breaker = _admit(space_id)
+        job = None
+        yielded = False
+        try:
+            started = last_progress = time.monotonic()
+            client = await _connect(space_id)
+            job = client.submit(**kwargs)
+            future = asyncio.wrap_future(job)
+            seen = 0
+            last_output = None
+            while True:
+                done, _ = await asyncio.wait({future}, timeout=STREAM_POLL_INTERVAL)
+                outputs = list(job.outputs())
+                now = time.monotonic()
+                if len(outputs) > seen:
+                    last_progress = now
+                for output in outputs[seen:]:
+                    last_output = output
+                    yielded = True
+                    yield output
+                seen = len(outputs)
+                if done:
+                    break
+                if seen and now - last_progress > READ_TIMEOUT:
+                    raise TimeoutError(f"No output from Space {space_id} in {READ_TIMEOUT:.0f}s")
+                if now - started > TOTAL_TIMEOUT:
+                    raise TimeoutError(f"Space {space_id} did not finish in {TOTAL_TIMEOUT:.0f}s")
+            result = future.result()
+            if seen == 0 or result != last_output:
+                yield result
+        except Exception as e:
+            if not _is_outage(e):
+                # The Space answered, with an error of the app: it is up, and
+                # its client still works
+                breaker.record_success()
+                raise
+            _fail(space_id, breaker, job)
+            if yielded or attempt == MAX_RETRIES:
+                raise
+            delay = _backoff(attempt)
+            logging.warning(f"Call to Space {space_id} failed, retrying in {delay:.1f}s: {e!r}")
+            await asyncio.sleep(delay)
+        except BaseException:
+            _abandon(breaker, job)
+            raise
+        else:
+            breaker.record_success()
+            return
+
+
+async def warm_up():
+    """Connect to every configured Space in the background at app start"""
+    space_ids = [
+        space_id
+        for space_id in map(space_id_from_url, HF_SPACE_URLS.values())
+        if space_id
+    ]
+    results = await asyncio.gather(
+        *(asyncio.to_thread(get_space_client, space_id) for space_id in space_ids),
+        return_exceptions=True,
+    )
+    for space_id, result in zip(space_ids, results):
+        if isinstance(result, Exception):
+            logging.warning(f"Could not warm up Space {space_id}: {result}")
@@ -0,0 +1,70 @@
+"""Memoized LangChain chains for the Hugging Face Inference API.
+
+Building a ``HuggingFaceEndpoint`` creates new inference clients, and with them
+a new HTTP session. Endpoints are therefore built once per (model, generation
+params) and shared by every chain, and each chain is built once per
+(model, prompt version, generation params). Both caches are LRU-bounded.
+"""
+import functools
+import os
+from langchain_core.runnables import Runnable
+from app.prompts.registry import Prompt
+
+DEFAULT_REPO_ID = "mistralai/Mistral-7B-Instruct-v0.2"
+DEFAULT_MAX_NEW_TOKENS = 128
+DEFAULT_TEMPERATURE = 0.7
+CHAIN_CACHE_SIZE = int(os.environ.get("LLM_CHAIN_CACHE_SIZE", "32"))
+
+
+@functools.lru_cache(maxsize=CHAIN_CACHE_SIZE)
+def _get_llm(repo_id: str, max_new_tokens: int, temperature: float):
+    from langchain_huggingface import HuggingFaceEndpoint
+
+    return HuggingFaceEndpoint(
+        repo_id=repo_id,
+        max_new_tokens=max_new_tokens,
+        temperature=temperature,
+        streaming=True,
+        huggingfacehub_api_token=os.environ.get("HUGGINGFACE_API_KEY"),
+    )
+
+
+@functools.lru_cache(maxsize=CHAIN_CACHE_SIZE)
+def _build_chain(
+    repo_id: str,
+    prompt_id: str,
+    prompt_text: str,
+    max_new_tokens: int,
+    temperature: float,
+) -> Runnable:
+    from langchain_core.prompts import PromptTemplate
+
+    # context is either "" or earlier turns followed by a blank line
+    template = f"{prompt_text}\n\n{{context}}User question: '{{question}}'"
+    prompt_template = PromptTemplate(template=template, input_variables=["context", "question"])
+    return prompt_template | _get_llm(repo_id, max_new_tokens, temperature)
+
+
+def get_chain(
+    prompt: Prompt,
+    repo_id: str = DEFAULT_REPO_ID,
+    max_new_tokens: int = DEFAULT_MAX_NEW_TOKENS,
+    temperature: float = DEFAULT_TEMPERATURE,
+) -> Runnable:
+    """Get the shared chain answering questions with a given system prompt"""
+    return _build_chain(repo_id, prompt.id, prompt.text, max_new_tokens, temperature)
+
+
+def get_llm(
+    repo_id: str = DEFAULT_REPO_ID,
+    max_new_tokens: int = DEFAULT_MAX_NEW_TOKENS,
+    temperature: float = DEFAULT_TEMPERATURE,
+):
+    """Get the shared endpoint of a model, for callers that build their own prompts"""
+    return _get_llm(repo_id, max_new_tokens, temperature)
+
+
+def clear_chains() -> None:
+    """Drop every memoized chain and endpoint"""
+    _build_chain.cache_clear()
+    _get_llm.cache_clear()
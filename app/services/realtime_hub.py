@@ -0,0 +1,266 @@
+"""Push of scraper changes to connected sessions through Supabase Realtime.
+
+Each worker holds one Realtime channel, on the shared admin client's
+websocket, subscribed to scheduled_scrapers, scraper_execution_stats and
+scraper_executions changes. Changes are routed by owning user to the queues
+of that user's sessions on this worker, which apply them to their state from
+a background listener event. Nothing is polled: a session only queries again
+(a "resync") after its queue overflowed or the channel had to reconnect and
+may have missed changes.
+"""
+import asyncio
+import contextlib
+import logging
+import os
+import random
+from typing import Any
+from realtime import RealtimePostgresChangesListenEvent, RealtimeSubscribeStates
+from app.services import repository, supabase_clients
+from app.services.cache import TTLCache
+
+REALTIME_ENABLED = os.environ.get("REALTIME_ENABLED", "1") == "1"
+CHANNEL_TOPIC = "scraper-changes"
+TABLES = ("scheduled_scrapers", "scraper_execution_stats", "scraper_executions")
+# Changes waiting for a session before it is told to resync instead
+SESSION_QUEUE_SIZE = int(os.environ.get("REALTIME_SESSION_QUEUE_SIZE", "200"))
+RECONNECT_BACKOFF_BASE = float(os.environ.get("REALTIME_RECONNECT_BACKOFF_SECONDS", "1"))
+RECONNECT_BACKOFF_MAX = float(os.environ.get("REALTIME_RECONNECT_BACKOFF_MAX_SECONDS", "60"))
+OWNER_CACHE_TTL = float(os.environ.get("REALTIME_OWNER_CACHE_TTL_SECONDS", "3600"))
+# Owner lookups of uncached scrapers running at once, off the routing loop
+OWNER_LOOKUP_CONCURRENCY = int(os.environ.get("REALTIME_OWNER_LOOKUP_CONCURRENCY", "8"))
+
+# Put on a session's queue instead of the changes it missed
+RESYNC = {"type": "RESYNC"}
+
+
+class RealtimeHub:
+    """One Realtime subscription per worker, fanned out to user sessions"""
+
+    def __init__(self):
+        # users.id -> client token -> queue of that session
+        self._sessions: dict[str, dict[str, asyncio.Queue]] = {}
+        # scraper id -> users.id, to route rows that only carry a scraper_id
+        self._owners = TTLCache(ttl=OWNER_CACHE_TTL, maxsize=100_000)
+        # scraper id -> changes waiting for that scraper's owner lookup
+        self._awaiting_owner: dict[str, list[dict]] = {}
+        self._lookups: set[asyncio.Task] = set()
+        self._lookup_slots = asyncio.Semaphore(OWNER_LOOKUP_CONCURRENCY)
+        self._inbox: asyncio.Queue | None = None
+        self._channel = None
+        self._router: asyncio.Task | None = None
+        self._reconnect: asyncio.Task | None = None
+        self._failures = 0
+        self._running = False
+        self.connected = False
+        self.metrics = {"changes": 0, "delivered": 0, "resyncs": 0, "reconnects": 0}
+
+    def subscribe(self, user_id: str, token: str) -> asyncio.Queue:
+        """Get the queue of changes for a session, ending any previous
+        listener of the same session"""
+        self.drop_session(token)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SESSION_QUEUE_SIZE)
+        self._sessions.setdefault(user_id, {})[token] = queue
+        return queue
+
+    def listening(self, token: str) -> bool:
+        """Whether a session's changes are being pushed to it"""
+        return any(token in sessions for sessions in self._sessions.values())
+
+    def unsubscribe(self, user_id: str, token: str, queue: asyncio.Queue) -> None:
+        sessions = self._sessions.get(user_id, {})
+        if sessions.get(token) is queue:
+            del sessions[token]
+            if not sessions:
+                self._sessions.pop(user_id, None)
+
+    def drop_session(self, token: str) -> None:
+        """Stop the listener of a session, e.g. at sign-out"""
+        for user_id, sessions in list(self._sessions.items()):
+            queue = sessions.pop(token, None)
+            if queue is not None:
+                # None tells the listener to exit
+                self._put(queue, None, force=True)
+            if not sessions:
+                self._sessions.pop(user_id, None)
+
+    def _put(self, queue: asyncio.Queue, change: dict | None, force: bool = False) -> None:
+        try:
+            queue.put_nowait(change)
+        except asyncio.QueueFull:
+            # The session fell behind: replace its backlog with one resync
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(change if force else RESYNC)
+            self.metrics["resyncs"] += 1
+
+    def _broadcast(self, change: dict) -> None:
+        for sessions in self._sessions.values():
+            for queue in sessions.values():
+                self._put(queue, change)
+
+    def _on_change(self, payload: dict[str, Any]) -> None:
+        # Called synchronously by the Realtime client; routing may need a query
+        if self._inbox is not None:
+            self._inbox.put_nowait(payload["data"])
+
+    def _on_status(self, status: RealtimeSubscribeStates, error: Exception | None) -> None:
+        if status == RealtimeSubscribeStates.SUBSCRIBED:
+            if self._failures:
+                # Changes may have been missed while disconnected
+                self._broadcast(RESYNC)
+            self.connected = True
+            self._failures = 0
+            logging.info("Realtime channel subscribed")
+            return
+        self.connected = False
+        if not self._running:
+            # Closed by stop()
+            return
+        logging.warning(f"Realtime channel {status.value}: {error}")
+        if self._reconnect is None or self._reconnect.done():
+            self._reconnect = asyncio.create_task(self._resubscribe())
+
+    def _cached_owner(self, data: dict) -> tuple[str | None, str | None]:
+        """Get the users.id owning a change's row, without querying
+
+        Returns the owner, or None and the scraper id to look the owner up
+        by when it isn't known yet.
+        """
+        record = data.get("record") or {}
+        old_record = data.get("old_record") or {}
+        if data["table"] == "scheduled_scrapers":
+            scraper_id = record.get("id") or old_record.get("id")
+            owner = record.get("user_id") or old_record.get("user_id")
+            if owner:
+                self._owners.set(scraper_id, owner)
+                return owner, None
+            # Deletes only carry the primary key unless the table's replica
+            # identity is FULL
+            return self._owners.get(scraper_id), None
+        scraper_id = record.get("scraper_id")
+        if not scraper_id:
+            return None, None
+        owner = self._owners.get(scraper_id)
+        return owner, (None if owner else scraper_id)
+
+    def _deliver(self, owner: str | None, data: dict) -> None:
+        sessions = self._sessions.get(owner) if owner else None
+        if not sessions:
+            return
+        change = {
+            "type": data["type"],
+            "table": data["table"],
+            "record": data.get("record") or {},
+            "old_record": data.get("old_record") or {},
+        }
+        for queue in sessions.values():
+            self._put(queue, change)
+            self.metrics["delivered"] += 1
+
+    async def _look_up_owner(self, scraper_id: str) -> None:
+        owner = None
+        try:
+            async with self._lookup_slots:
+                owner = await repository.get_scraper_owner(scraper_id)
+        except Exception as e:
+            logging.warning(f"Could not route Realtime changes of scraper {scraper_id}: {e}")
+        if owner:
+            self._owners.set(scraper_id, owner)
+        # In arrival order, including changes that came in during the lookup
+        for data in self._awaiting_owner.pop(scraper_id, []):
+            self._deliver(owner, data)
+
+    async def _route(self) -> None:
+        while True:
+            data = await self._inbox.get()
+            self.metrics["changes"] += 1
+            if not self._sessions:
+                continue
+            owner, scraper_id = self._cached_owner(data)
+            if scraper_id is None:
+                self._deliver(owner, data)
+                continue
+            # Unknown owners are looked up concurrently, so one slow query
+            # doesn't hold up changes for everyone else
+            waiting = self._awaiting_owner.get(scraper_id)
+            if waiting is not None:
+                waiting.append(data)
+                continue
+            self._awaiting_owner[scraper_id] = [data]
+            task = asyncio.create_task(self._look_up_owner(scraper_id))
+            self._lookups.add(task)
+            task.add_done_callback(self._lookups.discard)
+
+    async def _subscribe(self) -> None:
+        client = await supabase_clients.get_async_admin_client()
+        channel = client.channel(CHANNEL_TOPIC)
+        for table in TABLES:
+            channel.on_postgres_changes(
+                RealtimePostgresChangesListenEvent.All,
+                self._on_change,
+                table=table,
+                schema="public",
+            )
+        self._channel = channel
+        await channel.subscribe(self._on_status)
+
+    async def _resubscribe(self) -> None:
+        while True:
+            self._failures += 1
+            self.metrics["reconnects"] += 1
+            delay = random.uniform(
+                0, min(RECONNECT_BACKOFF_MAX, RECONNECT_BACKOFF_BASE * 2**self._failures)
+            )
+            await asyncio.sleep(delay)
+            try:
+                await self._remove_channel()
+                await self._subscribe()
+                return
+            except Exception as e:
+                logging.warning(f"Realtime resubscribe failed: {e}")
+
+    async def _remove_channel(self) -> None:
+        channel, self._channel = self._channel, None
+        if channel is not None:
+            client = await supabase_clients.get_async_admin_client()
+            with contextlib.suppress(Exception):
+                await client.remove_channel(channel)
+
+    async def start(self) -> None:
+        self._running = True
+        self._inbox = asyncio.Queue()
+        self._router = asyncio.create_task(self._route())
+        try:
+            await self._subscribe()
+        except Exception as e:
+            logging.warning(f"Realtime subscribe failed, retrying in the background: {e}")
+            self._reconnect = asyncio.create_task(self._resubscribe())
+
+    async def stop(self) -> None:
+        self._running = False
+        for task in (self._reconnect, self._router, *self._lookups):
+            if task is not None:
+                task.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await task
+        self._awaiting_owner.clear()
+        await self._remove_channel()
+        self.connected = False
+        for token in [t for sessions in self._sessions.values() for t in sessions]:
+            self.drop_session(token)
+
+
+realtime_hub = RealtimeHub() if REALTIME_ENABLED else None
+
+
+@contextlib.asynccontextmanager
+async def lifespan():
+    """Subscribe once the app is up and unsubscribe at shutdown"""
+    if realtime_hub is None:
+        yield
+        return
+    await realtime_hub.start()
+    try:
+        yield
+    finally:
+        await realtime_hub.stop()
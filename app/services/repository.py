@@ -0,0 +1,468 @@
+"""Async data access for the users, scheduled_scrapers, scraper_executions,
+scraper_snapshots, scraper_execution_stats and chat tables.
+
+Every query goes through the shared async service-role client, so it runs on
+the worker's event loop without blocking it and reuses pooled connections.
+"""
+import asyncio
+import os
+from datetime import datetime, timezone
+from typing import Any, TypedDict
+from postgrest import CountMethod, ReturnMethod
+from app.services import supabase_clients
+
+# Only the columns each caller actually reads are selected, so payloads (and
+# the serialized state they end up in) don't carry unused TEXT columns.
+USER_COLUMNS = "id, is_paid"
+SCRAPER_SUMMARY_COLUMNS = (
+    "id, name, criteria_preview, regularity, day_number, time_utc, monitoring, status, created_at,"
+    " scraper_execution_stats(runs, successes, timed_runs, total_execution_time_ms,"
+    " last_executed_at, last_success)"
+)
+EXECUTION_SUMMARY_COLUMNS = (
+    "id, executed_at, success, status_code, error_message, items_found, execution_time_ms"
+)
+CHAT_MESSAGE_COLUMNS = "id, role, content, image, source, prompt_id, created_at"
+# Also set in the criteria_preview computed column
+CRITERIA_PREVIEW_LENGTH = 120
+SCRAPERS_PAGE_SIZE = int(os.environ.get("SCRAPERS_PAGE_SIZE", "25"))
+EXECUTIONS_PAGE_SIZE = int(os.environ.get("EXECUTIONS_PAGE_SIZE", "20"))
+
+
+class UserRow(TypedDict):
+    id: str
+    is_paid: bool
+
+
+class ScraperSummary(TypedDict):
+    id: str
+    name: str
+    criteria_preview: str
+    regularity: str
+    day_number: int
+    time_utc: str
+    monitoring: bool
+    status: str
+    created_at: str
+    # From scraper_execution_stats; 0 and "" until the scraper first runs
+    runs: int
+    success_rate: int
+    avg_execution_time_ms: int
+    last_run_at: str
+    last_run_status: str
+
+
+class ScraperCursor(TypedDict):
+    """Keyset position of the last row of a page"""
+    created_at: str
+    id: str
+
+
+class ExecutionCursor(TypedDict):
+    """Keyset position of the last execution of a page"""
+    executed_at: str
+    id: str
+
+
+class ExecutionSummary(TypedDict):
+    id: str
+    executed_at: str
+    success: bool
+    status_code: int | None
+    error_message: str | None
+    items_found: int | None
+    execution_time_ms: int | None
+
+
+class ChatMessageRow(TypedDict):
+    id: str
+    conversation_id: str
+    role: str
+    content: str
+    image: str | None
+    source: str | None
+    prompt_id: str | None
+    created_at: str
+
+
+# ScraperSummary fields that come from scraper_execution_stats
+SCRAPER_STATS_FIELDS = (
+    "runs", "success_rate", "avg_execution_time_ms", "last_run_at", "last_run_status"
+)
+
+
+def scraper_stats(stats: dict) -> dict:
+    """Get the ScraperSummary stats fields of a scraper_execution_stats row"""
+    runs = stats.get("runs") or 0
+    timed_runs = stats.get("timed_runs") or 0
+    last_success = stats.get("last_success")
+    return {
+        "runs": runs,
+        "success_rate": round(100 * (stats.get("successes") or 0) / runs) if runs else 0,
+        "avg_execution_time_ms": (
+            round((stats.get("total_execution_time_ms") or 0) / timed_runs) if timed_runs else 0
+        ),
+        "last_run_at": stats.get("last_executed_at") or "",
+        "last_run_status": "" if last_success is None else ("success" if last_success else "failed"),
+    }
+
+
+def to_scraper_summary(row: dict) -> ScraperSummary:
+    """Build the Active Jobs row, truncating criteria to what the card shows
+
+    List queries select the criteria_preview computed column, which is
+    truncated in the database; inserted rows and Realtime changes carry the
+    full criteria and are truncated here the same way.
+    """
+    criteria = row.get("criteria_preview")
+    if criteria is None:
+        criteria = row.get("criteria") or ""
+        if len(criteria) > CRITERIA_PREVIEW_LENGTH:
+            criteria = criteria[: CRITERIA_PREVIEW_LENGTH - 1].rstrip() + "…"
+    return {
+        "id": row["id"],
+        "name": row.get("name", ""),
+        "criteria_preview": criteria,
+        "regularity": row.get("regularity", ""),
+        "day_number": row.get("day_number", 1),
+        "time_utc": row.get("time_utc", ""),
+        "monitoring": bool(row.get("monitoring")),
+        "status": row.get("status", ""),
+        "created_at": row.get("created_at", ""),
+        # Embedded one-to-one, so an object (or null before the first run)
+        **scraper_stats(row.get("scraper_execution_stats") or {}),
+    }
+
+
+async def get_user_by_auth_id(auth_user_id: str) -> UserRow | None:
+    """Get the users row linked to a Supabase auth user"""
+    client = await supabase_clients.get_async_admin_client()
+    result = await (
+        client.table("users")
+        .select(USER_COLUMNS)
+        .eq("auth_user_id", auth_user_id)
+        .maybe_single()
+        .execute()
+    )
+    return result.data if (result and result.data) else None
+
+
+async def create_user(auth_user_id: str, email: str, is_paid: bool = False) -> UserRow | None:
+    """Insert a users row and return its id and is_paid"""
+    client = await supabase_clients.get_async_admin_client()
+    result = await client.table("users").insert(
+        {
+            "auth_user_id": auth_user_id,
+            "email": email,
+            "is_paid": is_paid,
+        }
+    ).execute()
+    if not (result and result.data):
+        return None
+    row = result.data[0]
+    return {"id": row["id"], "is_paid": row.get("is_paid", False)}
+
+
+async def insert_scraper(scraper: dict[str, Any]) -> ScraperSummary | None:
+    """Insert a scheduled_scrapers row and return its summary"""
+    client = await supabase_clients.get_async_admin_client()
+    result = await client.table("scheduled_scrapers").insert(scraper).execute()
+    return to_scraper_summary(result.data[0]) if (result and result.data) else None
+
+
+async def list_scrapers(
+    user_id: str,
+    limit: int = SCRAPERS_PAGE_SIZE,
+    after: ScraperCursor | None = None,
+) -> tuple[list[ScraperSummary], ScraperCursor | None]:
+    """List one page of a user's scheduled scrapers, newest first
+
+    Pages are keyed on (created_at, id) rather than offsets, so each page is a
+    bounded index range scan however deep the user scrolls. Returns the page
+    and the cursor of the next one (None on the last page).
+    """
+    client = await supabase_clients.get_async_admin_client()
+    query = (
+        client.table("scheduled_scrapers")
+        .select(SCRAPER_SUMMARY_COLUMNS)
+        .eq("user_id", user_id)
+    )
+    if after:
+        created_at = after["created_at"]
+        query = query.or_(
+            f'created_at.lt."{created_at}",'
+            f'and(created_at.eq."{created_at}",id.lt.{after["id"]})'
+        )
+    # Fetch one extra row to know whether another page follows
+    result = await (
+        query.order("created_at", desc=True)
+        .order("id", desc=True)
+        .limit(limit + 1)
+        .execute()
+    )
+    rows = result.data if (result and result.data) else []
+    next_cursor: ScraperCursor | None = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = {"created_at": rows[-1]["created_at"], "id": rows[-1]["id"]}
+    return [to_scraper_summary(row) for row in rows], next_cursor
+
+
+async def delete_scrapers(user_id: str, scraper_ids: list[str]) -> int:
+    """Delete any number of a user's scheduled_scrapers rows in one request
+
+    Returns how many rows were actually removed.
+    """
+    if not scraper_ids:
+        return 0
+    client = await supabase_clients.get_async_admin_client()
+    result = await (
+        client.table("scheduled_scrapers")
+        .delete(count=CountMethod.exact, returning=ReturnMethod.minimal)
+        .eq("user_id", user_id)
+        .in_("id", scraper_ids)
+        .execute()
+    )
+    return (result.count or 0) if result else 0
+
+
+async def get_scraper_owner(scraper_id: str) -> str | None:
+    """Get the users.id owning a scheduled scraper"""
+    client = await supabase_clients.get_async_admin_client()
+    result = await (
+        client.table("scheduled_scrapers")
+        .select("user_id")
+        .eq("id", scraper_id)
+        .limit(1)
+        .execute()
+    )
+    return result.data[0]["user_id"] if (result and result.data) else None
+
+
+async def list_executions(
+    scraper_id: str,
+    limit: int = EXECUTIONS_PAGE_SIZE,
+    after: ExecutionCursor | None = None,
+) -> tuple[list[ExecutionSummary], ExecutionCursor | None]:
+    """List one page of a scraper's executions, newest first
+
+    Keyset-paged on (executed_at, id) like list_scrapers, so each page is a
+    range scan of idx_scraper_executions_scraper_executed_at. Returns the page
+    and the cursor of the next one (None on the last page).
+    """
+    client = await supabase_clients.get_async_admin_client()
+    query = (
+        client.table("scraper_executions")
+        .select(EXECUTION_SUMMARY_COLUMNS)
+        .eq("scraper_id", scraper_id)
+    )
+    if after:
+        executed_at = after["executed_at"]
+        query = query.or_(
+            f'executed_at.lt."{executed_at}",'
+            f'and(executed_at.eq."{executed_at}",id.lt.{after["id"]})'
+        )
+    result = await (
+        query.order("executed_at", desc=True)
+        .order("id", desc=True)
+        .limit(limit + 1)
+        .execute()
+    )
+    rows = result.data if (result and result.data) else []
+    next_cursor: ExecutionCursor | None = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = {"executed_at": rows[-1]["executed_at"], "id": rows[-1]["id"]}
+    return rows, next_cursor
+
+
+async def list_notable_executions(user_id: str, since: str, limit: int) -> list[dict]:
+    """List a user's failed or matching runs logged after a time, newest first
+
+    Used to catch the notifications feed up on changes a session's listener
+    missed. Each row carries the scraper's name as scraper_name.
+    """
+    client = await supabase_clients.get_async_admin_client()
+    result = await (
+        client.table("scraper_executions")
+        .select(
+            "id, scraper_id, executed_at, success, status_code, error_message, items_found,"
+            " result_summary, scheduled_scrapers!inner(user_id, name)"
+        )
+        .eq("scheduled_scrapers.user_id", user_id)
+        .gt("executed_at", since)
+        .or_("success.is.false,items_found.gt.0")
+        .order("executed_at", desc=True)
+        .limit(limit)
+        .execute()
+    )
+    rows = result.data if (result and result.data) else []
+    for row in rows:
+        row["scraper_name"] = (row.pop("scheduled_scrapers", None) or {}).get("name")
+    return rows
+
+
+class ExecutionRow(TypedDict):
+    id: str
+    scraper_id: str
+    executed_at: str
+    success: bool
+    status_code: int | None
+    error_message: str | None
+    items_found: int
+    credits_used: int
+    execution_time_ms: int | None
+    result_summary: dict | None
+
+
+async def record_executions(rows: list[ExecutionRow]) -> int:
+    """Log a batch of scraper runs through the record_scraper_executions
+    function; rows already logged are skipped. Returns how many were new"""
+    if not rows:
+        return 0
+    client = await supabase_clients.get_async_admin_client()
+    result = await client.rpc("record_scraper_executions", {"p_executions": rows}).execute()
+    return result.data if (result and result.data) else 0
+
+
+async def ensure_conversation(user_id: str, mode: str) -> str:
+    """Get the id of a user's chat_conversations row for a mode, creating it"""
+    client = await supabase_clients.get_async_admin_client()
+    result = await (
+        client.table("chat_conversations")
+        .upsert({"user_id": user_id, "mode": mode}, on_conflict="user_id,mode")
+        .execute()
+    )
+    return result.data[0]["id"]
+
+
+async def insert_chat_messages(rows: list[ChatMessageRow]) -> None:
+    """Insert chat_messages rows in one request, skipping ids already stored"""
+    if not rows:
+        return
+    client = await supabase_clients.get_async_admin_client()
+    await (
+        client.table("chat_messages")
+        .upsert(
+            rows,
+            on_conflict="id",
+            ignore_duplicates=True,
+            returning=ReturnMethod.minimal,
+        )
+        .execute()
+    )
+
+
+async def delete_chat_messages(conversation_id: str, before: str) -> None:
+    """Delete a conversation's messages created up to a timestamp"""
+    client = await supabase_clients.get_async_admin_client()
+    await (
+        client.table("chat_messages")
+        .delete(returning=ReturnMethod.minimal)
+        .eq("conversation_id", conversation_id)
+        .lte("created_at", before)
+        .execute()
+    )
+
+
+async def list_recent_chat_messages(user_id: str, limit: int) -> dict[str, list[dict]]:
+    """Get the last messages of each of a user's conversations, oldest first"""
+    client = await supabase_clients.get_async_admin_client()
+    result = await (
+        client.table("chat_conversations")
+        .select("id, mode")
+        .eq("user_id", user_id)
+        .execute()
+    )
+    conversations = result.data if (result and result.data) else []
+
+    async def recent(conversation_id: str) -> list[dict]:
+        result = await (
+            client.table("chat_messages")
+            .select(CHAT_MESSAGE_COLUMNS)
+            .eq("conversation_id", conversation_id)
+            .order("created_at", desc=True)
+            .limit(limit)
+            .execute()
+        )
+        return list(reversed(result.data)) if (result and result.data) else []
+
+    messages = await asyncio.gather(*(recent(row["id"]) for row in conversations))
+    return {row["mode"]: rows for row, rows in zip(conversations, messages)}
+
+
+class ClaimedScraper(TypedDict):
+    id: str
+    user_id: str
+    name: str
+    criteria: str
+    regularity: str
+    day_number: int
+    time_utc: str
+    timezone: str
+    next_execution: str
+    scraper_service: str
+
+
+async def claim_due_scrapers(
+    worker_id: str, limit: int, lease_seconds: int
+) -> list[ClaimedScraper]:
+    """Lease up to limit due scrapers to a scheduler worker"""
+    client = await supabase_clients.get_async_admin_client()
+    result = await client.rpc(
+        "claim_due_scrapers",
+        {"p_worker_id": worker_id, "p_limit": limit, "p_lease_seconds": lease_seconds},
+    ).execute()
+    return result.data if (result and result.data) else []
+
+
+async def complete_scraper_runs(worker_id: str, runs: list[dict[str, str | None]]) -> int:
+    """Set next_execution and release the leases of a batch of scrapers
+
+    runs holds {"scraper_id", "next_execution"} dicts; a None next_execution
+    parks the scraper. Returns how many leases this worker still held and
+    released.
+    """
+    if not runs:
+        return 0
+    client = await supabase_clients.get_async_admin_client()
+    result = await client.rpc(
+        "complete_scraper_runs", {"p_worker_id": worker_id, "p_runs": runs}
+    ).execute()
+    return result.data if (result and result.data) else 0
+
+
+class ScraperSnapshot(TypedDict):
+    scraper_id: str
+    url: str
+    etag: str | None
+    last_modified: str | None
+    simhash: int
+    block_hashes: list[str]
+
+
+async def get_scraper_snapshot(scraper_id: str) -> ScraperSnapshot | None:
+    """Get the fingerprint a scraper's page had at its last run"""
+    client = await supabase_clients.get_async_admin_client()
+    result = await (
+        client.table("scraper_snapshots")
+        .select("scraper_id, url, etag, last_modified, simhash, block_hashes")
+        .eq("scraper_id", scraper_id)
+        .limit(1)
+        .execute()
+    )
+    return result.data[0] if (result and result.data) else None
+
+
+async def save_scraper_snapshot(snapshot: ScraperSnapshot) -> None:
+    """Replace a scraper's page fingerprint"""
+    client = await supabase_clients.get_async_admin_client()
+    await (
+        client.table("scraper_snapshots")
+        .upsert(
+            {**snapshot, "updated_at": datetime.now(timezone.utc).isoformat()},
+            on_conflict="scraper_id",
+            returning=ReturnMethod.minimal,
+        )
+        .execute()
+    )
@@ -0,0 +1,259 @@
+"""Cache of assistant answers shared by every user of a worker.
+
+Answers are keyed by mode, prompt version and normalized question. Lookups
+try an exact-match tier first (in memory, optionally backed by SQLite on disk
+so entries survive restarts and are shared between workers), then an optional
+embedding-similarity tier that catches rephrasings of the same question.
+Entries expire after a per-mode TTL and are evicted least recently used first.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any
+from app.prompts.registry import Prompt
+from app.services.cache import TTLCache
+
+# Seconds an answer stays valid, per mode (RESPONSE_CACHE_TTL_<MODE> overrides)
+DEFAULT_TTLS = {
+    "SCRAPE": 600,
+    "DATA": 3600,
+    "INVESTIGATE": 1800,
+    "FACT-CHECK": 900,
+    "GRAPHICS": 3600,
+}
+MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", "5000"))
+SQLITE_PATH = os.environ.get("RESPONSE_CACHE_SQLITE_PATH")
+SEMANTIC_ENABLED = os.environ.get("RESPONSE_CACHE_SEMANTIC") == "1"
+SEMANTIC_MODEL = os.environ.get(
+    "RESPONSE_CACHE_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2"
+)
+SEMANTIC_THRESHOLD = float(os.environ.get("RESPONSE_CACHE_SIMILARITY", "0.93"))
+SEMANTIC_MAX_ENTRIES = int(os.environ.get("RESPONSE_CACHE_SEMANTIC_MAX_ENTRIES", "500"))
+
+
+def mode_ttl(mode: str) -> float:
+    env_name = f"RESPONSE_CACHE_TTL_{mode.replace('-', '_')}"
+    return float(os.environ.get(env_name, DEFAULT_TTLS.get(mode, 600)))
+
+
+def normalize_question(question: str) -> str:
+    """Fold case, unicode forms, whitespace and trailing punctuation"""
+    text = unicodedata.normalize("NFKC", question).casefold()
+    text = " ".join(text.split())
+    return text.rstrip(" ?!.")
+
+
+def cache_key(mode: str, prompt_id: str, question: str) -> str:
+    raw = f"{mode}\0{prompt_id}\0{normalize_question(question)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class SQLiteBackend:
+    """On-disk exact-match tier"""
+
+    def __init__(self, path: str, max_entries: int = MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS response_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_response_cache_last_access"
+            " ON response_cache (last_access)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> dict | None:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM response_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= now:
+                self._conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._conn.execute(
+                "UPDATE response_cache SET last_access = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+        return json.loads(row[0])
+
+    def set(self, key: str, value: dict, ttl: float) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO response_cache (key, value, expires_at, last_access)"
+                " VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now + ttl, now),
+            )
+            self._conn.execute("DELETE FROM response_cache WHERE expires_at <= ?", (now,))
+            self._conn.execute(
+                """
+                DELETE FROM response_cache WHERE key IN (
+                    SELECT key FROM response_cache
+                    ORDER BY last_access DESC
+                    LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+
+class SemanticIndex:
+    """Embedding-similarity tier, one bounded bucket per (mode, prompt version)"""
+
+    def __init__(self, model: str = SEMANTIC_MODEL, threshold: float = SEMANTIC_THRESHOLD):
+        self.model = model
+        self.threshold = threshold
+        self._embedder = None
+        self._buckets: dict[tuple[str, str], OrderedDict[str, tuple[list[float], float]]] = {}
+        self._lock = threading.Lock()
+
+    def _embed(self, text: str) -> list[float]:
+        if self._embedder is None:
+            from langchain_huggingface import HuggingFaceEndpointEmbeddings
+
+            self._embedder = HuggingFaceEndpointEmbeddings(
+                model=self.model,
+                huggingfacehub_api_token=os.environ.get("HUGGINGFACE_API_KEY"),
+            )
+        return self._embedder.embed_query(text)
+
+    @staticmethod
+    def _cosine(a: list[float], b: list[float]) -> float:
+        dot = sum(x * y for x, y in zip(a, b))
+        norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+        return dot / norm if norm else 0.0
+
+    def nearest(self, mode: str, prompt_id: str, question: str) -> str | None:
+        """Get the key of the most similar live question above the threshold"""
+        vector = self._embed(normalize_question(question))
+        now = time.monotonic()
+        best_key, best_score = None, self.threshold
+        with self._lock:
+            bucket = self._buckets.get((mode, prompt_id), OrderedDict())
+            for key, (other, expires_at) in list(bucket.items()):
+                if expires_at <= now:
+                    del bucket[key]
+                    continue
+                score = self._cosine(vector, other)
+                if score >= best_score:
+                    best_key, best_score = key, score
+            if best_key:
+                bucket.move_to_end(best_key)
+        return best_key
+
+    def add(self, mode: str, prompt_id: str, question: str, key: str, ttl: float) -> None:
+        vector = self._embed(normalize_question(question))
+        with self._lock:
+            bucket = self._buckets.setdefault((mode, prompt_id), OrderedDict())
+            bucket[key] = (vector, time.monotonic() + ttl)
+            bucket.move_to_end(key)
+            while len(bucket) > SEMANTIC_MAX_ENTRIES:
+                bucket.popitem(last=False)
+
+
+class ResponseCache:
+    """Exact and (optionally) semantic cache of assistant answers"""
+
+    def __init__(
+        self,
+        sqlite_path: str | None = SQLITE_PATH,
+        semantic: bool = SEMANTIC_ENABLED,
+        max_entries: int = MAX_ENTRIES,
+    ):
+        self._memory = TTLCache(ttl=600, maxsize=max_entries)
+        self._disk = SQLiteBackend(sqlite_path, max_entries) if sqlite_path else None
+        self._semantic = SemanticIndex() if semantic else None
+        self.metrics = {"exact_hits": 0, "semantic_hits": 0, "misses": 0, "stores": 0}
+        self._metrics_lock = threading.Lock()
+
+    def _count(self, metric: str) -> None:
+        with self._metrics_lock:
+            self.metrics[metric] += 1
+
+    def _get_exact(self, key: str) -> dict | None:
+        value = self._memory.get(key)
+        if value is None and self._disk is not None:
+            value = self._disk.get(key)
+        return value
+
+    def _lookup(self, mode: str, prompt_id: str, question: str) -> dict | None:
+        key = cache_key(mode, prompt_id, question)
+        value = self._get_exact(key)
+        if value is not None:
+            self._count("exact_hits")
+            return value
+        if self._semantic is not None:
+            try:
+                similar_key = self._semantic.nearest(mode, prompt_id, question)
+            except Exception as e:
+                logging.warning(f"Semantic cache lookup failed: {e}")
+                similar_key = None
+            value = self._get_exact(similar_key) if similar_key else None
+            if value is not None:
+                self._count("semantic_hits")
+                return value
+        self._count("misses")
+        return None
+
+    def _store(self, mode: str, prompt_id: str, question: str, value: dict) -> None:
+        key = cache_key(mode, prompt_id, question)
+        ttl = mode_ttl(mode)
+        self._memory.set(key, value, ttl=ttl)
+        if self._disk is not None:
+            self._disk.set(key, value, ttl)
+        if self._semantic is not None:
+            try:
+                self._semantic.add(mode, prompt_id, question, key, ttl)
+            except Exception as e:
+                logging.warning(f"Semantic cache store failed: {e}")
+        self._count("stores")
+
+    async def get(self, prompt: Prompt, question: str) -> dict | None:
+        """Get a cached answer to a question asked with a given prompt"""
+        try:
+            return await asyncio.to_thread(self._lookup, prompt.mode, prompt.id, question)
+        except Exception as e:
+            logging.warning(f"Response cache lookup failed: {e}")
+            return None
+
+    async def set(self, prompt: Prompt, question: str, value: dict[str, Any]) -> None:
+        """Cache an answer (the message fields content, image and source)"""
+        try:
+            await asyncio.to_thread(self._store, prompt.mode, prompt.id, question, value)
+        except Exception as e:
+            logging.warning(f"Response cache store failed: {e}")
+
+    def stats(self) -> dict[str, float]:
+        """Hit/miss counters plus the overall hit rate"""
+        with self._metrics_lock:
+            metrics = dict(self.metrics)
+        hits = metrics["exact_hits"] + metrics["semantic_hits"]
+        total = hits + metrics["misses"]
+        return {**metrics, "hit_rate": hits / total if total else 0.0}
+
+
+response_cache = ResponseCache()
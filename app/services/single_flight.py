@@ -0,0 +1,98 @@
+"""Coalescing of identical in-flight upstream queries (single flight).
+
+When several sessions ask the same question in the same mode with the same
+prompt version while an answer is still being generated, only the first one
+calls the upstream model. The call runs as its own task and every waiting
+session, including the one that started it, follows its streamed updates.
+Coalescing is per worker process; flights are forgotten as soon as they end,
+after which the response cache takes over.
+"""
+import asyncio
+import logging
+from typing import AsyncIterator
+
+
+class FlightCancelledError(Exception):
+    """The upstream call a request was following was cancelled before it
+    finished, so what it streamed so far is not an answer"""
+
+
+class _Flight:
+    def __init__(self):
+        self.latest: dict | None = None
+        self.version = 0
+        self.done = False
+        self.error: BaseException | None = None
+        self.changed = asyncio.Event()
+        self.followers = 0
+        self.task: asyncio.Task | None = None
+
+    def publish(self, update: dict | None = None, done: bool = False) -> None:
+        if update is not None:
+            self.latest = update
+            self.version += 1
+        self.done = done
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+
+class SingleFlight:
+    """Share one upstream stream between identical concurrent requests"""
+
+    def __init__(self):
+        self._flights: dict[str, _Flight] = {}
+        self.metrics = {"flights": 0, "coalesced": 0}
+
+    async def _run(self, key: str, flight: _Flight, updates: AsyncIterator[dict]) -> None:
+        try:
+            async for update in updates:
+                flight.publish(update)
+        except Exception as e:
+            flight.error = e
+        except BaseException:
+            # Followers raise this instead of ending on a partial stream,
+            # which would otherwise be taken (and cached) as the answer
+            flight.error = FlightCancelledError("The shared upstream call was cancelled")
+            raise
+        finally:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            if flight.followers:
+                logging.info(f"Answered {flight.followers + 1} identical requests with one upstream call")
+            flight.publish(done=True)
+
+    def share(self, key: str, updates: AsyncIterator[dict]) -> AsyncIterator[dict]:
+        """Follow the in-flight stream for key, or start one from updates
+
+        The updates generator is only iterated when no identical request is in
+        flight; otherwise it is dropped without ever having started.
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight()
+            self._flights[key] = flight
+            flight.task = asyncio.create_task(self._run(key, flight, updates))
+            self.metrics["flights"] += 1
+        else:
+            flight.followers += 1
+            self.metrics["coalesced"] += 1
+        return self._follow(flight)
+
+    async def _follow(self, flight: _Flight) -> AsyncIterator[dict]:
+        seen = 0
+        while True:
+            changed = flight.changed
+            if flight.version != seen and flight.latest is not None:
+                seen = flight.version
+                yield flight.latest
+            if flight.done:
+                if flight.error is not None:
+                    raise flight.error
+                return
+            await changed.wait()
+
+    def in_flight(self) -> int:
+        return len(self._flights)
+
+
+single_flight = SingleFlight()
@@ -0,0 +1,139 @@
+"""Process-wide Supabase client registry.
+
+Clients are kept at module level so that every session handled by a worker
+shares the same HTTP connection pool, and so that they never end up in the
+serialized Reflex state. Signing in goes through short-lived auth clients
+instead, so no user's session ever lands on a shared client.
+"""
+import asyncio
+import contextlib
+import os
+import logging
+import httpx
+from supabase import AsyncClient, AsyncClientOptions, acreate_client
+from supabase_auth import AsyncGoTrueClient
+
+ANON_KEY_ENV = "SUPABASE_KEY"
+SERVICE_ROLE_KEY_ENV = "SUPABASE_SERVICE_ROLE_KEY"
+
+POOL_SIZE = int(os.environ.get("SUPABASE_POOL_SIZE", "20"))
+KEEPALIVE_EXPIRY = float(os.environ.get("SUPABASE_KEEPALIVE_EXPIRY", "30"))
+REQUEST_TIMEOUT = float(os.environ.get("SUPABASE_REQUEST_TIMEOUT", "30"))
+
+_async_clients: dict[str, AsyncClient] = {}
+_async_http_clients: dict[str, httpx.AsyncClient] = {}
+_async_lock: asyncio.Lock | None = None
+
+
+def _http_client_kwargs() -> dict:
+    return {
+        "limits": httpx.Limits(
+            max_connections=POOL_SIZE,
+            max_keepalive_connections=POOL_SIZE,
+            keepalive_expiry=KEEPALIVE_EXPIRY,
+        ),
+        "timeout": httpx.Timeout(REQUEST_TIMEOUT, connect=5.0),
+        "http2": True,
+        "follow_redirects": True,
+    }
+
+
+async def _build_async_client(key_env: str) -> AsyncClient:
+    """Create an async Supabase client backed by a keep-alive connection pool"""
+    http_client = httpx.AsyncClient(**_http_client_kwargs())
+    _async_http_clients[key_env] = http_client
+    # The clients are shared between users, so they must never hold on to
+    # (or try to refresh) a session of their own.
+    return await acreate_client(
+        os.environ["SUPABASE_URL"],
+        os.environ[key_env],
+        options=AsyncClientOptions(
+            httpx_client=http_client,
+            auto_refresh_token=False,
+            persist_session=False,
+        ),
+    )
+
+
+async def _aget(key_env: str) -> AsyncClient:
+    global _async_lock
+    client = _async_clients.get(key_env)
+    if client is not None:
+        return client
+    if _async_lock is None:
+        _async_lock = asyncio.Lock()
+    async with _async_lock:
+        client = _async_clients.get(key_env)
+        if client is None:
+            client = await _build_async_client(key_env)
+            _async_clients[key_env] = client
+            logging.info(f"Created shared async Supabase client for {key_env}")
+        return client
+
+
+async def get_async_client() -> AsyncClient:
+    """Get the shared async Supabase client with the anon key"""
+    return await _aget(ANON_KEY_ENV)
+
+
+async def get_auth_client() -> AsyncGoTrueClient:
+    """Get a new anon-key auth client for a single sign-in or sign-up
+
+    A client keeps the session it signs in, and the shared anon client would
+    then send every later request as that user. This one is dropped by the
+    caller once done; it only borrows the anon client's connection pool.
+    """
+    await _aget(ANON_KEY_ENV)
+    key = os.environ[ANON_KEY_ENV]
+    return AsyncGoTrueClient(
+        url=f"{os.environ['SUPABASE_URL'].rstrip('/')}/auth/v1",
+        headers={"apikey": key, "Authorization": f"Bearer {key}"},
+        auto_refresh_token=False,
+        persist_session=False,
+        http_client=_async_http_clients.get(ANON_KEY_ENV),
+    )
+
+
+async def get_async_admin_client() -> AsyncClient:
+    """Get the shared async Supabase client with the service role key"""
+    return await _aget(SERVICE_ROLE_KEY_ENV)
+
+
+async def reset_async_clients(key_env: str | None = None) -> None:
+    """Drop shared async clients (all of them by default) and close their connections"""
+    key_envs = [key_env] if key_env else list(_async_clients)
+    for name in key_envs:
+        _async_clients.pop(name, None)
+        http_client = _async_http_clients.pop(name, None)
+        if http_client is not None:
+            try:
+                await http_client.aclose()
+            except Exception as e:
+                logging.warning(f"Error closing async Supabase HTTP client: {e}")
+
+
+async def acheck_health() -> bool:
+    """Run a cheap query on every shared client, resetting the ones that fail"""
+    healthy = True
+    for key_env in (ANON_KEY_ENV, SERVICE_ROLE_KEY_ENV):
+        try:
+            client = await _aget(key_env)
+            await client.table("users").select("id").limit(1).execute()
+        except Exception as e:
+            logging.warning(f"Async Supabase client for {key_env} is unhealthy: {e}")
+            await reset_async_clients(key_env)
+            healthy = False
+    return healthy
+
+
+@contextlib.asynccontextmanager
+async def lifespan():
+    """Warm up the shared clients on startup and close them on shutdown"""
+    try:
+        await acheck_health()
+    except Exception as e:
+        logging.warning(f"Supabase warm-up failed: {e}")
+    try:
+        yield
+    finally:
+        await reset_async_clients()
@@ -0,0 +1,9 @@
+"""Token estimates for sizing prompts to a model's budget."""
+import os
+
+# Approximation used instead of a model tokenizer, which would need a download
+CHARS_PER_TOKEN = float(os.environ.get("CONTEXT_CHARS_PER_TOKEN", "4"))
+
+
+def estimate_tokens(text: str) -> int:
+    return int(len(text) / CHARS_PER_TOKEN) + 1
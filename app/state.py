@@ -1,16 +1,42 @@
+import asyncio
 import reflex as rx
-from typing import Literal, TypedDict, cast
+from typing import AsyncIterator, Literal, TypedDict, cast
 import os
 import logging
+import time
+from datetime import datetime, timezone
+from app.prompts import registry as prompt_registry
+from app.prompts.registry import Prompt
+from app.services import chat_store, context_builder, dispatcher, hf_spaces, llm_chains
+from app.services.chat_persistence import chat_persistence
+from app.services.repository import (
+    ExecutionCursor,
+    ExecutionSummary,
+    ScraperCursor,
+    ScraperSummary,
+)
+from app.services.response_cache import cache_key, response_cache
+from app.services.single_flight import single_flight
 
 Mode = Literal["SCRAPE", "DATA", "INVESTIGATE", "FACT-CHECK", "GRAPHICS"]
 
+# Minimum time between state flushes while an answer is streaming in
+STREAM_FLUSH_INTERVAL = float(os.environ.get("STREAM_FLUSH_INTERVAL_MS", "100")) / 1000
+# Most recent notifications kept in the feed
+NOTIFICATIONS_LIMIT = int(os.environ.get("NOTIFICATIONS_LIMIT", "50"))
+# Shown when a Space response carries no generated text
+NO_RESPONSE_TEXT = "No response text found."
+
 
 class Message(TypedDict):
     role: str
     content: str
     image: str | None
     source: str | None
+    # Versioned id of the system prompt behind an assistant answer
+    prompt_id: str | None
+    # Position in the mode's full history in the chat store
+    seq: int
 
 
 class ScrapeResult(TypedDict):
@@ -21,9 +47,21 @@ class ScrapeResult(TypedDict):
     error: str | None
 
 
+class Notification(TypedDict):
+    """A scraper run worth telling the user about: a match or a failure"""
+    id: str
+    scraper_id: str
+    scraper_name: str
+    success: bool
+    items_found: int
+    message: str
+    executed_at: str
+
+
 class AppState(rx.State):
     active_mode: Mode = "SCRAPE"
     active_scrape_sidebar_tab: str = "Scraper Setup"
+    # Only the most recent messages of each mode; the rest is in the chat store
     chat_histories: dict[Mode, list[Message]] = {
         "SCRAPE": [],
         "DATA": [],
@@ -41,16 +79,31 @@ class AppState(rx.State):
     scrape_monitoring: str = "EMAIL"
     scraped_data: ScrapeResult | None = None
     show_about_modal: bool = False
-    scheduled_scrapers: list[dict] = []
+    scheduled_scrapers: list[ScraperSummary] = []
     scrapers_loading: bool = False
+    scrapers_loading_more: bool = False
+    scrapers_has_more: bool = False
+    # Keyset position of the next Active Jobs page (backend only)
+    _scrapers_cursor: ScraperCursor | None = None
     scraper_to_delete: str | None = None
-    hf_space_urls: dict[Mode, str] = {
-        "GRAPHICS": "https://huggingface.co/spaces/coJournalist/cojournalist-graphics",
-        "INVESTIGATE": "https://huggingface.co/spaces/coJournalist/cojournalist-investigate",
-        "FACT-CHECK": "https://huggingface.co/spaces/coJournalist/coJournalist-Fact-Check",
-        "DATA": "https://huggingface.co/spaces/coJournalist/cojournalist-data",
-        "SCRAPE": "",
-    }
+    # Active Jobs row whose execution history is open, and that history
+    expanded_scraper_id: str = ""
+    scraper_executions: list[ExecutionSummary] = []
+    executions_loading: bool = False
+    executions_has_more: bool = False
+    _executions_cursor: ExecutionCursor | None = None
+    selected_scraper_ids: list[str] = []
+    # Pushed by SupabaseState.listen_for_changes, newest first
+    notifications: list[Notification] = []
+    unread_notifications: int = 0
+    # When the feed was last known complete, to catch up on missed runs from
+    # (backend only; "" until the first listener starts)
+    _feed_synced_at: str = ""
+    hf_space_urls: dict[Mode, str] = dict(hf_spaces.HF_SPACE_URLS)
+    # Modes whose Space circuit breaker is open or half-open
+    degraded_modes: list[str] = []
+    # users.id whose conversations this session persists to (backend only)
+    _persist_user_id: str | None = None
 
     @rx.var
     async def is_paid_user(self) -> bool:
@@ -72,23 +125,136 @@ class AppState(rx.State):
     def chat_history(self) -> list[Message]:
         return self.chat_histories[self.active_mode]
 
+    @rx.var
+    def chat_history_has_older(self) -> bool:
+        history = self.chat_histories[self.active_mode]
+        return (
+            bool(history)
+            and history[0]["seq"] > 0
+            and len(history) < chat_store.CHAT_MAX_LOADED
+        )
+
+    def _conversation_id(self) -> str:
+        return self.router.session.client_token
+
+    async def _append_message(self, mode: Mode, message: dict, persist: bool = True) -> int:
+        """Store a message and show it at the end of the mode's window
+
+        Only the last CHAT_WINDOW_SIZE messages stay in state, so syncing it
+        costs the same however long the conversation is. Unless persist is
+        False the message is also queued for the user's saved transcript.
+        Returns the message's sequence number.
+        """
+        if persist:
+            self._persist_message(mode, message)
+        # Off the event loop: the SQLite and Redis stores block
+        seq = await asyncio.to_thread(
+            chat_store.get_store().append, self._conversation_id(), mode, message
+        )
+        window = self.chat_histories[mode]
+        window.append(cast(Message, {**message, "seq": seq}))
+        if len(window) > chat_store.CHAT_WINDOW_SIZE:
+            del window[: len(window) - chat_store.CHAT_WINDOW_SIZE]
+        return seq
+
+    def _persist_message(self, mode: Mode, message: dict, created_at: str | None = None):
+        if chat_persistence and self._persist_user_id:
+            chat_persistence.enqueue(self._persist_user_id, mode, message, created_at)
+
+    async def _clear_messages(self, mode: Mode):
+        await asyncio.to_thread(chat_store.get_store().clear, self._conversation_id(), mode)
+        context_builder.forget(self._conversation_id(), mode)
+        if chat_persistence and self._persist_user_id:
+            chat_persistence.clear(self._persist_user_id, mode)
+        self.chat_histories[mode] = []
+
+    @rx.event(background=True)
+    async def restore_conversations(self):
+        """Load the signed-in user's saved conversations into empty modes"""
+        from app.states.auth_state import AuthState
+
+        async with self:
+            auth_state = await self.get_state(AuthState)
+            user_id = auth_state._db_user_id
+            if not user_id or user_id == self._persist_user_id:
+                return
+            self._persist_user_id = user_id
+        if chat_persistence is None:
+            return
+        try:
+            history = await chat_persistence.restore(user_id, chat_store.CHAT_WINDOW_SIZE)
+        except Exception as e:
+            logging.exception(f"Error restoring conversations: {e}")
+            return
+        async with self:
+            if self._persist_user_id != user_id:
+                return
+            for mode, messages in history.items():
+                # A mode the user already chatted in this session keeps its window
+                if mode not in self.chat_histories or self.chat_histories[mode]:
+                    continue
+                for message in messages:
+                    await self._append_message(
+                        mode,
+                        {
+                            "role": message["role"],
+                            "content": message["content"],
+                            "image": message.get("image"),
+                            "source": message.get("source"),
+                            "prompt_id": message.get("prompt_id"),
+                        },
+                        persist=False,
+                    )
+
+    @rx.event
+    async def reset_conversations(self):
+        """Drop the signed-out user's conversations from this session"""
+        self._persist_user_id = None
+        for mode in self.chat_histories:
+            await self._clear_messages(mode)
+
+    @rx.event
+    async def load_older_messages(self):
+        """Page the messages preceding the active mode's window back in, up
+        to CHAT_MAX_LOADED messages in state"""
+        window = self.chat_histories[self.active_mode]
+        limit = min(chat_store.CHAT_PAGE_SIZE, chat_store.CHAT_MAX_LOADED - len(window))
+        if not window or window[0]["seq"] == 0 or limit <= 0:
+            return
+        older = await asyncio.to_thread(
+            chat_store.get_store().before,
+            self._conversation_id(),
+            self.active_mode,
+            window[0]["seq"],
+            limit,
+        )
+        self.chat_histories[self.active_mode] = [*older, *window]
+
     @rx.var
     def show_sidebar(self) -> bool:
         return self.active_mode in ["SCRAPE", "DATA", "INVESTIGATE"]
 
     @rx.event
-    def set_active_mode(self, mode: str):
+    async def set_active_mode(self, mode: str):
         self.active_mode = cast(Mode, mode)
         if not self.chat_histories[self.active_mode]:
             if self.active_mode != "SCRAPE":
-                self.chat_histories[self.active_mode].append(
+                await self._append_message(
+                    self.active_mode,
                     {
                         "role": "assistant",
                         "content": f"Welcome to {self.active_mode} mode. Ask a question to get started.",
                         "image": None,
                         "source": "System",
-                    }
+                        "prompt_id": None,
+                    },
+                    persist=False,
                 )
+        self.degraded_modes = hf_spaces.degraded_modes(self.hf_space_urls)
+
+    @rx.event
+    def refresh_space_health(self):
+        self.degraded_modes = hf_spaces.degraded_modes(self.hf_space_urls)
 
     @rx.event
     def set_scrape_sidebar_tab(self, tab: str):
@@ -96,7 +262,7 @@ class AppState(rx.State):
 
         self.active_scrape_sidebar_tab = tab
         if tab == "Active Jobs":
-            return SupabaseState.fetch_scrapers
+            return SupabaseState.show_active_jobs
 
     @rx.event
     def switch_to_scraper_setup(self):
@@ -105,15 +271,42 @@ class AppState(rx.State):
 
     @rx.event
     def switch_to_active_jobs(self):
-        """Switch to Active Jobs tab and fetch scrapers"""
+        """Switch to Active Jobs tab, showing cached scrapers while they revalidate"""
         from app.states.supabase_state import SupabaseState
         self.active_scrape_sidebar_tab = "Active Jobs"
-        return SupabaseState.fetch_scrapers
+        return SupabaseState.show_active_jobs
+
+    @rx.event
+    def toggle_scraper_selected(self, scraper_id: str):
+        """Add or remove a scraper from the bulk selection"""
+        if scraper_id in self.selected_scraper_ids:
+            self.selected_scraper_ids.remove(scraper_id)
+        else:
+            self.selected_scraper_ids.append(scraper_id)
+
+    @rx.event
+    def clear_scraper_selection(self):
+        self.selected_scraper_ids = []
 
     @rx.event
     def switch_to_notifications(self):
         """Switch to Notifications tab"""
         self.active_scrape_sidebar_tab = "Notifications"
+        self.unread_notifications = 0
+
+    @rx.event
+    def clear_notifications(self):
+        """Drop the signed-out user's notifications and Active Jobs list"""
+        self.notifications = []
+        self.unread_notifications = 0
+        self._feed_synced_at = ""
+        self.scheduled_scrapers = []
+        self.scrapers_has_more = False
+        self._scrapers_cursor = None
+        self.selected_scraper_ids = []
+        self.expanded_scraper_id = ""
+        self.scraper_executions = []
+        self._executions_cursor = None
 
     @rx.event
     def toggle_about_modal(self):
@@ -121,8 +314,6 @@ class AppState(rx.State):
 
     @rx.event(background=True)
     async def process_chat(self, form_data: dict):
-        import json
-
         question = form_data.get("question", "").strip()
         if not question:
             async with self:
@@ -131,39 +322,71 @@ class AppState(rx.State):
         async with self:
             self.is_loading = True
             self.current_question = ""
-            self.chat_histories[self.active_mode].append(
-                {"role": "user", "content": question, "image": None, "source": None}
+            conversation_id = self._conversation_id()
+            history = [dict(message) for message in self.chat_histories[self.active_mode]]
+            await self._append_message(
+                self.active_mode,
+                {
+                    "role": "user",
+                    "content": question,
+                    "image": None,
+                    "source": None,
+                    "prompt_id": None,
+                }
             )
         try:
-            prompt_filename = self.active_mode.lower().replace("-", "_")
-            prompt_path = f"app/prompts/{prompt_filename}_prompt.json"
-            try:
-                with open(prompt_path, "r") as f:
-                    prompt_data = json.load(f)
-                    system_prompt = prompt_data.get(
-                        "prompt", "You are a helpful assistant."
+            prompt = prompt_registry.get_prompt(self.active_mode)
+            uses_space = self.active_mode in ["DATA", "INVESTIGATE", "FACT-CHECK", "GRAPHICS"]
+            model = (
+                hf_spaces.space_id_from_url(self.hf_space_urls.get(prompt.mode)) or ""
+                if uses_space
+                else llm_chains.DEFAULT_REPO_ID
+            )
+            context = context_builder.build_context(conversation_id, prompt.mode, history, model)
+            # Answers that build on earlier turns are neither cached nor shared
+            cached = None if context else await response_cache.get(prompt, question)
+            if cached:
+                async with self:
+                    await self._append_message(
+                        prompt.mode,
+                        {
+                            "role": "assistant",
+                            "content": cached["content"],
+                            "image": cached.get("image"),
+                            "source": cached.get("source"),
+                            "prompt_id": prompt.id,
+                        }
                     )
-            except (FileNotFoundError, json.JSONDecodeError) as e:
-                logging.exception(f"Error reading prompt file: {e}")
-                system_prompt = "You are a helpful assistant."
-            if self.active_mode in ["DATA", "INVESTIGATE", "FACT-CHECK", "GRAPHICS"]:
-                await self._query_hf_space(question, system_prompt)
+                return
+            if uses_space:
+                answer = await self._query_hf_space(question, prompt, context)
             else:
-                await self._dummy_response(question, system_prompt)
+                answer = await self._dummy_response(question, prompt, context)
+            # Placeholders for unparseable Space responses are not answers
+            if (
+                answer
+                and answer.get("content")
+                and answer["content"] != NO_RESPONSE_TEXT
+                and not context
+            ):
+                await response_cache.set(prompt, question, answer)
         except Exception as e:
             logging.exception(f"Error processing chat: {e}")
             async with self:
-                self.chat_histories[self.active_mode].append(
+                await self._append_message(
+                    self.active_mode,
                     {
                         "role": "assistant",
                         "content": f"An error occurred: {str(e)}",
                         "image": None,
                         "source": "Error",
+                        "prompt_id": None,
                     }
                 )
         finally:
             async with self:
                 self.is_loading = False
+                self.degraded_modes = hf_spaces.degraded_modes(self.hf_space_urls)
 
     @rx.event
     async def handle_scrape(self):
@@ -171,83 +394,184 @@ class AppState(rx.State):
 
         return SupabaseState.handle_scrape
 
-    async def _dummy_response(self, question: str, system_prompt: str):
-        from langchain_huggingface import HuggingFaceEndpoint
-        from langchain.prompts import PromptTemplate
-        from langchain.chains import LLMChain
-
-        repo_id = "mistralai/Mistral-7B-Instruct-v0.2"
-        llm = HuggingFaceEndpoint(
-            repo_id=repo_id,
-            max_new_tokens=128,
-            temperature=0.7,
-            huggingfacehub_api_token=os.environ.get("HUGGINGFACE_API_KEY"),
-        )
-        template = f"{system_prompt}\n\nUser question: '{{question}}'"
-        prompt = PromptTemplate(template=template, input_variables=["question"])
-        llm_chain = LLMChain(prompt=prompt, llm=llm)
-        try:
-            response = await llm_chain.ainvoke(question)
-            response_content = response["text"]
-        except Exception as e:
-            logging.exception(f"Error calling Hugging Face: {e}")
-            response_content = "Sorry, I couldn't process your request at the moment."
+    async def _stream_message(
+        self,
+        mode: Mode,
+        updates: AsyncIterator[dict],
+        prompt_id: str | None,
+        error_update: dict,
+    ) -> dict | None:
+        """Render a streamed assistant answer into a placeholder message
+
+        Each update carries the message fields known so far. State is flushed
+        at most every STREAM_FLUSH_INTERVAL seconds (and once at the end) so a
+        fast stream doesn't flood the websocket with deltas. Queue position
+        updates are shown until the answer starts. If the stream fails before
+        producing any content, error_update is shown instead.
+        Returns the complete answer, or None if the stream failed.
+        """
         async with self:
-            self.chat_histories[self.active_mode].append(
+            conversation_id = self._conversation_id()
+            # Persisted once complete, ordered by when it was started
+            created_at = datetime.now(timezone.utc).isoformat()
+            seq = await self._append_message(
+                mode,
                 {
                     "role": "assistant",
-                    "content": response_content,
+                    "content": "",
                     "image": None,
                     "source": None,
+                    "prompt_id": prompt_id,
+                },
+                persist=False,
+            )
+
+        async def flush(fields: dict):
+            async with self:
+                # The window may have been trimmed or reset while streaming
+                window = self.chat_histories[mode]
+                offset = seq - window[0]["seq"] if window else -1
+                if 0 <= offset < len(window) and window[offset]["seq"] == seq:
+                    window[offset].update(fields)
+
+        message: dict = {}
+        pending = False
+        failed = False
+        last_flush = time.monotonic()
+        try:
+            async for update in updates:
+                if "queue_position" in update:
+                    await flush(
+                        {"content": f"Waiting for a free slot… (position {update['queue_position']} in the queue)"}
+                    )
+                    continue
+                message.update(update)
+                pending = True
+                if time.monotonic() - last_flush >= STREAM_FLUSH_INTERVAL:
+                    await flush(message)
+                    pending = False
+                    last_flush = time.monotonic()
+        except Exception as e:
+            logging.exception(f"Error streaming response: {e}")
+            failed = True
+            if isinstance(e, dispatcher.QueueFullError):
+                message = {
+                    "content": "This mode is handling too many questions right now. Please try again in a minute.",
+                    "image": None,
+                    "source": "Busy",
+                    "prompt_id": None,
+                }
+                pending = True
+            elif isinstance(e, hf_spaces.CircuitOpenError):
+                message = {
+                    "content": f"The Hugging Face space for this mode is temporarily unavailable. We'll try it again in about {max(1, round(e.retry_in))} seconds.",
+                    "image": None,
+                    "source": "Degraded",
+                    "prompt_id": None,
                 }
+                pending = True
+            elif isinstance(e, (TimeoutError, asyncio.TimeoutError)) and not message.get("content"):
+                message = {
+                    "content": "The Hugging Face space for this mode took too long to respond. Please try again.",
+                    "image": None,
+                    "source": "Timeout",
+                    "prompt_id": None,
+                }
+                pending = True
+            elif not message.get("content"):
+                message = {**error_update, "prompt_id": None}
+                pending = True
+        if pending:
+            await flush(message)
+        if message:
+            await asyncio.to_thread(
+                chat_store.get_store().update, conversation_id, mode, seq, message
             )
+            self._persist_message(mode, {"role": "assistant", **message}, created_at)
+        return None if failed else message
+
+    def _dispatch(
+        self, prompt: Prompt, question: str, context: str, updates: AsyncIterator[dict]
+    ) -> AsyncIterator[dict]:
+        """Run upstream updates within the mode's concurrency limit
+
+        Identical first-turn questions asked while one is in flight share its
+        stream; answers that depend on earlier turns are never shared.
+        """
+        user_key = self.router.session.client_token
+        updates = dispatcher.run(prompt.mode, user_key, updates)
+        if context:
+            return updates
+        return single_flight.share(cache_key(prompt.mode, prompt.id, question), updates)
+
+    async def _dummy_response(self, question: str, prompt: Prompt, context: str = "") -> dict | None:
+        # Built once per model, prompt version and generation params
+        llm_chain = llm_chains.get_chain(prompt)
 
-    async def _query_hf_space(self, question: str, system_prompt: str):
-        from gradio_client import Client
+        async def updates():
+            text = ""
+            async for token in llm_chain.astream(
+                {"question": question, "context": f"{context}\n\n" if context else ""}
+            ):
+                text += token
+                yield {"content": text}
+
+        return await self._stream_message(
+            prompt.mode,
+            self._dispatch(prompt, question, context, updates()),
+            prompt.id,
+            {"content": "Sorry, I couldn't process your request at the moment."},
+        )
+
+    async def _query_hf_space(self, question: str, prompt: Prompt, context: str = "") -> dict | None:
         import json
 
-        space_url = self.hf_space_urls.get(self.active_mode)
-        if not space_url or not space_url.startswith("https://huggingface.co/spaces/"):
+        space_id = hf_spaces.space_id_from_url(self.hf_space_urls.get(prompt.mode))
+        if not space_id:
             async with self:
-                self.chat_histories[self.active_mode].append(
+                await self._append_message(
+                    prompt.mode,
                     {
                         "role": "assistant",
                         "content": "This mode does not have a valid Hugging Face Space configured.",
                         "image": None,
                         "source": "System Error",
+                        "prompt_id": None,
                     }
                 )
-            return
-        space_id = space_url.replace("https://huggingface.co/spaces/", "")
-        try:
-            client = Client(space_id, hf_token=os.environ.get("HUGGINGFACE_API_KEY"))
-            result = client.predict(
-                question=question, system_prompt=system_prompt, api_name="/chat"
-            )
-            if isinstance(result, str):
-                response_data = json.loads(result)
-            else:
-                response_data = result
-            content = response_data.get("generated_text", "No response text found.")
-            image = response_data.get("image_url")
-            source = response_data.get("source_url")
-            async with self:
-                self.chat_histories[self.active_mode].append(
-                    {
-                        "role": "assistant",
-                        "content": content,
-                        "image": image,
-                        "source": source,
-                    }
-                )
-        except Exception as e:
-            logging.exception(f"Error querying HF Space with gradio_client: {e}")
-            async with self:
-                self.chat_histories[self.active_mode].append(
-                    {
-                        "role": "assistant",
-                        "content": f"The Hugging Face space for this mode is currently unavailable. This might be due to setup or maintenance. Please try again later.",
-                        "image": None,
-                        "source": "API Error",
-                    }
-                )
\ No newline at end of file
+            return None
+
+        async def updates():
+            parsed = False
+            # Pooled per Space and streamed without blocking the event loop
+            system_prompt = f"{prompt.text}\n\n{context}" if context else prompt.text
+            async for output in hf_spaces.stream(
+                space_id, question=question, system_prompt=system_prompt, api_name="/chat"
+            ):
+                if isinstance(output, str):
+                    try:
+                        response_data = json.loads(output)
+                    except json.JSONDecodeError:
+                        # Intermediate outputs may be incomplete JSON
+                        continue
+                else:
+                    response_data = output
+                parsed = True
+                yield {
+                    "content": response_data.get("generated_text", NO_RESPONSE_TEXT),
+                    "image": response_data.get("image_url"),
+                    "source": response_data.get("source_url"),
+                }
+            if not parsed:
+                raise ValueError(f"Space {space_id} returned no parseable response")
+
+        return await self._stream_message(
+            prompt.mode,
+            self._dispatch(prompt, question, context, updates()),
+            prompt.id,
+            {
+                "content": "The Hugging Face space for this mode is currently unavailable. This might be due to setup or maintenance. Please try again later.",
+                "image": None,
+                "source": "API Error",
+            },
+        )
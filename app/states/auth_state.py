@@ -1,9 +1,17 @@
 import reflex as rx
 import os
 import logging
-from supabase import Client, create_client
+from supabase_auth import AsyncGoTrueClient
+from app.services import repository, supabase_clients
+from app.services.cache import TTLCache
+from app.services.realtime_hub import realtime_hub
 from typing import Optional
 
+# users rows ({"id", "is_paid"}) keyed by auth_user_id, shared by every session
+# of the worker so page reloads and new tabs skip the lookup query
+USER_CACHE_TTL = float(os.environ.get("USER_CACHE_TTL_SECONDS", "900"))
+user_cache = TTLCache(ttl=USER_CACHE_TTL, maxsize=10_000)
+
 
 class AuthState(rx.State):
     """Manages Supabase authentication state"""
@@ -12,13 +20,12 @@ class AuthState(rx.State):
     email: Optional[str] = None
     is_authenticated: bool = False
     is_paid: bool = False
+    # Database users.id, resolved once at sign-in (backend only)
+    _db_user_id: Optional[str] = None
 
-    def _get_supabase_client(self) -> Client:
-        """Get Supabase client instance"""
-        return create_client(
-            os.environ["SUPABASE_URL"],
-            os.environ["SUPABASE_KEY"]
-        )
+    async def _get_auth_client(self) -> AsyncGoTrueClient:
+        """Get a Supabase auth client for this sign-in only"""
+        return await supabase_clients.get_auth_client()
 
     @rx.var
     def is_logged_in(self) -> bool:
@@ -28,14 +35,23 @@ class AuthState(rx.State):
     @rx.event
     async def check_auth(self):
         """Check authentication status and load user data"""
+        from app.state import AppState
+        from app.states.supabase_state import SupabaseState
+
+        logging.info(f"Auth check: authenticated={self.is_authenticated}, user_id={self.user_id}")
         # For now, just check if we have user_id in state
         if self.user_id and self.is_authenticated:
             await self._ensure_user_exists()
-        logging.info(f"Auth check: authenticated={self.is_authenticated}, user_id={self.user_id}")
+            # Starts persisting the user's conversations (restoring them
+            # into empty modes) and resumes pushed scraper changes
+            return [AppState.restore_conversations, SupabaseState.listen_for_changes]
 
     @rx.event
     async def handle_auth_submit(self, form_data: dict):
         """Handle email/password sign in or sign up"""
+        from app.state import AppState
+        from app.states.supabase_state import SupabaseState
+
         email = form_data.get("email", "").strip()
         password = form_data.get("password", "").strip()
 
@@ -43,12 +59,12 @@ class AuthState(rx.State):
             logging.error("Email or password missing")
             return
 
-        client = self._get_supabase_client()
+        client = await self._get_auth_client()
 
         try:
             # Try to sign in first
             try:
-                response = client.auth.sign_in_with_password({
+                response = await client.sign_in_with_password({
                     "email": email,
                     "password": password
                 })
@@ -62,12 +78,12 @@ class AuthState(rx.State):
                     await self._ensure_user_exists()
 
                     logging.info(f"User signed in: {self.user_id}")
-                    return
+                    return [AppState.restore_conversations, SupabaseState.listen_for_changes]
             except Exception as sign_in_error:
                 # Sign in failed, try to sign up
                 logging.info(f"Sign in failed, trying sign up: {sign_in_error}")
 
-                response = client.auth.sign_up({
+                response = await client.sign_up({
                     "email": email,
                     "password": password
                 })
@@ -81,7 +97,7 @@ class AuthState(rx.State):
                     await self._ensure_user_exists()
 
                     logging.info(f"User signed up: {self.user_id}")
-                    return
+                    return [AppState.restore_conversations, SupabaseState.listen_for_changes]
 
         except Exception as e:
             logging.exception(f"Error in auth: {e}")
@@ -91,52 +107,56 @@ class AuthState(rx.State):
         if not self.user_id or not self.email:
             return
 
+        cached_user = user_cache.get(self.user_id)
+        if cached_user:
+            self._db_user_id = cached_user["id"]
+            self.is_paid = cached_user["is_paid"]
+            return
+
         try:
-            # Use admin client to create user record
-            admin_client = create_client(
-                os.environ["SUPABASE_URL"],
-                os.environ["SUPABASE_SERVICE_ROLE_KEY"]
-            )
-
-            # Check if user exists
-            result = (
-                admin_client.table("users")
-                .select("*")
-                .eq("auth_user_id", self.user_id)
-                .maybe_single()
-                .execute()
-            )
-
-            if result and result.data:
+            # Check if user exists (the repository uses the admin client)
+            user = await repository.get_user_by_auth_id(self.user_id)
+
+            if user:
                 # User exists, load their data
-                self.is_paid = result.data.get("is_paid", False)
-                logging.info(f"User exists with id: {result.data.get('id')}")
+                self.is_paid = user.get("is_paid", False)
+                logging.info(f"User exists with id: {user.get('id')}")
             else:
                 # Create new user record
-                insert_result = admin_client.table("users").insert({
-                    "auth_user_id": self.user_id,
-                    "email": self.email,
-                    "is_paid": False
-                }).execute()
+                user = await repository.create_user(self.user_id, self.email)
 
-                if insert_result and insert_result.data:
+                if user:
                     logging.info(f"Created new user record for {self.user_id}")
                     self.is_paid = False
+
+            if user:
+                self._cache_user(user)
         except Exception as e:
             logging.exception(f"Error ensuring user exists: {e}")
 
+    def _cache_user(self, user: dict):
+        """Remember the database user on this session and in the shared cache"""
+        self._db_user_id = user.get("id")
+        user_cache.set(
+            self.user_id,
+            {"id": user.get("id"), "is_paid": user.get("is_paid", False)},
+        )
+
     @rx.event
     async def sign_out(self):
         """Sign out user"""
-        try:
-            client = self._get_supabase_client()
-            client.auth.sign_out()
-            logging.info("User signed out")
-        except Exception as e:
-            logging.exception(f"Error signing out: {e}")
-        finally:
-            self.user_id = None
-            self.email = None
-            self.is_authenticated = False
-            self.is_paid = False
-            return rx.redirect("/")
+        from app.state import AppState
+
+        # The session obtained at sign-in was left on a discarded auth client
+        # and never stored, so signing out only resets this session's state.
+        logging.info(f"User signed out: {self.user_id}")
+        if self.user_id:
+            user_cache.delete(self.user_id)
+        self._db_user_id = None
+        self.user_id = None
+        self.email = None
+        self.is_authenticated = False
+        self.is_paid = False
+        if realtime_hub is not None:
+            realtime_hub.drop_session(self.router.session.client_token)
+        return [AppState.reset_conversations, AppState.clear_notifications, rx.redirect("/")]
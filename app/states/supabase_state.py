@@ -1,55 +1,190 @@
+import asyncio
 import reflex as rx
-from app.state import AppState, ScrapeResult
+from app.state import NOTIFICATIONS_LIMIT, AppState, Notification, ScrapeResult
+from app.scraping import extract, schedule
+from app.scraping.fetcher import fetcher
+from app.services import repository
+from app.services.cache import TTLCache
+from app.services.realtime_hub import RESYNC, realtime_hub
+from datetime import datetime, timedelta, timezone
 from typing import cast
-import os
 import logging
-import supabase
-import requests
-import json
+import os
+import time
 
+# First page of each user's Active Jobs list, keyed by users.id. Entries younger
+# than SCRAPERS_CACHE_FRESH_SECONDS are served as is; older ones are shown
+# immediately and revalidated in the background until they expire.
+SCRAPERS_CACHE_FRESH_SECONDS = float(os.environ.get("SCRAPERS_CACHE_FRESH_SECONDS", "30"))
+SCRAPERS_CACHE_MAX_AGE_SECONDS = float(os.environ.get("SCRAPERS_CACHE_MAX_AGE_SECONDS", "600"))
+scraper_list_cache = TTLCache(ttl=SCRAPERS_CACHE_MAX_AGE_SECONDS, maxsize=10_000)
+# How often an idle change listener checks that its session is still connected
+LISTEN_IDLE_SECONDS = float(os.environ.get("REALTIME_LISTEN_IDLE_SECONDS", "30"))
+# A listener stops once its session has been disconnected this long, leaving
+# the client time to reconnect with the same token
+LISTEN_DISCONNECT_GRACE_SECONDS = float(
+    os.environ.get("REALTIME_LISTEN_DISCONNECT_GRACE_SECONDS", "120")
+)
+# Only when Reflex doesn't tell whether a session is connected: a listener with
+# no changes for this long stops, and the next one catches up on what it missed
+LISTEN_MAX_IDLE_SECONDS = float(os.environ.get("REALTIME_LISTEN_MAX_IDLE_SECONDS", "1800"))
+# Overlap of feed catch-ups, covering clock skew with the database
+FEED_SYNC_OVERLAP = timedelta(minutes=1)
 
-class SupabaseState(rx.State):
 
-    def _get_client(self) -> supabase.Client:
-        """Get Supabase client with anon key for user-facing operations"""
-        # Create client on each call to avoid serialization issues
-        return supabase.create_client(
-            os.environ["SUPABASE_URL"],
-            os.environ["SUPABASE_KEY"]
-        )
-
-    def _get_admin_client(self) -> supabase.Client:
-        """Get Supabase client with service role key for admin operations"""
-        # Create client on each call to avoid serialization issues
-        return supabase.create_client(
-            os.environ["SUPABASE_URL"],
-            os.environ["SUPABASE_SERVICE_ROLE_KEY"]
-        )
+def _show_first_page(app_state: AppState, scrapers: list, next_cursor: dict | None):
+    """Replace the Active Jobs list with its first page"""
+    # A copy, since the list is edited in place and the cache entry is shared
+    # by every session of the user
+    app_state.scheduled_scrapers = [dict(scraper) for scraper in scrapers]
+    app_state.scrapers_has_more = next_cursor is not None
+    app_state._scrapers_cursor = next_cursor
+    app_state.selected_scraper_ids = []
+
+
+def _cache_first_page(user_id: str, scrapers: list, next_cursor: dict | None):
+    scraper_list_cache.set(
+        user_id,
+        {
+            "scrapers": [dict(scraper) for scraper in scrapers],
+            "cursor": next_cursor,
+            "fetched_at": time.monotonic(),
+        },
+    )
+
+
+def _notification(app_state: AppState, record: dict) -> Notification | None:
+    """Build the feed entry of a logged run, or None if it is not worth one"""
+    summary = record.get("result_summary") or {}
+    if not record.get("success"):
+        error = record.get("error_message") or record.get("status_code") or "unknown error"
+        message = f"Run failed: {error}"
+    elif (record.get("items_found") or 0) > 0:
+        message = summary.get("match_summary") or f"{record['items_found']} new matching items"
+    else:
+        return None
+    name = next(
+        (s["name"] for s in app_state.scheduled_scrapers if s["id"] == record["scraper_id"]),
+        record.get("scraper_name") or "Scraper",
+    )
+    return {
+        "id": record["id"],
+        "scraper_id": record["scraper_id"],
+        "scraper_name": name,
+        "success": bool(record.get("success")),
+        "items_found": record.get("items_found") or 0,
+        "message": message,
+        "executed_at": record.get("executed_at") or "",
+    }
+
+
+def _apply_change(app_state: AppState, change: dict) -> bool:
+    """Apply a pushed row change to a session's state
+
+    Lists are rebuilt and reassigned rather than edited in place, so a change
+    never reaches a list shared with another session. Returns whether the
+    Active Jobs list changed.
+    """
+    record, old_record = change["record"], change["old_record"]
+    scrapers = list(app_state.scheduled_scrapers)
+    if change["table"] == "scheduled_scrapers":
+        scraper_id = record.get("id") or old_record.get("id")
+        index = next((i for i, s in enumerate(scrapers) if s["id"] == scraper_id), None)
+        if change["type"] == "DELETE":
+            if index is None:
+                return False
+            del scrapers[index]
+            app_state.scheduled_scrapers = scrapers
+            app_state.selected_scraper_ids = [
+                selected for selected in app_state.selected_scraper_ids if selected != scraper_id
+            ]
+            if app_state.expanded_scraper_id == scraper_id:
+                app_state.expanded_scraper_id = ""
+                app_state.scraper_executions = []
+                app_state._executions_cursor = None
+            return True
+        summary = repository.to_scraper_summary(record)
+        if index is None:
+            # Updates of rows past the loaded pages are picked up when paged in
+            if change["type"] != "INSERT":
+                return False
+            app_state.scheduled_scrapers = [summary, *scrapers]
+            return True
+        # The row's stats come from scraper_execution_stats changes, and
+        # Realtime formats timestamps differently from PostgREST
+        for field in ("created_at", *repository.SCRAPER_STATS_FIELDS):
+            summary[field] = scrapers[index][field]
+        if summary == scrapers[index]:
+            # Lease and schedule bookkeeping of the scheduler
+            return False
+        scrapers[index] = summary
+        app_state.scheduled_scrapers = scrapers
+        return True
+
+    if change["table"] == "scraper_execution_stats":
+        index = next((i for i, s in enumerate(scrapers) if s["id"] == record.get("scraper_id")), None)
+        if index is None:
+            return False
+        scrapers[index] = {**scrapers[index], **repository.scraper_stats(record)}
+        app_state.scheduled_scrapers = scrapers
+        return True
+
+    if change["table"] == "scraper_executions" and change["type"] == "INSERT":
+        if app_state.expanded_scraper_id == record["scraper_id"]:
+            columns = repository.EXECUTION_SUMMARY_COLUMNS.split(", ")
+            app_state.scraper_executions = [
+                {column: record.get(column) for column in columns},
+                *app_state.scraper_executions,
+            ]
+        notification = _notification(app_state, record)
+        if notification is not None:
+            app_state.notifications = [notification, *app_state.notifications][:NOTIFICATIONS_LIMIT]
+            if app_state.active_scrape_sidebar_tab != "Notifications":
+                app_state.unread_notifications += 1
+    return False
+
+
+def _session_connected(token: str) -> bool | None:
+    """Whether a client token has a live websocket on this worker, or None
+    when Reflex doesn't tell"""
+    from app.app import app
+
+    # token_to_sid is Reflex internals, so don't count on it being there
+    token_to_sid = getattr(getattr(app, "event_namespace", None), "token_to_sid", None)
+    if not isinstance(token_to_sid, dict):
+        return None
+    return token in token_to_sid
+
+
+class SupabaseState(rx.State):
 
     async def _get_current_user_db_id(self) -> str | None:
         """Get current authenticated user's database ID"""
-        from app.states.auth_state import AuthState
+        from app.states.auth_state import AuthState, user_cache
 
         auth_state = await self.get_state(AuthState)
         if not auth_state.user_id:
             logging.info("No authenticated user")
             return None
 
+        # Resolved once at sign-in and cached on AuthState
+        if auth_state._db_user_id:
+            return auth_state._db_user_id
+
+        cached_user = user_cache.get(auth_state.user_id)
+        if cached_user:
+            auth_state._db_user_id = cached_user["id"]
+            return cached_user["id"]
+
         # Query users table by auth_user_id
-        # Use admin client to bypass RLS policies (server-side lookup)
-        client = self._get_admin_client()
+        # The repository uses the admin client to bypass RLS (server-side lookup)
         try:
-            result = (
-                client.table("users")
-                .select("*")
-                .eq("auth_user_id", auth_state.user_id)
-                .maybe_single()
-                .execute()
-            )
-
-            if result and result.data:
-                logging.info(f"Found user database ID: {result.data.get('id')}")
-                return result.data.get("id")
+            user = await repository.get_user_by_auth_id(auth_state.user_id)
+
+            if user:
+                logging.info(f"Found user database ID: {user.get('id')}")
+                auth_state._cache_user(user)
+                return user.get("id")
 
             logging.warning(f"No user record found for auth_user_id: {auth_state.user_id}")
             return None
@@ -65,15 +200,13 @@ class SupabaseState(rx.State):
                 return
             app_state.is_loading = True
             app_state.scraped_data = None
-            app_state.chat_histories[app_state.active_mode] = []
+            await app_state._clear_messages(app_state.active_mode)
 
             # Get current user's database ID
             user_id = await self._get_current_user_db_id()
+        saved = False
         if user_id:
             try:
-                # Use admin client to bypass RLS for server-side insert
-                client = self._get_admin_client()
-
                 # Format time as HH:MM:SS
                 time_utc = app_state.scrape_time if app_state.scrape_time else "12:00"
                 if len(time_utc.split(":")) == 2:
@@ -85,7 +218,8 @@ class SupabaseState(rx.State):
                 # Convert day_number to int
                 day_number = int(app_state.scrape_day_number) if app_state.scrape_day_number else 1
 
-                client.table("scheduled_scrapers").insert(
+                # The repository uses the admin client to bypass RLS for server-side insert
+                saved = await repository.insert_scraper(
                     {
                         "user_id": user_id,
                         "name": app_state.scrape_url,
@@ -93,48 +227,79 @@ class SupabaseState(rx.State):
                         "regularity": app_state.scrape_regularity,
                         "day_number": day_number,
                         "time_utc": time_utc,
+                        # Picked up by the scheduler once this passes
+                        "next_execution": schedule.next_execution(
+                            app_state.scrape_regularity, day_number, time_utc
+                        ).isoformat(),
                         "scraper_service": "default",
                         "prompt_summary": f"Scrape {app_state.scrape_url}",
                         "monitoring": bool(app_state.scrape_monitoring),
                     }
-                ).execute()
+                ) is not None
+                scraper_list_cache.delete(user_id)
             except Exception as e:
                 logging.exception(f"Error inserting scheduled scraper: {e}")
         try:
-            scraped_data = {
-                "success": True,
-                "title": f"Scrape Planned for {app_state.scrape_url}",
-                "preview": "This scrape has been saved to your active jobs. The N8N workflow was not triggered.",
-                "url": app_state.scrape_url,
-                "error": None,
-            }
+            # A real fetch, so the preview shows what the scheduled runs will see
+            result = await fetcher.fetch(app_state.scrape_url)
+            if result.ok:
+                title, preview = await asyncio.to_thread(extract.preview, result.text)
+                scraped_data = {
+                    "success": True,
+                    "title": title or result.url,
+                    "preview": preview,
+                    "url": result.url,
+                    "error": None,
+                }
+            else:
+                scraped_data = {
+                    "success": False,
+                    "title": f"Could not fetch {app_state.scrape_url}",
+                    "preview": "",
+                    "url": app_state.scrape_url,
+                    "error": result.error,
+                }
             async with app_state:
                 app_state.scraped_data = cast(ScrapeResult, scraped_data)
-                app_state.chat_histories["SCRAPE"].append(
+                await app_state._append_message(
+                    "SCRAPE",
                     {
                         "role": "assistant",
                         "content": app_state.scraped_data["title"],
                         "image": "https://images.unsplash.com/photo-1504711434969-e33886168f5c?q=80&w=2070&auto=format&fit=crop&ixlib=rb-4.0.3&ixid=M3wxMjA3fDB8MHxwaG90by1wYWdlfHx8fGVufDB8fHx8fA%3D%3D",
                         "source": app_state.scraped_data["url"],
+                        "prompt_id": None,
                     }
                 )
-                app_state.chat_histories["SCRAPE"].append(
+                if scraped_data["success"] and saved:
+                    content = f"{scraped_data['preview']}\n\nScrape job saved. You can view it in the 'Active Jobs' tab. You can now use the chat to proceed."
+                elif scraped_data["success"]:
+                    content = f"{scraped_data['preview']}\n\nThe scrape job could not be saved, so it won't run on schedule. Please try again."
+                elif saved:
+                    content = f"The page could not be fetched ({scraped_data['error']}). The scrape job was still saved and will be retried on schedule."
+                else:
+                    content = f"The page could not be fetched ({scraped_data['error']}), and the scrape job could not be saved."
+                await app_state._append_message(
+                    "SCRAPE",
                     {
                         "role": "assistant",
-                        "content": "Scrape job saved. You can view it in the 'Active Jobs' tab. You can now use the chat to proceed.",
+                        "content": content,
                         "image": None,
                         "source": None,
+                        "prompt_id": None,
                     }
                 )
         except Exception as e:
-            logging.exception(f"Error creating mock scrape data: {e}")
+            logging.exception(f"Error previewing scrape: {e}")
             async with app_state:
-                app_state.chat_histories["SCRAPE"].append(
+                await app_state._append_message(
+                    "SCRAPE",
                     {
                         "role": "assistant",
                         "content": f"Failed to create scrape job. Error: {str(e)}",
                         "image": None,
                         "source": "System Error",
+                        "prompt_id": None,
                     }
                 )
         finally:
@@ -143,6 +308,7 @@ class SupabaseState(rx.State):
 
     @rx.event
     async def fetch_scrapers(self):
+        """Load the first page of the Active Jobs list"""
         app_state = await self.get_state(AppState)
         app_state.scrapers_loading = True
 
@@ -152,35 +318,315 @@ class SupabaseState(rx.State):
 
             if not user_id:
                 app_state.scheduled_scrapers = []
+                app_state.scrapers_has_more = False
+                app_state._scrapers_cursor = None
                 return
 
-            # Use admin client to bypass RLS for server-side fetch
-            client = self._get_admin_client()
-            scrapers_data = (
-                client.table("scheduled_scrapers")
-                .select("*")
-                .eq("user_id", user_id)
-                .order("created_at", desc=True)
-                .execute()
-            )
-            app_state.scheduled_scrapers = scrapers_data.data if scrapers_data.data else []
+            # The repository uses the admin client to bypass RLS for server-side fetch
+            scrapers, next_cursor = await repository.list_scrapers(user_id)
+            _cache_first_page(user_id, scrapers, next_cursor)
+            _show_first_page(app_state, scrapers, next_cursor)
         except Exception as e:
             logging.exception(f"Error fetching scrapers from Supabase: {e}")
             app_state.scheduled_scrapers = []
+            app_state.scrapers_has_more = False
+            app_state._scrapers_cursor = None
         finally:
             app_state.scrapers_loading = False
 
+    @rx.event
+    async def show_active_jobs(self):
+        """Show the Active Jobs list, from cache when possible"""
+        app_state = await self.get_state(AppState)
+        # A loaded list is kept current by listen_for_changes
+        if realtime_hub is not None and realtime_hub.listening(self.router.session.client_token):
+            if app_state.scheduled_scrapers:
+                return
+            events = []
+        else:
+            # The listener stopped: start it again, catching up on the way
+            events = [SupabaseState.listen_for_changes] if realtime_hub is not None else []
+        user_id = await self._get_current_user_db_id()
+        entry = scraper_list_cache.get(user_id) if user_id else None
+        if entry is None:
+            return [*events, SupabaseState.fetch_scrapers]
+
+        _show_first_page(app_state, entry["scrapers"], entry["cursor"])
+        if time.monotonic() - entry["fetched_at"] > SCRAPERS_CACHE_FRESH_SECONDS:
+            events.append(SupabaseState.revalidate_scrapers)
+        return events or None
+
     @rx.event(background=True)
-    async def delete_scraper(self, scraper_id: str):
-        """Delete a scraper and refresh the list"""
-        logging.info(f"Deleting scraper with id: {scraper_id}")
+    async def revalidate_scrapers(self):
+        """Refresh the cached first page without showing a loading state"""
+        async with self:
+            app_state = await self.get_state(AppState)
+            shown_cursor = app_state._scrapers_cursor
+            user_id = await self._get_current_user_db_id()
+        if not user_id:
+            return
         try:
-            # Use admin client to bypass RLS for server-side delete
-            client = self._get_admin_client()
-            client.table("scheduled_scrapers").delete().eq("id", scraper_id).execute()
-            logging.info(f"Successfully deleted scraper: {scraper_id}")
+            scrapers, next_cursor = await repository.list_scrapers(user_id)
         except Exception as e:
-            logging.exception(f"Error deleting scraper from Supabase: {e}")
+            logging.exception(f"Error revalidating scrapers from Supabase: {e}")
+            return
+        _cache_first_page(user_id, scrapers, next_cursor)
+        async with self:
+            app_state = await self.get_state(AppState)
+            # Leave the list alone if the user has paged further in the meantime
+            if app_state._scrapers_cursor == shown_cursor and not app_state.scrapers_loading_more:
+                _show_first_page(app_state, scrapers, next_cursor)
 
-        # Refresh the scrapers list
-        yield SupabaseState.fetch_scrapers
\ No newline at end of file
+    async def _catch_up_feed(self, user_id: str, since: str) -> None:
+        """Add the failed or matching runs logged since a time, and missed by
+        the session's listener, to the notifications feed"""
+        synced_at = datetime.now(timezone.utc) - FEED_SYNC_OVERLAP
+        try:
+            records = await repository.list_notable_executions(user_id, since, NOTIFICATIONS_LIMIT)
+        except Exception as e:
+            logging.exception(f"Error catching up on scraper executions: {e}")
+            return
+        async with self:
+            app_state = await self.get_state(AppState)
+            known_ids = {notification["id"] for notification in app_state.notifications}
+            missed = [
+                notification
+                for record in records
+                if record["id"] not in known_ids
+                and (notification := _notification(app_state, record)) is not None
+            ]
+            if missed:
+                app_state.notifications = [*missed, *app_state.notifications][:NOTIFICATIONS_LIMIT]
+                if app_state.active_scrape_sidebar_tab != "Notifications":
+                    app_state.unread_notifications += len(missed)
+            app_state._feed_synced_at = synced_at.isoformat()
+
+    @rx.event(background=True)
+    async def listen_for_changes(self):
+        """Apply the signed-in user's scraper changes pushed by the Realtime
+        hub for as long as the session is connected, until it signs out"""
+        token = self.router.session.client_token
+        if realtime_hub is None or realtime_hub.listening(token):
+            return
+        async with self:
+            user_id = await self._get_current_user_db_id()
+            app_state = await self.get_state(AppState)
+            since = app_state._feed_synced_at
+            if user_id and not since:
+                app_state._feed_synced_at = (
+                    datetime.now(timezone.utc) - FEED_SYNC_OVERLAP
+                ).isoformat()
+        if not user_id:
+            return
+        queue = realtime_hub.subscribe(user_id, token)
+        if since:
+            # An earlier listener of this session stopped: catch up on the
+            # changes pushed since
+            queue.put_nowait(RESYNC)
+        last_change = time.monotonic()
+        disconnected_since = None
+        try:
+            while True:
+                try:
+                    change = await asyncio.wait_for(queue.get(), LISTEN_IDLE_SECONDS)
+                except asyncio.TimeoutError:
+                    connected = _session_connected(token)
+                    now = time.monotonic()
+                    if connected is False:
+                        if disconnected_since is None:
+                            disconnected_since = now
+                        if now - disconnected_since > LISTEN_DISCONNECT_GRACE_SECONDS:
+                            return
+                    else:
+                        disconnected_since = None
+                    # Without a connection status, bound abandoned listeners
+                    # by a long quiet spell instead
+                    if connected is None and now - last_change > LISTEN_MAX_IDLE_SECONDS:
+                        return
+                    continue
+                last_change = time.monotonic()
+                # Apply whatever else arrived meanwhile under the same lock
+                changes = [change]
+                while not queue.empty():
+                    changes.append(queue.get_nowait())
+                stop = None in changes
+                if stop:
+                    changes = changes[: changes.index(None)]
+                resync = list_changed = False
+                async with self:
+                    app_state = await self.get_state(AppState)
+                    for change in changes:
+                        if change["type"] == "RESYNC":
+                            resync = True
+                        elif _apply_change(app_state, change):
+                            list_changed = True
+                    since = app_state._feed_synced_at
+                    list_loaded = bool(app_state.scheduled_scrapers)
+                if list_changed or resync:
+                    scraper_list_cache.delete(user_id)
+                if resync:
+                    await self._catch_up_feed(user_id, since)
+                    if list_loaded:
+                        yield SupabaseState.revalidate_scrapers
+                if stop:
+                    return
+        finally:
+            realtime_hub.unsubscribe(user_id, token, queue)
+
+    @rx.event(background=True)
+    async def load_more_scrapers(self):
+        """Append the next page of the Active Jobs list"""
+        async with self:
+            app_state = await self.get_state(AppState)
+            cursor = app_state._scrapers_cursor
+            if app_state.scrapers_loading_more or not cursor:
+                return
+            app_state.scrapers_loading_more = True
+            user_id = await self._get_current_user_db_id()
+
+        scrapers, next_cursor = [], cursor
+        try:
+            if user_id:
+                scrapers, next_cursor = await repository.list_scrapers(user_id, after=cursor)
+        except Exception as e:
+            logging.exception(f"Error fetching more scrapers from Supabase: {e}")
+        finally:
+            async with self:
+                app_state = await self.get_state(AppState)
+                # Ignore the page if the list was reloaded in the meantime
+                if app_state._scrapers_cursor == cursor:
+                    known_ids = {scraper["id"] for scraper in app_state.scheduled_scrapers}
+                    app_state.scheduled_scrapers.extend(
+                        scraper for scraper in scrapers if scraper["id"] not in known_ids
+                    )
+                    app_state._scrapers_cursor = next_cursor
+                    app_state.scrapers_has_more = next_cursor is not None
+                app_state.scrapers_loading_more = False
+
+    @rx.event(background=True)
+    async def toggle_scraper_executions(self, scraper_id: str):
+        """Open a scraper's execution history, or close it if already open"""
+        async with self:
+            app_state = await self.get_state(AppState)
+            if app_state.expanded_scraper_id == scraper_id:
+                app_state.expanded_scraper_id = ""
+                app_state.scraper_executions = []
+                app_state._executions_cursor = None
+                return
+            # Only the user's own scrapers, which are the ones listed
+            if not any(scraper["id"] == scraper_id for scraper in app_state.scheduled_scrapers):
+                return
+            app_state.expanded_scraper_id = scraper_id
+            app_state.scraper_executions = []
+            app_state.executions_has_more = False
+            app_state._executions_cursor = None
+            app_state.executions_loading = True
+
+        executions, next_cursor = [], None
+        try:
+            executions, next_cursor = await repository.list_executions(scraper_id)
+        except Exception as e:
+            logging.exception(f"Error fetching scraper executions from Supabase: {e}")
+        finally:
+            async with self:
+                app_state = await self.get_state(AppState)
+                # Ignore the page if another row was opened in the meantime
+                if app_state.expanded_scraper_id == scraper_id:
+                    app_state.scraper_executions = executions
+                    app_state._executions_cursor = next_cursor
+                    app_state.executions_has_more = next_cursor is not None
+                    app_state.executions_loading = False
+
+    @rx.event(background=True)
+    async def load_more_executions(self):
+        """Append the next page of the open execution history"""
+        async with self:
+            app_state = await self.get_state(AppState)
+            scraper_id = app_state.expanded_scraper_id
+            cursor = app_state._executions_cursor
+            if app_state.executions_loading or not (scraper_id and cursor):
+                return
+            app_state.executions_loading = True
+
+        executions, next_cursor = [], cursor
+        try:
+            executions, next_cursor = await repository.list_executions(scraper_id, after=cursor)
+        except Exception as e:
+            logging.exception(f"Error fetching more scraper executions from Supabase: {e}")
+        finally:
+            async with self:
+                app_state = await self.get_state(AppState)
+                if (
+                    app_state.expanded_scraper_id == scraper_id
+                    and app_state._executions_cursor == cursor
+                ):
+                    app_state.scraper_executions.extend(executions)
+                    app_state._executions_cursor = next_cursor
+                    app_state.executions_has_more = next_cursor is not None
+                app_state.executions_loading = False
+
+    async def _delete_scrapers(self, scraper_ids: list[str]) -> bool:
+        """Remove scrapers from the list right away, restoring them if the
+        delete fails or removes fewer rows than asked
+
+        Returns whether every scraper was deleted.
+        """
+        ids = set(scraper_ids)
+        async with self:
+            app_state = await self.get_state(AppState)
+            removed = [
+                (index, scraper)
+                for index, scraper in enumerate(app_state.scheduled_scrapers)
+                if scraper["id"] in ids
+            ]
+            app_state.scheduled_scrapers = [
+                scraper for scraper in app_state.scheduled_scrapers if scraper["id"] not in ids
+            ]
+            app_state.selected_scraper_ids = [
+                scraper_id for scraper_id in app_state.selected_scraper_ids if scraper_id not in ids
+            ]
+            user_id = await self._get_current_user_db_id()
+
+        try:
+            if not user_id:
+                raise RuntimeError("No authenticated user")
+            # The repository uses the admin client to bypass RLS for server-side delete
+            deleted = await repository.delete_scrapers(user_id, list(ids))
+            scraper_list_cache.delete(user_id)
+            logging.info(f"Deleted {deleted} of {len(ids)} scrapers")
+            if deleted == len(ids):
+                return True
+            # Some rows weren't removed (or were already gone): show them
+            # again and let revalidate_scrapers settle which are left
+            logging.warning(f"Only {deleted} of {len(ids)} scrapers were deleted")
+        except Exception as e:
+            logging.exception(f"Error deleting scrapers from Supabase: {e}")
+        async with self:
+            app_state = await self.get_state(AppState)
+            present = {scraper["id"] for scraper in app_state.scheduled_scrapers}
+            # Put the rows back where they were
+            for index, scraper in removed:
+                if scraper["id"] not in present:
+                    app_state.scheduled_scrapers.insert(index, scraper)
+        return False
+
+    @rx.event(background=True)
+    async def delete_scraper(self, scraper_id: str):
+        """Delete a scraper, updating the list optimistically"""
+        logging.info(f"Deleting scraper with id: {scraper_id}")
+        if not await self._delete_scrapers([scraper_id]):
+            yield rx.toast.error("Could not delete the scraper. Please try again.")
+            yield SupabaseState.revalidate_scrapers
+
+    @rx.event(background=True)
+    async def delete_selected_scrapers(self):
+        """Delete every selected scraper with a single request"""
+        async with self:
+            app_state = await self.get_state(AppState)
+            scraper_ids = list(app_state.selected_scraper_ids)
+        if not scraper_ids:
+            return
+        logging.info(f"Deleting {len(scraper_ids)} selected scrapers")
+        if not await self._delete_scrapers(scraper_ids):
+            yield rx.toast.error("Could not delete all of the selected scrapers. Please try again.")
+            yield SupabaseState.revalidate_scrapers
@@ -0,0 +1,4 @@
+-- Active Jobs pages are keyed on (created_at, id) per user, newest first.
+-- This index serves both the equality on user_id and the keyset range scan.
+CREATE INDEX IF NOT EXISTS idx_scheduled_scrapers_user_created_at
+    ON scheduled_scrapers (user_id, created_at DESC, id DESC);
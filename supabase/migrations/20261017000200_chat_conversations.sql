@@ -0,0 +1,28 @@
+-- Durable chat transcripts: one conversation per user and mode, messages
+-- written in batches by the app's write-behind buffer. Message ids are
+-- generated by the app so retried batches are idempotent.
+CREATE TABLE IF NOT EXISTS chat_conversations (
+    id          UUID        PRIMARY KEY DEFAULT uuid_generate_v4(),
+    user_id     UUID        NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    mode        TEXT        NOT NULL,
+    created_at  TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    CONSTRAINT chat_conversations_user_mode_key UNIQUE (user_id, mode)
+);
+
+CREATE TABLE IF NOT EXISTS chat_messages (
+    id               UUID        PRIMARY KEY,
+    conversation_id  UUID        NOT NULL REFERENCES chat_conversations(id) ON DELETE CASCADE,
+    role             TEXT        NOT NULL,
+    content          TEXT        NOT NULL,
+    image            TEXT,
+    source           TEXT,
+    prompt_id        TEXT,
+    created_at       TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- Restore reads the newest messages of a conversation
+CREATE INDEX IF NOT EXISTS idx_chat_messages_conversation_created_at
+    ON chat_messages (conversation_id, created_at DESC);
+
+ALTER TABLE chat_conversations ENABLE ROW LEVEL SECURITY;
+ALTER TABLE chat_messages ENABLE ROW LEVEL SECURITY;
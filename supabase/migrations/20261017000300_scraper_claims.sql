@@ -0,0 +1,77 @@
+-- In-repo scheduler: workers claim due scrapers in batches under a lease and
+-- write their next run times back in bulk.
+
+ALTER TABLE scheduled_scrapers
+    ADD COLUMN IF NOT EXISTS claimed_by    TEXT,
+    ADD COLUMN IF NOT EXISTS claimed_until TIMESTAMPTZ;
+
+-- Claims up to p_limit due scrapers for p_worker_id. Rows locked by another
+-- worker's claim in progress are skipped rather than waited on, and a claim
+-- whose lease ran out (its worker died) can be taken over.
+CREATE OR REPLACE FUNCTION claim_due_scrapers(
+    p_worker_id     TEXT,
+    p_limit         INTEGER DEFAULT 100,
+    p_lease_seconds INTEGER DEFAULT 300
+)
+RETURNS TABLE (
+    id              UUID,
+    user_id         UUID,
+    name            VARCHAR(255),
+    criteria        TEXT,
+    regularity      regularity_type,
+    day_number      SMALLINT,
+    time_utc        TIME,
+    timezone        VARCHAR(100),
+    next_execution  TIMESTAMPTZ,
+    scraper_service VARCHAR(100)
+)
+LANGUAGE sql
+SET search_path = public
+AS $$
+    WITH due AS (
+        SELECT s.id
+        FROM scheduled_scrapers s
+        JOIN users u ON u.id = s.user_id
+        WHERE s.monitoring = TRUE
+          AND s.next_execution <= NOW()
+          AND u.credits_remaining > 0
+          AND (s.claimed_until IS NULL OR s.claimed_until < NOW())
+        ORDER BY s.next_execution
+        LIMIT p_limit
+        FOR UPDATE OF s SKIP LOCKED
+    )
+    UPDATE scheduled_scrapers s
+    SET claimed_by = p_worker_id,
+        claimed_until = NOW() + make_interval(secs => p_lease_seconds)
+    FROM due
+    WHERE s.id = due.id
+    RETURNING s.id, s.user_id, s.name, s.criteria, s.regularity, s.day_number,
+              s.time_utc, s.timezone, s.next_execution, s.scraper_service;
+$$;
+
+-- Releases a batch of claims in one statement, setting each scraper's next
+-- run. p_runs is a JSON array of {"scraper_id": uuid, "next_execution": ts}.
+-- Claims that were taken over by another worker are left alone.
+CREATE OR REPLACE FUNCTION complete_scraper_runs(
+    p_worker_id TEXT,
+    p_runs      JSONB
+)
+RETURNS INTEGER
+LANGUAGE sql
+SET search_path = public
+AS $$
+    WITH runs AS (
+        SELECT *
+        FROM jsonb_to_recordset(p_runs) AS r(scraper_id UUID, next_execution TIMESTAMPTZ)
+    ), updated AS (
+        UPDATE scheduled_scrapers s
+        SET next_execution = runs.next_execution,
+            claimed_by = NULL,
+            claimed_until = NULL
+        FROM runs
+        WHERE s.id = runs.scraper_id
+          AND s.claimed_by = p_worker_id
+        RETURNING 1
+    )
+    SELECT COUNT(*)::INTEGER FROM updated;
+$$;
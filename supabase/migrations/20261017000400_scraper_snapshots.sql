@@ -0,0 +1,16 @@
+-- Content fingerprint of each monitored page as of its last run, so a run
+-- only has to look at the blocks that changed since. Validators let the next
+-- fetch be a conditional GET.
+CREATE TABLE IF NOT EXISTS scraper_snapshots (
+    scraper_id     UUID        PRIMARY KEY REFERENCES scheduled_scrapers(id) ON DELETE CASCADE,
+    url            TEXT        NOT NULL,
+    etag           TEXT,
+    last_modified  TEXT,
+    -- 64-bit simhash of the page's main text (signed, as BIGINT)
+    simhash        BIGINT      NOT NULL,
+    -- Hash of each normalized text block, in page order
+    block_hashes   TEXT[]      NOT NULL DEFAULT '{}',
+    updated_at     TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+ALTER TABLE scraper_snapshots ENABLE ROW LEVEL SECURITY;
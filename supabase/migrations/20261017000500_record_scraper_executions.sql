@@ -0,0 +1,61 @@
+-- Set-based counterpart of record_scraper_execution: logs a batch of runs in
+-- one statement. Rows carry app-generated ids, so a batch that is delivered
+-- again after a lost response inserts, charges and updates nothing twice.
+-- p_executions is a JSON array of scraper_executions rows.
+CREATE OR REPLACE FUNCTION record_scraper_executions(p_executions JSONB)
+RETURNS INTEGER
+LANGUAGE sql
+SET search_path = public
+AS $$
+    WITH input AS (
+        SELECT *
+        FROM jsonb_to_recordset(p_executions) AS e(
+            id                UUID,
+            scraper_id        UUID,
+            executed_at       TIMESTAMPTZ,
+            success           BOOLEAN,
+            status_code       INTEGER,
+            error_message     TEXT,
+            items_found       INTEGER,
+            credits_used      INTEGER,
+            execution_time_ms INTEGER,
+            result_summary    JSONB
+        )
+    ), inserted AS (
+        INSERT INTO scraper_executions (
+            id, scraper_id, executed_at, success, status_code, error_message,
+            items_found, credits_used, execution_time_ms, result_summary
+        )
+        -- Runs of scrapers deleted in the meantime are dropped rather than
+        -- failing the whole batch on the foreign key
+        SELECT i.id, i.scraper_id, COALESCE(i.executed_at, NOW()), i.success,
+               i.status_code, i.error_message, COALESCE(i.items_found, 0),
+               COALESCE(i.credits_used, 0), i.execution_time_ms, i.result_summary
+        FROM input i
+        JOIN scheduled_scrapers s ON s.id = i.scraper_id
+        ON CONFLICT (id) DO NOTHING
+        RETURNING scraper_id, executed_at, success, credits_used
+    ), last_runs AS (
+        UPDATE scheduled_scrapers s
+        SET last_execution = GREATEST(s.last_execution, r.executed_at)
+        FROM (
+            SELECT scraper_id, MAX(executed_at) AS executed_at
+            FROM inserted
+            WHERE success
+            GROUP BY scraper_id
+        ) r
+        WHERE s.id = r.scraper_id
+    ), charges AS (
+        UPDATE users u
+        SET credits_remaining = GREATEST(u.credits_remaining - c.credits, 0)
+        FROM (
+            SELECT s.user_id, SUM(i.credits_used) AS credits
+            FROM inserted i
+            JOIN scheduled_scrapers s ON s.id = i.scraper_id
+            GROUP BY s.user_id
+        ) c
+        WHERE u.id = c.user_id
+          AND c.credits > 0
+    )
+    SELECT COUNT(*)::INTEGER FROM inserted;
+$$;
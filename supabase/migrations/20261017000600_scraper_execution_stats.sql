@@ -0,0 +1,102 @@
+-- Per-scraper execution stats for the Active Jobs list, kept up to date as
+-- executions are logged so listing scrapers never scans their history.
+CREATE TABLE IF NOT EXISTS scraper_execution_stats (
+    scraper_id               UUID        PRIMARY KEY REFERENCES scheduled_scrapers(id) ON DELETE CASCADE,
+    runs                     BIGINT      NOT NULL DEFAULT 0,
+    successes                BIGINT      NOT NULL DEFAULT 0,
+    -- Runs with an execution_time_ms, and the sum of those times
+    timed_runs               BIGINT      NOT NULL DEFAULT 0,
+    total_execution_time_ms  BIGINT      NOT NULL DEFAULT 0,
+    last_executed_at         TIMESTAMPTZ,
+    last_success             BOOLEAN,
+    last_status_code         INTEGER,
+    last_error_message       TEXT,
+    updated_at               TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+ALTER TABLE scraper_execution_stats ENABLE ROW LEVEL SECURITY;
+
+-- Folds a statement's inserted executions into the stats with one upsert per
+-- scraper, so a batch from record_scraper_executions costs one statement
+CREATE OR REPLACE FUNCTION rollup_scraper_executions()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SET search_path = public
+AS $$
+BEGIN
+    WITH totals AS (
+        SELECT scraper_id,
+               COUNT(*) AS runs,
+               COUNT(*) FILTER (WHERE success) AS successes,
+               COUNT(execution_time_ms) AS timed_runs,
+               COALESCE(SUM(execution_time_ms), 0) AS total_execution_time_ms
+        FROM new_executions
+        GROUP BY scraper_id
+    ), latest AS (
+        SELECT DISTINCT ON (scraper_id)
+               scraper_id, executed_at, success, status_code, error_message
+        FROM new_executions
+        ORDER BY scraper_id, executed_at DESC
+    )
+    INSERT INTO scraper_execution_stats AS st (
+        scraper_id, runs, successes, timed_runs, total_execution_time_ms,
+        last_executed_at, last_success, last_status_code, last_error_message
+    )
+    SELECT t.scraper_id, t.runs, t.successes, t.timed_runs, t.total_execution_time_ms,
+           l.executed_at, l.success, l.status_code, l.error_message
+    FROM totals t
+    JOIN latest l USING (scraper_id)
+    ON CONFLICT (scraper_id) DO UPDATE SET
+        runs = st.runs + EXCLUDED.runs,
+        successes = st.successes + EXCLUDED.successes,
+        timed_runs = st.timed_runs + EXCLUDED.timed_runs,
+        total_execution_time_ms = st.total_execution_time_ms + EXCLUDED.total_execution_time_ms,
+        -- Late-arriving batches (replayed spills) don't override a newer run
+        last_executed_at = GREATEST(st.last_executed_at, EXCLUDED.last_executed_at),
+        last_success = CASE WHEN st.last_executed_at > EXCLUDED.last_executed_at
+                            THEN st.last_success ELSE EXCLUDED.last_success END,
+        last_status_code = CASE WHEN st.last_executed_at > EXCLUDED.last_executed_at
+                                THEN st.last_status_code ELSE EXCLUDED.last_status_code END,
+        last_error_message = CASE WHEN st.last_executed_at > EXCLUDED.last_executed_at
+                                  THEN st.last_error_message ELSE EXCLUDED.last_error_message END,
+        updated_at = NOW();
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_rollup_scraper_executions ON scraper_executions;
+CREATE TRIGGER trg_rollup_scraper_executions
+    AFTER INSERT ON scraper_executions
+    REFERENCING NEW TABLE AS new_executions
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION rollup_scraper_executions();
+
+-- Stats of the history logged before the trigger existed
+INSERT INTO scraper_execution_stats (
+    scraper_id, runs, successes, timed_runs, total_execution_time_ms,
+    last_executed_at, last_success, last_status_code, last_error_message
+)
+SELECT t.scraper_id, t.runs, t.successes, t.timed_runs, t.total_execution_time_ms,
+       l.executed_at, l.success, l.status_code, l.error_message
+FROM (
+    SELECT scraper_id,
+           COUNT(*) AS runs,
+           COUNT(*) FILTER (WHERE success) AS successes,
+           COUNT(execution_time_ms) AS timed_runs,
+           COALESCE(SUM(execution_time_ms), 0) AS total_execution_time_ms
+    FROM scraper_executions
+    GROUP BY scraper_id
+) t
+JOIN (
+    SELECT DISTINCT ON (scraper_id)
+           scraper_id, executed_at, success, status_code, error_message
+    FROM scraper_executions
+    ORDER BY scraper_id, executed_at DESC
+) l USING (scraper_id)
+ON CONFLICT (scraper_id) DO NOTHING;
+
+-- Execution history drill-down: one scraper's runs, newest first, paged by
+-- (executed_at, id). The global idx_scraper_executions_executed_at index
+-- would have to skip over every other scraper's runs.
+CREATE INDEX IF NOT EXISTS idx_scraper_executions_scraper_executed_at
+    ON scraper_executions (scraper_id, executed_at DESC, id DESC);
@@ -0,0 +1,20 @@
+-- Stream changes of the tables behind the Active Jobs list and the
+-- notifications feed to Supabase Realtime, which each app worker subscribes
+-- to once instead of sessions polling the tables.
+DO $$
+DECLARE
+    t TEXT;
+BEGIN
+    FOREACH t IN ARRAY ARRAY['scheduled_scrapers', 'scraper_executions', 'scraper_execution_stats']
+    LOOP
+        IF NOT EXISTS (
+            SELECT 1 FROM pg_publication_tables
+            WHERE pubname = 'supabase_realtime'
+              AND schemaname = 'public'
+              AND tablename = t
+        ) THEN
+            EXECUTE format('ALTER PUBLICATION supabase_realtime ADD TABLE public.%I', t);
+        END IF;
+    END LOOP;
+END;
+$$;
@@ -0,0 +1,15 @@
+-- Computed column for the Active Jobs cards, which only show the start of a
+-- scraper's criteria. PostgREST exposes it as scheduled_scrapers.criteria_preview,
+-- so list queries download the preview instead of the full criteria text.
+-- Keep the length in step with repository.CRITERIA_PREVIEW_LENGTH.
+CREATE OR REPLACE FUNCTION criteria_preview(scheduled_scrapers)
+RETURNS TEXT
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT CASE
+        WHEN char_length($1.criteria) > 120
+            THEN rtrim(left($1.criteria, 119)) || '…'
+        ELSE COALESCE($1.criteria, '')
+    END;
+$$;
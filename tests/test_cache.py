@@ -0,0 +1,53 @@
+import unittest
+from unittest import mock
+from app.services import cache as cache_module
+from app.services.cache import TTLCache
+
+
+class TTLCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch.object(cache_module.time, "monotonic", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_entries_expire_after_ttl(self):
+        cache = TTLCache(ttl=10)
+        cache.set("a", 1)
+        self.now += 9
+        self.assertEqual(cache.get("a"), 1)
+        self.now += 1
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 0)
+
+    def test_per_entry_ttl_overrides_default(self):
+        cache = TTLCache(ttl=10)
+        cache.set("short", 1, ttl=1)
+        cache.set("long", 2)
+        self.now += 5
+        self.assertIsNone(cache.get("short"))
+        self.assertEqual(cache.get("long"), 2)
+
+    def test_evicts_least_recently_used(self):
+        cache = TTLCache(ttl=10, maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        # Reading "a" makes "b" the least recently used
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.get("c"), 3)
+
+    def test_get_returns_default_for_missing(self):
+        cache = TTLCache(ttl=10)
+        self.assertEqual(cache.get("missing", "default"), "default")
+
+    def test_delete_and_clear(self):
+        cache = TTLCache(ttl=10)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.delete("a")
+        self.assertIsNone(cache.get("a"))
+        cache.clear()
+        self.assertEqual(len(cache), 0)
@@ -0,0 +1,100 @@
+import unittest
+from app.scraping import changes
+
+PAGE = """
+<html><body>
+  <nav><a href="/">Home</a> <a href="/news">News</a></nav>
+  <main>
+    <h1>City council news</h1>
+    <p>The council met on 12 March 2026 to discuss the budget.</p>
+    <p>Road works on Main Street start next month.</p>
+    <ul><li>Agenda item one</li><li>Agenda item two</li></ul>
+  </main>
+  <footer>Contact us</footer>
+</body></html>
+"""
+
+
+class FingerprintTest(unittest.TestCase):
+    def test_main_content_blocks_without_chrome(self):
+        fingerprint = changes.fingerprint(PAGE)
+        self.assertEqual(
+            fingerprint.blocks,
+            [
+                "City council news",
+                "The council met on 12 March 2026 to discuss the budget.",
+                "Road works on Main Street start next month.",
+                "Agenda item one",
+                "Agenda item two",
+            ],
+        )
+        self.assertEqual(len(fingerprint.block_hashes), len(fingerprint.blocks))
+
+    def test_case_whitespace_and_numbers_dont_change_a_block_hash(self):
+        self.assertEqual(
+            changes.block_hash("Updated at 10:42 on 3 May"),
+            changes.block_hash("updated  at 11:05 on 17 MAY"),
+        )
+        self.assertNotEqual(changes.block_hash("Road works"), changes.block_hash("Road closed"))
+
+    def test_simhash_is_a_signed_64_bit_integer(self):
+        value = changes.simhash(["some words on a page " * 20])
+        self.assertGreaterEqual(value, -(1 << 63))
+        self.assertLess(value, 1 << 63)
+
+
+class DiffTest(unittest.TestCase):
+    def setUp(self):
+        self.previous = changes.fingerprint(PAGE)
+
+    def diff(self, html: str) -> changes.Delta:
+        return changes.diff(
+            self.previous.block_hashes, self.previous.simhash, changes.fingerprint(html)
+        )
+
+    def test_unchanged_page(self):
+        delta = self.diff(PAGE)
+        self.assertFalse(delta.changed)
+        self.assertEqual(delta.distance, 0)
+
+    def test_only_new_blocks_are_reported(self):
+        delta = self.diff(
+            PAGE.replace("</ul>", "</ul><p>A new park opens in the north district.</p>")
+        )
+        self.assertTrue(delta.changed)
+        self.assertEqual(delta.added, ["A new park opens in the north district."])
+        self.assertEqual(delta.removed_count, 0)
+
+    def test_changed_dates_and_chrome_are_not_changes(self):
+        delta = self.diff(
+            PAGE.replace("12 March 2026", "19 March 2026").replace("Contact us", "Write to us")
+        )
+        self.assertFalse(delta.changed)
+
+    def test_reordered_blocks_are_not_new(self):
+        delta = self.diff(
+            PAGE.replace(
+                "<li>Agenda item one</li><li>Agenda item two</li>",
+                "<li>Agenda item two</li><li>Agenda item one</li>",
+            )
+        )
+        self.assertFalse(delta.changed)
+
+    def test_removed_blocks_are_counted(self):
+        delta = self.diff(PAGE.replace("<li>Agenda item two</li>", ""))
+        self.assertEqual(delta.added, [])
+        self.assertEqual(delta.removed_count, 1)
+
+    def test_rewrite_is_further_than_a_small_edit(self):
+        small = self.diff(PAGE.replace("next month", "in two weeks"))
+        rewrite = self.diff(
+            "<main><p>Completely different article about the weather this weekend.</p>"
+            "<p>Expect rain on Saturday and sunshine on Sunday across the region.</p></main>"
+        )
+        self.assertLess(small.distance, rewrite.distance)
+
+    def test_distance_is_symmetric_and_bounded(self):
+        a, b = changes.simhash(["first text here"]), changes.simhash(["other words there"])
+        self.assertEqual(changes.distance(a, b), changes.distance(b, a))
+        self.assertLessEqual(changes.distance(a, b), changes.SIMHASH_BITS)
+        self.assertEqual(changes.distance(a, a), 0)
@@ -0,0 +1,129 @@
+import asyncio
+import unittest
+from unittest import mock
+from app.services import chat_persistence as persistence_module
+from app.services.chat_persistence import ChatPersistence, MemoryChatBackend
+
+
+def _message(content: str) -> dict:
+    return {"role": "user", "content": content, "image": None, "source": None, "prompt_id": None}
+
+
+class FlakyChatBackend(MemoryChatBackend):
+    """Memory backend whose first inserts fail like an unreachable database"""
+
+    def __init__(self, failures: int):
+        super().__init__()
+        self.failures = failures
+        self.insert_calls = 0
+
+    async def insert_messages(self, rows):
+        self.insert_calls += 1
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("database unreachable")
+        await super().insert_messages(rows)
+
+
+class ChatPersistenceTest(unittest.IsolatedAsyncioTestCase):
+    async def test_enqueue_only_buffers(self):
+        backend = MemoryChatBackend()
+        persistence = ChatPersistence(backend, batch_size=10, flush_interval=60)
+        persistence.enqueue("user-1", "DATA", _message("hello"))
+        persistence.enqueue("user-1", "DATA", _message("again"))
+
+        self.assertEqual(backend.messages, {})
+        await persistence.flush()
+
+        rows = sorted(backend.messages.values(), key=lambda row: row["created_at"])
+        self.assertEqual([row["content"] for row in rows], ["hello", "again"])
+        conversation_id = backend.conversations[("user-1", "DATA")]
+        self.assertTrue(all(row["conversation_id"] == conversation_id for row in rows))
+
+    async def test_flushes_every_interval(self):
+        backend = MemoryChatBackend()
+        persistence = ChatPersistence(backend, batch_size=10, flush_interval=0.05)
+        task = asyncio.create_task(persistence.run())
+        try:
+            persistence.enqueue("user-1", "DATA", _message("hello"))
+            self.assertEqual(backend.messages, {})
+            await asyncio.sleep(0.2)
+            self.assertEqual(len(backend.messages), 1)
+        finally:
+            task.cancel()
+
+    async def test_full_batch_flushes_before_interval(self):
+        backend = MemoryChatBackend()
+        persistence = ChatPersistence(backend, batch_size=3, flush_interval=60)
+        task = asyncio.create_task(persistence.run())
+        try:
+            for i in range(3):
+                persistence.enqueue("user-1", "DATA", _message(str(i)))
+            await asyncio.sleep(0.05)
+            self.assertEqual(len(backend.messages), 3)
+        finally:
+            task.cancel()
+
+    async def test_lifespan_flushes_at_shutdown(self):
+        backend = MemoryChatBackend()
+        persistence = ChatPersistence(backend, batch_size=10, flush_interval=60)
+        with mock.patch.object(persistence_module, "chat_persistence", persistence):
+            async with persistence_module.lifespan():
+                persistence.enqueue("user-1", "DATA", _message("last words"))
+                self.assertEqual(backend.messages, {})
+        self.assertEqual([row["content"] for row in backend.messages.values()], ["last words"])
+
+    async def test_failed_flush_is_retried_without_duplicates(self):
+        backend = FlakyChatBackend(failures=1)
+        persistence = ChatPersistence(backend, batch_size=10, flush_interval=60)
+        persistence.enqueue("user-1", "DATA", _message("hello"))
+        persistence.enqueue("user-1", "DATA", _message("again"))
+
+        await persistence.flush()
+        self.assertEqual(backend.messages, {})
+
+        persistence.enqueue("user-1", "DATA", _message("third"))
+        await persistence.flush()
+        self.assertEqual(backend.insert_calls, 2)
+        rows = sorted(backend.messages.values(), key=lambda row: row["created_at"])
+        self.assertEqual([row["content"] for row in rows], ["hello", "again", "third"])
+
+    async def test_clear_drops_buffered_and_stored_messages(self):
+        backend = MemoryChatBackend()
+        persistence = ChatPersistence(backend, batch_size=10, flush_interval=60)
+        persistence.enqueue("user-1", "DATA", _message("stored"))
+        await persistence.flush()
+        persistence.enqueue("user-1", "DATA", _message("buffered"))
+        persistence.enqueue("user-1", "INVESTIGATE", _message("other mode"))
+
+        persistence.clear("user-1", "DATA")
+        await persistence.flush()
+
+        self.assertEqual(
+            [row["content"] for row in backend.messages.values()], ["other mode"]
+        )
+
+    async def test_clear_drops_messages_started_before_it(self):
+        backend = MemoryChatBackend()
+        persistence = ChatPersistence(backend, batch_size=10, flush_interval=60)
+        started_at = persistence_module._now()
+        persistence.clear("user-1", "DATA")
+        # An answer that was streaming while the conversation was cleared
+        persistence.enqueue("user-1", "DATA", _message("stale answer"), started_at)
+        persistence.enqueue("user-1", "DATA", _message("new question"))
+        await persistence.flush()
+
+        self.assertEqual(
+            [row["content"] for row in backend.messages.values()], ["new question"]
+        )
+
+    async def test_buffer_is_bounded(self):
+        backend = FlakyChatBackend(failures=1)
+        persistence = ChatPersistence(backend, batch_size=10, flush_interval=60, max_buffered=2)
+        for i in range(4):
+            persistence.enqueue("user-1", "DATA", _message(str(i)))
+        await persistence.flush()
+        await persistence.flush()
+        self.assertEqual(
+            sorted(row["content"] for row in backend.messages.values()), ["2", "3"]
+        )
@@ -0,0 +1,76 @@
+import os
+import tempfile
+import unittest
+from app.services.chat_store import MemoryChatStore, SQLiteChatStore
+
+
+def _message(content: str) -> dict:
+    return {"role": "user", "content": content, "image": None, "source": None, "prompt_id": None}
+
+
+class ChatStoreTests:
+    """Behaviour every chat store shares; mixed into a TestCase per backend"""
+
+    def make_store(self):
+        raise NotImplementedError
+
+    def test_seq_counts_per_conversation_and_mode(self):
+        store = self.make_store()
+        self.assertEqual(
+            [store.append("conv-1", "DATA", _message(str(i))) for i in range(3)], [0, 1, 2]
+        )
+        self.assertEqual(store.append("conv-1", "INVESTIGATE", _message("other mode")), 0)
+        self.assertEqual(store.append("conv-2", "DATA", _message("other conversation")), 0)
+
+    def test_before_pages_older_messages(self):
+        store = self.make_store()
+        for i in range(5):
+            store.append("conv-1", "DATA", _message(str(i)))
+
+        page = store.before("conv-1", "DATA", 4, 2)
+        self.assertEqual([(m["seq"], m["content"]) for m in page], [(2, "2"), (3, "3")])
+        self.assertEqual([m["seq"] for m in store.before("conv-1", "DATA", 1, 10)], [0])
+        self.assertEqual(store.before("conv-1", "DATA", 0, 10), [])
+
+    def test_update_changes_one_message(self):
+        store = self.make_store()
+        store.append("conv-1", "DATA", _message("question"))
+        seq = store.append("conv-1", "DATA", {**_message(""), "role": "assistant"})
+        store.update("conv-1", "DATA", seq, {"content": "answer"})
+
+        page = store.before("conv-1", "DATA", seq + 1, 10)
+        self.assertEqual([m["content"] for m in page], ["question", "answer"])
+
+    def test_clear_restarts_numbering(self):
+        store = self.make_store()
+        store.append("conv-1", "DATA", _message("old"))
+        store.clear("conv-1", "DATA")
+        self.assertEqual(store.append("conv-1", "DATA", _message("new")), 0)
+
+
+class MemoryChatStoreTest(ChatStoreTests, unittest.TestCase):
+    def make_store(self):
+        return MemoryChatStore()
+
+    def test_eviction_keeps_seq_monotonic(self):
+        store = MemoryChatStore(max_conversations=1)
+        store.append("conv-1", "DATA", _message("0"))
+        store.append("conv-1", "DATA", _message("1"))
+        # Evicts conv-1
+        store.append("conv-2", "DATA", _message("other"))
+
+        seq = store.append("conv-1", "DATA", _message("2"))
+        self.assertEqual(seq, 2)
+        store.update("conv-1", "DATA", seq, {"content": "two"})
+        page = store.before("conv-1", "DATA", seq + 1, 10)
+        # The evicted messages are gone, but numbering carried on
+        self.assertEqual([(m["seq"], m["content"]) for m in page], [(2, "two")])
+
+
+class SQLiteChatStoreTest(ChatStoreTests, unittest.TestCase):
+    def make_store(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        store = SQLiteChatStore(os.path.join(directory.name, "chat.sqlite3"))
+        self.addCleanup(store._conn.close)
+        return store
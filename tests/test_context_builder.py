@@ -0,0 +1,67 @@
+import asyncio
+import unittest
+from unittest import mock
+from app.services import chat_store, context_builder
+from app.services.chat_store import MemoryChatStore
+from app.services.tokens import estimate_tokens
+
+MODEL = "test/model"
+
+
+class ContextBuilderTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.store = MemoryChatStore()
+        for patcher in (
+            mock.patch.object(chat_store, "get_store", lambda: self.store),
+            mock.patch.dict(context_builder.TOKEN_BUDGETS, {MODEL: 40}),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(context_builder.forget, "conv-1", "DATA")
+
+    def add(self, role: str, content: str, source: str | None = None) -> dict:
+        message = {"role": role, "content": content, "source": source}
+        return {**message, "seq": self.store.append("conv-1", "DATA", message)}
+
+    async def settle(self) -> None:
+        if context_builder._tasks:
+            await asyncio.gather(*context_builder._tasks)
+
+    async def test_new_conversation_has_no_context(self):
+        self.assertEqual(context_builder.build_context("conv-1", "DATA", [], MODEL), "")
+
+    async def test_status_messages_are_not_turns(self):
+        history = [
+            self.add("assistant", "Welcome to DATA mode.", source="System"),
+            self.add("user", "How big is France?"),
+            self.add("assistant", "About 550,000 km².", source=None),
+        ]
+        context = context_builder.build_context("conv-1", "DATA", history, MODEL)
+        self.assertNotIn("Welcome", context)
+        self.assertIn("User: How big is France?", context)
+        self.assertIn("Assistant: About 550,000 km².", context)
+
+    async def test_oldest_turns_beyond_the_budget_move_to_the_summary(self):
+        history = [self.add("user", f"Question number {i} about something.") for i in range(10)]
+
+        context = context_builder.build_context("conv-1", "DATA", history, MODEL)
+        self.assertIn("Question number 9", context)
+        self.assertNotIn("Question number 0", context)
+        self.assertLessEqual(estimate_tokens(context), 40 + 5)
+
+        # The turns that didn't fit are summarized in the background
+        await self.settle()
+        context = context_builder.build_context("conv-1", "DATA", history, MODEL)
+        self.assertIn("Summary of the earlier conversation:", context)
+        self.assertIn("Question number 9", context)
+
+    def test_extend_summary_stays_within_its_budget(self):
+        messages = [
+            {"role": "user", "content": f"Point {i}. And some detail that is dropped."}
+            for i in range(200)
+        ]
+        summary = context_builder.extend_summary("", messages)
+        self.assertLessEqual(estimate_tokens(summary), context_builder.SUMMARY_TOKEN_BUDGET)
+        # Oldest lines go first, and only each turn's first sentence is kept
+        self.assertTrue(summary.endswith("- User: Point 199."))
+        self.assertNotIn("Point 0.", summary)
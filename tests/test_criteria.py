@@ -0,0 +1,122 @@
+import asyncio
+import unittest
+from unittest import mock
+from app.scraping import criteria
+from app.scraping.criteria import CriteriaEvaluationError, CriteriaEvaluator, parse_verdicts
+
+
+class FakeLLM:
+    """Answers each prompt with the next scripted answer"""
+
+    def __init__(self, *answers):
+        self.answers = list(answers)
+        self.prompts = []
+
+    async def ainvoke(self, prompt):
+        self.prompts.append(prompt)
+        answer = self.answers.pop(0)
+        if isinstance(answer, Exception):
+            raise answer
+        return answer
+
+
+class ParseVerdictsTest(unittest.TestCase):
+    def test_well_formed_answer(self):
+        verdicts = parse_verdicts("1: YES 3 - three new tenders\n2: NO 0 -", 2)
+        self.assertTrue(verdicts[1].matched)
+        self.assertEqual(verdicts[1].items_found, 3)
+        self.assertEqual(verdicts[1].summary, "three new tenders")
+        self.assertFalse(verdicts[2].matched)
+        self.assertEqual(verdicts[2].items_found, 0)
+        self.assertEqual(verdicts[2].summary, "")
+
+    def test_tolerates_decoration_and_case(self):
+        answer = (
+            "Here are the verdicts:\n"
+            "**Item 1.** yes - a new council vote\n"
+            "- 2) No\n"
+            "3] YES 0: something matched\n"
+        )
+        verdicts = parse_verdicts(answer, 3)
+        self.assertEqual(sorted(verdicts), [1, 2, 3])
+        self.assertTrue(verdicts[1].matched)
+        # A match without a count, or with 0, still found something
+        self.assertEqual(verdicts[1].items_found, 1)
+        self.assertEqual(verdicts[3].items_found, 1)
+        self.assertEqual(verdicts[1].summary, "a new council vote")
+        self.assertFalse(verdicts[2].matched)
+
+    def test_skips_garbage_out_of_range_and_repeated_items(self):
+        answer = (
+            "I cannot answer that.\n"
+            "0: YES 1 - no item zero\n"
+            "4: YES 1 - only three items were asked\n"
+            "2: NO 0 -\n"
+            "2: YES 5 - a second answer for item 2\n"
+            "3: MAYBE\n"
+        )
+        verdicts = parse_verdicts(answer, 3)
+        self.assertEqual(list(verdicts), [2])
+        self.assertFalse(verdicts[2].matched)
+
+    def test_empty_answer(self):
+        self.assertEqual(parse_verdicts("", 2), {})
+
+
+class CriteriaEvaluatorTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        criteria.verdict_cache.clear()
+        self.addCleanup(criteria.verdict_cache.clear)
+
+    def _patch_llm(self, llm: FakeLLM):
+        patcher = mock.patch.object(criteria.llm_chains, "get_llm", return_value=llm)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_batches_and_caches_verdicts(self):
+        llm = FakeLLM("1: YES 2 - two tenders\n2: NO 0 -")
+        self._patch_llm(llm)
+        evaluator = CriteriaEvaluator(window=0.01)
+
+        first, second = await asyncio.gather(
+            evaluator.evaluate("public tenders", ["Tender for road works", "Tender for a school"]),
+            evaluator.evaluate("court rulings", ["Opening hours changed"]),
+        )
+        self.assertTrue(first.matched and first.evaluated)
+        self.assertEqual(first.items_found, 2)
+        self.assertFalse(second.matched)
+        self.assertEqual(len(llm.prompts), 1)
+
+        again = await evaluator.evaluate("Public  Tenders", ["Tender for road works", "Tender for a school"])
+        self.assertTrue(again.matched)
+        self.assertFalse(again.evaluated)
+        self.assertEqual(evaluator.metrics["cache_hits"], 1)
+
+    async def test_missing_verdict_is_retried_then_no_match(self):
+        llm = FakeLLM("Sorry, I am not sure.", "still nothing useful")
+        self._patch_llm(llm)
+        evaluator = CriteriaEvaluator(window=0.01)
+
+        verdict = await asyncio.wait_for(
+            evaluator.evaluate("court rulings", ["A ruling was published"]), timeout=1
+        )
+        self.assertFalse(verdict.matched)
+        self.assertEqual(len(llm.prompts), criteria.MAX_ATTEMPTS)
+        self.assertEqual(evaluator.metrics["unparsed"], 1)
+        # An unparsed answer is not cached
+        self.assertEqual(len(criteria.verdict_cache), 0)
+
+    async def test_failed_call_raises(self):
+        self._patch_llm(FakeLLM(TimeoutError("space is sleeping")))
+        evaluator = CriteriaEvaluator(window=0.01)
+        with self.assertRaises(CriteriaEvaluationError):
+            await evaluator.evaluate("court rulings", ["A ruling was published"])
+        self.assertEqual(evaluator.metrics["failed"], 1)
+
+    async def test_change_only_criteria_skip_the_model(self):
+        llm = FakeLLM()
+        self._patch_llm(llm)
+        verdict = await CriteriaEvaluator(window=0.01).evaluate(" Monitor for changes ", ["New block"])
+        self.assertTrue(verdict.matched)
+        self.assertEqual(verdict.items_found, 1)
+        self.assertEqual(llm.prompts, [])
@@ -0,0 +1,93 @@
+import asyncio
+import unittest
+from app.services.dispatcher import ModeDispatcher, QueueFullError
+
+
+class DispatcherTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.started: list[str] = []
+        self.releases: dict[str, asyncio.Event] = {}
+        self.positions: dict[str, list[int]] = {}
+
+    async def upstream(self, name: str):
+        self.started.append(name)
+        release = self.releases.setdefault(name, asyncio.Event())
+        await release.wait()
+        yield {"content": name}
+
+    def submit(self, dispatcher: ModeDispatcher, user_key: str, name: str) -> asyncio.Task:
+        async def consume():
+            async for update in dispatcher.run(user_key, self.upstream(name)):
+                if "queue_position" in update:
+                    self.positions.setdefault(name, []).append(update["queue_position"])
+
+        return asyncio.create_task(consume())
+
+    async def finish(self, name: str, task: asyncio.Task) -> None:
+        self.releases.setdefault(name, asyncio.Event()).set()
+        await asyncio.wait_for(task, timeout=1)
+        await asyncio.sleep(0)
+
+    async def test_queue_is_served_round_robin_across_users(self):
+        dispatcher = ModeDispatcher("DATA", max_concurrency=1, max_queue=10)
+        running = self.submit(dispatcher, "user-a", "a1")
+        await asyncio.sleep(0)
+        tasks = {
+            name: self.submit(dispatcher, user_key, name)
+            for user_key, name in (("user-a", "a2"), ("user-a", "a3"), ("user-b", "b1"))
+        }
+        await asyncio.sleep(0)
+        self.assertEqual(self.started, ["a1"])
+        self.assertEqual(dispatcher.queue_depth(), 3)
+
+        await self.finish("a1", running)
+        await self.finish("a2", tasks["a2"])
+        await self.finish("b1", tasks["b1"])
+        await self.finish("a3", tasks["a3"])
+        # user-a queued first, but doesn't get to go twice before user-b
+        self.assertEqual(self.started, ["a1", "a2", "b1", "a3"])
+        self.assertEqual(dispatcher.active, 0)
+
+    async def test_waiting_requests_are_told_their_position(self):
+        dispatcher = ModeDispatcher("DATA", max_concurrency=1, max_queue=10)
+        running = self.submit(dispatcher, "user-a", "a1")
+        await asyncio.sleep(0)
+        first = self.submit(dispatcher, "user-b", "b1")
+        second = self.submit(dispatcher, "user-c", "c1")
+        await asyncio.sleep(0)
+        self.assertEqual(self.positions, {"b1": [1], "c1": [2]})
+
+        await self.finish("a1", running)
+        # c1 moved up once b1 was admitted
+        self.assertEqual(self.positions["c1"], [2, 1])
+        await self.finish("b1", first)
+        await self.finish("c1", second)
+
+    async def test_full_queue_sheds_new_requests(self):
+        dispatcher = ModeDispatcher("DATA", max_concurrency=1, max_queue=1)
+        running = self.submit(dispatcher, "user-a", "a1")
+        await asyncio.sleep(0)
+        queued = self.submit(dispatcher, "user-b", "b1")
+        await asyncio.sleep(0)
+
+        with self.assertRaises(QueueFullError):
+            await self.submit(dispatcher, "user-c", "c1")
+        self.assertEqual(dispatcher.metrics["shed"], 1)
+        self.assertNotIn("c1", self.started)
+        await self.finish("a1", running)
+        await self.finish("b1", queued)
+
+    async def test_cancelled_waiter_leaves_the_queue(self):
+        dispatcher = ModeDispatcher("DATA", max_concurrency=1, max_queue=10)
+        running = self.submit(dispatcher, "user-a", "a1")
+        await asyncio.sleep(0)
+        queued = self.submit(dispatcher, "user-b", "b1")
+        await asyncio.sleep(0)
+
+        queued.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await queued
+        self.assertEqual(dispatcher.queue_depth(), 0)
+        await self.finish("a1", running)
+        self.assertEqual(self.started, ["a1"])
+        self.assertEqual(dispatcher.active, 0)
@@ -0,0 +1,106 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from app.services import execution_recorder as recorder_module
+from app.services.execution_recorder import ExecutionRecorder, SpillFile
+
+
+class FakeExecutionTable:
+    """record_executions against an in-memory table, optionally unreachable"""
+
+    def __init__(self):
+        self.rows: dict[str, dict] = {}
+        self.down = False
+        self.calls = 0
+
+    async def record_executions(self, rows):
+        self.calls += 1
+        if self.down:
+            raise ConnectionError("database unreachable")
+        new = [row for row in rows if row["id"] not in self.rows]
+        self.rows.update((row["id"], row) for row in new)
+        return len(new)
+
+
+class ExecutionRecorderTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.spill_path = os.path.join(directory.name, "spill.sqlite3")
+        self.table = FakeExecutionTable()
+        patcher = mock.patch.object(
+            recorder_module.repository, "record_executions", self.table.record_executions
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _recorder(self, **kwargs) -> ExecutionRecorder:
+        return ExecutionRecorder(spill_path=self.spill_path, flush_interval=60, **kwargs)
+
+    async def test_flush_writes_in_batches(self):
+        recorder = self._recorder(batch_size=2)
+        for i in range(5):
+            recorder.record(f"scraper-{i}", success=True, items_found=i)
+
+        self.assertEqual(self.table.rows, {})
+        self.assertTrue(await recorder.flush())
+        self.assertEqual(len(self.table.rows), 5)
+        self.assertEqual(self.table.calls, 3)
+        self.assertEqual(recorder.metrics["written"], 5)
+
+    async def test_unreachable_database_spills_then_replays(self):
+        recorder = self._recorder()
+        recorder.record("scraper-1", success=True)
+        recorder.record("scraper-2", success=False, error_message="HTTP 500")
+        self.table.down = True
+
+        self.assertTrue(await recorder.flush())
+        self.assertEqual(self.table.rows, {})
+        self.assertEqual(recorder.metrics["spilled"], 2)
+        self.assertEqual(len(SpillFile(self.spill_path)), 2)
+
+        self.table.down = False
+        recorder.record("scraper-3", success=True)
+        self.assertTrue(await recorder.flush())
+        self.assertEqual(
+            sorted(row["scraper_id"] for row in self.table.rows.values()),
+            ["scraper-1", "scraper-2", "scraper-3"],
+        )
+        self.assertEqual(len(SpillFile(self.spill_path)), 0)
+
+    async def test_another_recorder_replays_the_spill_file(self):
+        # As after a restart: the new process finds the rows on disk
+        self.table.down = True
+        first = self._recorder()
+        first.record("scraper-1", success=True)
+        await first.flush()
+
+        self.table.down = False
+        self.assertTrue(await self._recorder().flush())
+        self.assertEqual([row["scraper_id"] for row in self.table.rows.values()], ["scraper-1"])
+
+    async def test_replayed_duplicates_are_counted_once(self):
+        recorder = self._recorder()
+        recorder.record("scraper-1", success=True)
+        row = dict(recorder._pending[0])
+        await recorder.flush()
+        # A batch whose outcome was unknown, sent again from the spill file
+        SpillFile(self.spill_path).add([row])
+
+        self.assertTrue(await recorder.flush())
+        self.assertEqual(len(self.table.rows), 1)
+        self.assertEqual(recorder.metrics["duplicates"], 1)
+
+    async def test_rows_stay_buffered_without_a_spill_file(self):
+        recorder = ExecutionRecorder(spill_path=None, flush_interval=60)
+        recorder.record("scraper-1", success=True)
+        self.table.down = True
+
+        self.assertFalse(await recorder.flush())
+        self.assertEqual(len(recorder._pending), 1)
+
+        self.table.down = False
+        self.assertTrue(await recorder.flush())
+        self.assertEqual(len(self.table.rows), 1)
+        self.assertEqual(recorder._pending, [])
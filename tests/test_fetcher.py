@@ -0,0 +1,141 @@
+import socket
+import unittest
+from unittest import mock
+import httpx
+from app.scraping.fetcher import Fetcher
+
+PUBLIC = "93.184.216.34"
+
+
+class StandIn:
+    """Local HTTP stand-in: answers from a dict of routes and logs requests"""
+
+    def __init__(self, routes: dict[str, httpx.Response]):
+        self.routes = routes
+        self.requests: list[httpx.Request] = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        return self.routes.get(str(request.url), httpx.Response(404))
+
+
+def _fetcher(server: StandIn, **kwargs) -> Fetcher:
+    return Fetcher(per_host_delay=0, transport=httpx.MockTransport(server), **kwargs)
+
+
+def _resolving_to(*addresses: str):
+    def getaddrinfo(host, port, *args, **kwargs):
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", (a, port)) for a in addresses]
+
+    return mock.patch("socket.getaddrinfo", getaddrinfo)
+
+
+class FetcherTest(unittest.IsolatedAsyncioTestCase):
+    async def test_fetches_page_with_validators(self):
+        server = StandIn({
+            f"http://{PUBLIC}/page": httpx.Response(
+                200,
+                html="<p>hello</p>",
+                headers={"ETag": '"v1"', "Last-Modified": "Fri, 16 Oct 2026 10:00:00 GMT"},
+            )
+        })
+        result = await _fetcher(server).fetch(f"http://{PUBLIC}/page")
+        self.assertTrue(result.ok)
+        self.assertEqual(result.text, "<p>hello</p>")
+        self.assertEqual(result.etag, '"v1"')
+        self.assertEqual(result.last_modified, "Fri, 16 Oct 2026 10:00:00 GMT")
+        self.assertEqual(result.url, f"http://{PUBLIC}/page")
+
+    async def test_conditional_get_not_modified(self):
+        server = StandIn({f"http://{PUBLIC}/page": httpx.Response(304)})
+        result = await _fetcher(server).fetch(f"http://{PUBLIC}/page", etag='"v1"')
+        self.assertTrue(result.ok)
+        self.assertTrue(result.not_modified)
+        self.assertEqual(result.etag, '"v1"')
+        self.assertEqual(server.requests[0].headers["If-None-Match"], '"v1"')
+
+    async def test_adds_https_when_scheme_missing(self):
+        server = StandIn({f"https://{PUBLIC}/page": httpx.Response(200, text="ok")})
+        result = await _fetcher(server).fetch(f"{PUBLIC}/page")
+        self.assertTrue(result.ok)
+        self.assertEqual(str(server.requests[0].url), f"https://{PUBLIC}/page")
+
+    async def test_reports_http_errors_and_oversized_pages(self):
+        server = StandIn({f"http://{PUBLIC}/big": httpx.Response(200, content=b"x" * 100)})
+        fetcher = _fetcher(server, max_body_bytes=10)
+        missing = await fetcher.fetch(f"http://{PUBLIC}/missing")
+        self.assertFalse(missing.ok)
+        self.assertEqual(missing.error, "HTTP 404")
+        big = await fetcher.fetch(f"http://{PUBLIC}/big")
+        self.assertFalse(big.ok)
+        self.assertIn("larger than 10 bytes", big.error)
+
+    async def test_refuses_non_public_addresses(self):
+        server = StandIn({})
+        fetcher = _fetcher(server)
+        for url in (
+            "http://127.0.0.1/",
+            "http://localhost:8000/",
+            "http://169.254.169.254/latest/meta-data/",
+            "http://10.0.0.5/",
+            "http://192.168.1.1/",
+            "http://[::1]/",
+            "http://[::ffff:127.0.0.1]/",
+            "http://0.0.0.0/",
+            "ftp://example.com/file",
+        ):
+            with self.subTest(url=url):
+                result = await fetcher.fetch(url)
+                self.assertFalse(result.ok)
+                self.assertIsNotNone(result.error)
+        self.assertEqual(server.requests, [])
+
+    async def test_refuses_hostname_with_any_private_address(self):
+        server = StandIn({})
+        with _resolving_to(PUBLIC, "10.0.0.5"):
+            result = await _fetcher(server).fetch("http://mixed.test/")
+        self.assertFalse(result.ok)
+        self.assertIn("not a public address", result.error)
+        self.assertEqual(server.requests, [])
+
+    async def test_plain_http_is_sent_to_the_checked_address(self):
+        server = StandIn({f"http://{PUBLIC}/page": httpx.Response(200, text="ok")})
+        with _resolving_to(PUBLIC):
+            result = await _fetcher(server).fetch("http://pages.test/page")
+        self.assertTrue(result.ok)
+        self.assertEqual(result.url, "http://pages.test/page")
+        self.assertEqual(server.requests[0].headers["Host"], "pages.test")
+
+    async def test_checks_every_redirect_target(self):
+        server = StandIn({
+            f"http://{PUBLIC}/moved": httpx.Response(302, headers={"Location": "/new"}),
+            f"http://{PUBLIC}/new": httpx.Response(200, text="new home"),
+            f"http://{PUBLIC}/sneaky": httpx.Response(
+                302, headers={"Location": "http://169.254.169.254/latest/meta-data/"}
+            ),
+        })
+        fetcher = _fetcher(server)
+
+        followed = await fetcher.fetch(f"http://{PUBLIC}/moved")
+        self.assertTrue(followed.ok)
+        self.assertEqual(followed.text, "new home")
+        self.assertEqual(followed.url, f"http://{PUBLIC}/new")
+
+        refused = await fetcher.fetch(f"http://{PUBLIC}/sneaky")
+        self.assertFalse(refused.ok)
+        self.assertIn("not a public address", refused.error)
+        self.assertNotIn("169.254.169.254", {r.url.host for r in server.requests})
+
+    async def test_stops_redirect_loops(self):
+        server = StandIn({
+            f"http://{PUBLIC}/loop": httpx.Response(302, headers={"Location": "/loop"}),
+        })
+        result = await _fetcher(server).fetch(f"http://{PUBLIC}/loop")
+        self.assertFalse(result.ok)
+        self.assertIn("redirects", result.error)
+
+    async def test_private_networks_can_be_allowed(self):
+        server = StandIn({"http://127.0.0.1:8000/": httpx.Response(200, text="local")})
+        result = await _fetcher(server, allow_private_networks=True).fetch("http://127.0.0.1:8000/")
+        self.assertTrue(result.ok)
+        self.assertEqual(result.text, "local")
@@ -0,0 +1,116 @@
+import asyncio
+import concurrent.futures
+import threading
+import unittest
+from unittest import mock
+from app.services import hf_spaces
+from app.services.hf_spaces import CircuitBreaker, CircuitOpenError
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch.object(hf_spaces.time, "monotonic", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_opens_after_threshold_failures(self):
+        breaker = CircuitBreaker(failure_threshold=3, recovery_seconds=30)
+        for _ in range(2):
+            breaker.record_failure()
+            self.assertEqual(breaker.state, "closed")
+            self.assertTrue(breaker.allow())
+        breaker.record_failure()
+        self.assertEqual(breaker.state, "open")
+        self.assertFalse(breaker.allow())
+        self.assertEqual(breaker.retry_in(), 30)
+
+    def test_success_resets_the_failure_count(self):
+        breaker = CircuitBreaker(failure_threshold=2, recovery_seconds=30)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, "closed")
+
+    def test_half_open_lets_a_single_probe_through(self):
+        breaker = CircuitBreaker(failure_threshold=1, recovery_seconds=30)
+        breaker.record_failure()
+        self.now += 30
+        self.assertEqual(breaker.state, "half_open")
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+
+    def test_successful_probe_closes(self):
+        breaker = CircuitBreaker(failure_threshold=1, recovery_seconds=30)
+        breaker.record_failure()
+        self.now += 30
+        breaker.allow()
+        breaker.record_success()
+        self.assertEqual(breaker.state, "closed")
+        self.assertTrue(breaker.allow())
+
+    def test_failed_probe_reopens(self):
+        breaker = CircuitBreaker(failure_threshold=5, recovery_seconds=30)
+        for _ in range(5):
+            breaker.record_failure()
+        self.now += 30
+        breaker.allow()
+        breaker.record_failure()
+        self.assertEqual(breaker.state, "open")
+        self.assertEqual(breaker.retry_in(), 30)
+
+
+class FakeJob(concurrent.futures.Future):
+    """gradio_client Job stand-in finishing after a delay"""
+
+    def __init__(self, outputs: list, result, delay: float):
+        super().__init__()
+        self._outputs = outputs
+        threading.Timer(delay, self._finish, (result,)).start()
+
+    def _finish(self, result) -> None:
+        if not self.done():
+            self.set_result(result)
+
+    def outputs(self) -> list:
+        return self._outputs
+
+
+class StreamTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        hf_spaces._breakers.clear()
+        self.addCleanup(hf_spaces._breakers.clear)
+
+    def patch_job(self, job_factory):
+        client = mock.Mock()
+        client.submit.side_effect = lambda **kwargs: job_factory()
+        patcher = mock.patch.object(hf_spaces, "_connect", mock.AsyncMock(return_value=client))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return client
+
+    async def test_slow_non_streaming_space_is_bounded_by_total_timeout_only(self):
+        self.patch_job(lambda: FakeJob([], "final answer", delay=0.2))
+        with (
+            mock.patch.object(hf_spaces, "STREAM_POLL_INTERVAL", 0.01),
+            mock.patch.object(hf_spaces, "READ_TIMEOUT", 0.05),
+            mock.patch.object(hf_spaces, "TOTAL_TIMEOUT", 5),
+        ):
+            outputs = [output async for output in hf_spaces.stream("owner/space", question="q")]
+        self.assertEqual(outputs, ["final answer"])
+        self.assertEqual(hf_spaces.breaker_state("owner/space"), "closed")
+
+    async def test_outages_open_the_breaker(self):
+        def unreachable():
+            raise ConnectionError("unreachable")
+
+        self.patch_job(unreachable)
+        with (
+            mock.patch.object(hf_spaces, "MAX_RETRIES", 0),
+            mock.patch.object(hf_spaces, "reset_space_client"),
+        ):
+            for _ in range(hf_spaces.BREAKER_FAILURE_THRESHOLD):
+                with self.assertRaises(ConnectionError):
+                    await anext(hf_spaces.stream("owner/space", question="q"))
+            with self.assertRaises(CircuitOpenError):
+                await anext(hf_spaces.stream("owner/space", question="q"))
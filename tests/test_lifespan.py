@@ -0,0 +1,42 @@
+import unittest
+from unittest import mock
+from app import lifespan as lifespan_module
+from app.services import chat_persistence as persistence_module
+from app.services import realtime_hub as realtime_hub_module
+from app.services import supabase_clients
+from app.services.chat_persistence import ChatPersistence, MemoryChatBackend
+
+
+class RecordingChatBackend(MemoryChatBackend):
+    def __init__(self, events: list[str]):
+        super().__init__()
+        self.events = events
+
+    async def insert_messages(self, rows):
+        self.events.append("chat flushed")
+        await super().insert_messages(rows)
+
+
+class LifespanTest(unittest.IsolatedAsyncioTestCase):
+    async def test_chat_flush_runs_before_clients_close(self):
+        events: list[str] = []
+        persistence = ChatPersistence(RecordingChatBackend(events), batch_size=10, flush_interval=60)
+
+        async def reset_async_clients(key_env=None):
+            events.append("clients closed")
+
+        with (
+            mock.patch.object(supabase_clients, "acheck_health", mock.AsyncMock(return_value=True)),
+            mock.patch.object(supabase_clients, "reset_async_clients", reset_async_clients),
+            mock.patch.object(persistence_module, "chat_persistence", persistence),
+            mock.patch.object(realtime_hub_module, "realtime_hub", None),
+        ):
+            async with lifespan_module.lifespan():
+                persistence.enqueue(
+                    "user-1",
+                    "DATA",
+                    {"role": "user", "content": "last words", "image": None, "source": None, "prompt_id": None},
+                )
+                self.assertEqual(events, [])
+
+        self.assertEqual(events, ["chat flushed", "clients closed"])
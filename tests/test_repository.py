@@ -0,0 +1,122 @@
+import re
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+from app.services import repository
+
+_keyset_filter = re.compile(r'^(\w+)\.lt\."([^"]+)",and\(\1\.eq\."\2",id\.lt\.([^)]+)\)$')
+
+
+class FakeQuery:
+    """The slice of the PostgREST query builder the keyset pages use,
+    applied to in-memory rows"""
+
+    def __init__(self, rows: list[dict], client: "FakeClient"):
+        self.rows = rows
+        self.client = client
+        self.orders: list[tuple[str, bool]] = []
+        self.limit_value = None
+
+    def select(self, columns):
+        return self
+
+    def eq(self, column, value):
+        self.rows = [row for row in self.rows if row[column] == value]
+        return self
+
+    def or_(self, filters):
+        column, value, last_id = _keyset_filter.match(filters).groups()
+        self.rows = [
+            row for row in self.rows
+            if row[column] < value or (row[column] == value and row["id"] < last_id)
+        ]
+        return self
+
+    def order(self, column, desc=False):
+        self.orders.append((column, desc))
+        return self
+
+    def limit(self, count):
+        self.limit_value = count
+        self.client.limits.append(count)
+        return self
+
+    async def execute(self):
+        rows = self.rows
+        # Stable sorts, last key first, give the full ordering
+        for column, desc in reversed(self.orders):
+            rows = sorted(rows, key=lambda row: row[column], reverse=desc)
+        return SimpleNamespace(data=rows[: self.limit_value])
+
+
+class FakeClient:
+    def __init__(self, tables: dict[str, list[dict]]):
+        self.tables = tables
+        self.limits: list[int] = []
+
+    def table(self, name):
+        return FakeQuery(self.tables[name], self)
+
+
+class KeysetPaginationTest(unittest.IsolatedAsyncioTestCase):
+    def _patch_client(self, tables) -> FakeClient:
+        client = FakeClient(tables)
+
+        async def get_client():
+            return client
+
+        patcher = mock.patch.object(repository.supabase_clients, "get_async_admin_client", get_client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return client
+
+    async def test_scraper_pages_cover_every_row_once(self):
+        # Pairs of rows share created_at, so the id tiebreak matters
+        rows = [
+            {"id": f"s{i:02d}", "user_id": "user-1", "created_at": f"2026-10-{10 + i // 2:02d}T00:00:00+00:00"}
+            for i in range(7)
+        ] + [{"id": "other", "user_id": "user-2", "created_at": "2026-10-12T00:00:00+00:00"}]
+        client = self._patch_client({"scheduled_scrapers": rows})
+
+        seen, cursor = [], None
+        while True:
+            page, cursor = await repository.list_scrapers("user-1", limit=3, after=cursor)
+            seen += [scraper["id"] for scraper in page]
+            if cursor is None:
+                break
+            self.assertEqual(cursor, {"created_at": page[-1]["created_at"], "id": page[-1]["id"]})
+
+        self.assertEqual(seen, [f"s{i:02d}" for i in reversed(range(7))])
+        # One row past the page tells whether another follows
+        self.assertEqual(client.limits, [4, 4, 4])
+
+    async def test_full_last_page_has_no_cursor(self):
+        rows = [
+            {"id": f"s{i}", "user_id": "user-1", "created_at": f"2026-10-0{i + 1}T00:00:00+00:00"}
+            for i in range(3)
+        ]
+        self._patch_client({"scheduled_scrapers": rows})
+
+        page, cursor = await repository.list_scrapers("user-1", limit=3)
+        self.assertEqual([scraper["id"] for scraper in page], ["s2", "s1", "s0"])
+        self.assertIsNone(cursor)
+
+    async def test_execution_pages(self):
+        rows = [
+            {"id": f"e{i}", "scraper_id": "scraper-1", "executed_at": f"2026-10-0{i + 1}T00:00:00+00:00"}
+            for i in range(5)
+        ]
+        self._patch_client({"scraper_executions": rows})
+
+        first, cursor = await repository.list_executions("scraper-1", limit=2)
+        self.assertEqual([row["id"] for row in first], ["e4", "e3"])
+        self.assertEqual(cursor, {"executed_at": rows[3]["executed_at"], "id": "e3"})
+
+        second, cursor = await repository.list_executions("scraper-1", limit=2, after=cursor)
+        third, cursor = await repository.list_executions("scraper-1", limit=2, after=cursor)
+        self.assertEqual([row["id"] for row in second + third], ["e2", "e1", "e0"])
+        self.assertIsNone(cursor)
+
+    async def test_empty_result(self):
+        self._patch_client({"scraper_executions": []})
+        self.assertEqual(await repository.list_executions("scraper-1"), ([], None))
@@ -0,0 +1,93 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from app.prompts.registry import Prompt
+from app.services import response_cache as response_cache_module
+from app.services.response_cache import ResponseCache, SQLiteBackend, cache_key
+
+PROMPT = Prompt(mode="DATA", text="You answer data questions.", version="v1")
+ANSWER = {"content": "42", "image": None, "source": None}
+
+
+class CacheKeyTest(unittest.TestCase):
+    def test_rephrasings_in_case_space_and_punctuation_share_a_key(self):
+        self.assertEqual(
+            cache_key("DATA", "DATA@v1", "What is  the GDP of France?"),
+            cache_key("DATA", "DATA@v1", "what is the gdp of france"),
+        )
+
+    def test_mode_and_prompt_version_are_part_of_the_key(self):
+        key = cache_key("DATA", "DATA@v1", "question")
+        self.assertNotEqual(key, cache_key("INVESTIGATE", "DATA@v1", "question"))
+        self.assertNotEqual(key, cache_key("DATA", "DATA@v2", "question"))
+
+
+class ResponseCacheTest(unittest.IsolatedAsyncioTestCase):
+    async def test_exact_hit_after_store(self):
+        cache = ResponseCache(sqlite_path=None, semantic=False)
+        self.assertIsNone(await cache.get(PROMPT, "What is the answer?"))
+        await cache.set(PROMPT, "What is the answer?", ANSWER)
+        self.assertEqual(await cache.get(PROMPT, "what is the answer"), ANSWER)
+        stats = cache.stats()
+        self.assertEqual((stats["exact_hits"], stats["misses"]), (1, 1))
+        self.assertEqual(stats["hit_rate"], 0.5)
+
+    async def test_other_prompt_version_misses(self):
+        cache = ResponseCache(sqlite_path=None, semantic=False)
+        await cache.set(PROMPT, "question", ANSWER)
+        newer = Prompt(mode="DATA", text="Changed prompt.", version="v2")
+        self.assertIsNone(await cache.get(newer, "question"))
+
+    async def test_entries_expire_after_the_mode_ttl(self):
+        cache = ResponseCache(sqlite_path=None, semantic=False)
+        with mock.patch.dict(os.environ, {"RESPONSE_CACHE_TTL_DATA": "0"}):
+            await cache.set(PROMPT, "question", ANSWER)
+        self.assertIsNone(await cache.get(PROMPT, "question"))
+
+    async def test_sqlite_tier_outlives_the_memory_tier(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "responses.sqlite3")
+        first = ResponseCache(sqlite_path=path, semantic=False)
+        self.addCleanup(first._disk._conn.close)
+        await first.set(PROMPT, "question", ANSWER)
+
+        # A new instance, like another worker or a restart, has an empty memory tier
+        cache = ResponseCache(sqlite_path=path, semantic=False)
+        self.addCleanup(cache._disk._conn.close)
+        self.assertEqual(await cache.get(PROMPT, "question"), ANSWER)
+
+
+class SQLiteBackendTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "responses.sqlite3")
+        self.now = 1000.0
+        patcher = mock.patch.object(response_cache_module.time, "time", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_expired_entries_are_dropped(self):
+        backend = SQLiteBackend(self.path)
+        self.addCleanup(backend._conn.close)
+        backend.set("key", ANSWER, ttl=10)
+        self.now += 11
+        self.assertIsNone(backend.get("key"))
+
+    def test_evicts_least_recently_used_beyond_max_entries(self):
+        backend = SQLiteBackend(self.path, max_entries=2)
+        self.addCleanup(backend._conn.close)
+        backend.set("a", {"content": "a"}, ttl=60)
+        self.now += 1
+        backend.set("b", {"content": "b"}, ttl=60)
+        self.now += 1
+        # Reading "a" makes "b" the least recently used
+        backend.get("a")
+        self.now += 1
+        backend.set("c", {"content": "c"}, ttl=60)
+
+        self.assertEqual(backend.get("a"), {"content": "a"})
+        self.assertIsNone(backend.get("b"))
+        self.assertEqual(backend.get("c"), {"content": "c"})
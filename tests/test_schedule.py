@@ -0,0 +1,90 @@
+import unittest
+from datetime import datetime, time, timezone
+from app.scraping.schedule import next_execution
+
+
+def utc(*args) -> datetime:
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+class WeeklyTest(unittest.TestCase):
+    # 2026-10-14 is a Wednesday
+    def test_later_the_same_day(self):
+        self.assertEqual(
+            next_execution("weekly", 3, "09:00", after=utc(2026, 10, 14, 8, 0)),
+            utc(2026, 10, 14, 9, 0),
+        )
+
+    def test_exact_run_time_moves_a_week_on(self):
+        self.assertEqual(
+            next_execution("weekly", 3, "09:00", after=utc(2026, 10, 14, 9, 0)),
+            utc(2026, 10, 21, 9, 0),
+        )
+
+    def test_earlier_weekday_wraps_to_next_week(self):
+        self.assertEqual(
+            next_execution("weekly", 1, time(6, 30), after=utc(2026, 10, 14, 12, 0)),
+            utc(2026, 10, 19, 6, 30),
+        )
+
+    def test_weekday_is_taken_in_the_scrapers_timezone(self):
+        # Still Wednesday in UTC, already Thursday in Tokyo
+        self.assertEqual(
+            next_execution("weekly", 4, "08:00", tz="Asia/Tokyo", after=utc(2026, 10, 14, 22, 0)),
+            utc(2026, 10, 14, 23, 0),
+        )
+
+    def test_unknown_timezone_falls_back_to_utc(self):
+        self.assertEqual(
+            next_execution("weekly", 3, "09:00", tz="Mars/Olympus", after=utc(2026, 10, 14, 8, 0)),
+            utc(2026, 10, 14, 9, 0),
+        )
+
+
+class MonthlyTest(unittest.TestCase):
+    def test_this_month_then_next(self):
+        self.assertEqual(
+            next_execution("monthly", 20, "10:00", after=utc(2026, 10, 17)),
+            utc(2026, 10, 20, 10, 0),
+        )
+        self.assertEqual(
+            next_execution("monthly", 5, "10:00", after=utc(2026, 10, 17)),
+            utc(2026, 11, 5, 10, 0),
+        )
+
+    def test_day_past_month_end_runs_on_last_day(self):
+        self.assertEqual(
+            next_execution("monthly", 31, "10:00", after=utc(2026, 2, 1)),
+            utc(2026, 2, 28, 10, 0),
+        )
+        self.assertEqual(
+            next_execution("monthly", 31, "10:00", after=utc(2026, 11, 1)),
+            utc(2026, 11, 30, 10, 0),
+        )
+
+    def test_december_wraps_to_january(self):
+        self.assertEqual(
+            next_execution("monthly", 1, "00:00", after=utc(2026, 12, 2)),
+            utc(2027, 1, 1, 0, 0),
+        )
+
+
+class TimezoneTest(unittest.TestCase):
+    def test_wall_clock_time_follows_dst(self):
+        summer = next_execution("monthly", 1, "09:00", tz="Europe/Berlin", after=utc(2026, 6, 15))
+        winter = next_execution("monthly", 1, "09:00", tz="Europe/Berlin", after=utc(2026, 11, 15))
+        self.assertEqual(summer, utc(2026, 7, 1, 7, 0))
+        self.assertEqual(winter, utc(2026, 12, 1, 8, 0))
+
+    def test_time_in_dst_gap_moves_forward(self):
+        # Clocks in Berlin jump from 02:00 to 03:00 on 2026-03-29
+        self.assertEqual(
+            next_execution("monthly", 29, "02:30", tz="Europe/Berlin", after=utc(2026, 3, 20)),
+            utc(2026, 3, 29, 1, 30),
+        )
+
+
+class InvalidTest(unittest.TestCase):
+    def test_unknown_regularity(self):
+        with self.assertRaises(ValueError):
+            next_execution("daily", 1, "09:00")
@@ -0,0 +1,77 @@
+import asyncio
+import unittest
+from app.services.single_flight import FlightCancelledError, SingleFlight
+
+
+async def _collect(updates) -> list[dict]:
+    return [update async for update in updates]
+
+
+class SingleFlightTest(unittest.IsolatedAsyncioTestCase):
+    async def test_identical_requests_share_one_upstream_call(self):
+        flights = SingleFlight()
+        calls = 0
+        release = asyncio.Event()
+
+        async def upstream():
+            nonlocal calls
+            calls += 1
+            yield {"content": "par"}
+            await release.wait()
+            yield {"content": "partial answer"}
+
+        first = asyncio.create_task(_collect(flights.share("key", upstream())))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(_collect(flights.share("key", upstream())))
+        await asyncio.sleep(0)
+        release.set()
+
+        self.assertEqual((await first)[-1], {"content": "partial answer"})
+        self.assertEqual((await second)[-1], {"content": "partial answer"})
+        self.assertEqual(calls, 1)
+        self.assertEqual(flights.metrics, {"flights": 1, "coalesced": 1})
+        self.assertEqual(flights.in_flight(), 0)
+
+    async def test_finished_flight_is_forgotten(self):
+        flights = SingleFlight()
+
+        async def upstream(answer):
+            yield {"content": answer}
+
+        self.assertEqual(await _collect(flights.share("key", upstream("first"))), [{"content": "first"}])
+        self.assertEqual(await _collect(flights.share("key", upstream("second"))), [{"content": "second"}])
+        self.assertEqual(flights.metrics["flights"], 2)
+
+    async def test_upstream_error_reaches_every_follower(self):
+        flights = SingleFlight()
+        release = asyncio.Event()
+
+        async def upstream():
+            yield {"content": "par"}
+            await release.wait()
+            raise ConnectionError("upstream down")
+
+        first = asyncio.create_task(_collect(flights.share("key", upstream())))
+        second = asyncio.create_task(_collect(flights.share("key", upstream())))
+        await asyncio.sleep(0)
+        release.set()
+        for follower in (first, second):
+            with self.assertRaises(ConnectionError):
+                await follower
+
+    async def test_cancelled_upstream_fails_followers(self):
+        flights = SingleFlight()
+
+        async def upstream():
+            yield {"content": "par"}
+            await asyncio.Event().wait()
+
+        follower = asyncio.create_task(_collect(flights.share("key", upstream())))
+        await asyncio.sleep(0.01)
+        flight = flights._flights["key"]
+        flight.task.cancel()
+
+        # The partial stream must not pass for a complete answer
+        with self.assertRaises(FlightCancelledError):
+            await follower
+        self.assertEqual(flights.in_flight(), 0)